@@ -0,0 +1,135 @@
+"""Measure whether capture FPS holds while a background encode runs.
+
+Replays a video through the capture path of the recorder (decode every
+frame, classify every 10th) for a few seconds in three phases: alone,
+next to an encode with ffmpeg's defaults, and next to an encode with
+the resource limits from settings.toml (or the command line):
+
+    python -m benchmarks.capture_during_encode --seconds 20 --threads 1
+
+The encode loops the same video, so it keeps running for the whole
+phase. On a machine with spare cores the limited phase should stay
+close to the baseline.
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from config import settings
+from cv_tools.detect_digit import get_refs
+from cv_tools.frame_generator import frame_generator
+from game_objects.frame_classifier import FrameClassifier
+from utils.ffmpeg_tools import (
+    ENCODE_ARGS,
+    ProcessLimits,
+    ffmpeg_cmd,
+    set_process_limits,
+)
+
+
+def measure_capture(
+    video: Path, classifier: FrameClassifier, seconds: float
+) -> list[float]:
+    """Frames per second of the capture loop, one value per second."""
+    rates = []
+    count = 0
+    start = window = time.monotonic()
+    for frame_number, frame in enumerate(frame_generator(video, loop=True)):
+        if frame_number % 10 == 0:
+            classifier.classify(frame, skip_score=frame_number % 100 != 0)
+        count += 1
+        now = time.monotonic()
+        if now - window >= 1.0:
+            rates.append(count / (now - window))
+            count = 0
+            window = now
+        if now - start >= seconds:
+            break
+    return rates
+
+
+def run_phase(
+    name: str,
+    video: Path,
+    classifier: FrameClassifier,
+    seconds: float,
+    limits: ProcessLimits | None,
+) -> dict:
+    proc = None
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if limits is not None:
+            set_process_limits(limits)
+            proc = ffmpeg_cmd(
+                ["-stream_loop -1", f"-i '{video}'", f"-t {seconds * 10}"]
+                + ENCODE_ARGS
+                + limits.thread_args()
+                + ["-y", f"'{Path(tmpdir) / 'out.mp4'}'"]
+            )
+        try:
+            rates = measure_capture(video, classifier, seconds)
+        finally:
+            if proc is not None:
+                proc.kill()
+                proc.communicate()
+    # The first window includes opening the video
+    rates = rates[1:] or rates
+    return {
+        "phase": name,
+        "mean": statistics.mean(rates),
+        "min": min(rates),
+        "stdev": statistics.pstdev(rates),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", type=Path, default=Path(settings.debug_video))
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument(
+        "--nice", type=int, default=getattr(settings, "encode_nice", 10)
+    )
+    parser.add_argument(
+        "--ionice-class", type=int, default=getattr(settings, "encode_ionice_class", 2)
+    )
+    parser.add_argument(
+        "--threads", type=int, default=getattr(settings, "encode_threads", 0)
+    )
+    parser.add_argument(
+        "--cpus",
+        type=lambda value: tuple(int(cpu) for cpu in value.split(",")),
+        default=tuple(getattr(settings, "encode_cpus", [])),
+        help="Comma separated cores to pin the encode to",
+    )
+    args = parser.parse_args()
+
+    classifier = FrameClassifier(get_refs())
+    limited = ProcessLimits(
+        nice=args.nice,
+        ionice_class=args.ionice_class or None,
+        ionice_level=getattr(settings, "encode_ionice_level", 7),
+        threads=args.threads,
+        cpus=args.cpus,
+    )
+    phases = [
+        ("capture only", None),
+        ("default encode", ProcessLimits()),
+        ("limited encode", limited),
+    ]
+    results = [
+        run_phase(name, args.video, classifier, args.seconds, limits)
+        for name, limits in phases
+    ]
+    baseline = results[0]["mean"]
+    print(f"{'phase':<16} {'fps':>7} {'min':>7} {'stdev':>7} {'vs alone':>9}")
+    for r in results:
+        print(
+            f"{r['phase']:<16} {r['mean']:7.1f} {r['min']:7.1f} {r['stdev']:7.1f} "
+            f"{r['mean'] / baseline:8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
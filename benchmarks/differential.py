@@ -0,0 +1,297 @@
+"""Differential check of optimized detection code against the reference.
+
+Every frame is classified twice, once with the reference implementation
+and once with variants swapped in for some detection steps, and every
+FrameInfo field and GameStateMachine transition is compared:
+
+    python -m benchmarks.differential \\
+        --variant detect_digit=my_module:fast_detect_digit \\
+        --variant find_game_over=my_module:fast_find_game_over
+
+A variant replaces one of the TARGETS where FrameClassifier and Frame
+look it up. strip_frame is find_game_rect plus a crop, so its variants
+replace find_game_rect. Sources are the full-HD fixtures, the example
+video and any --video (files or "synthetic:" sources). Mismatches are
+printed with their frame numbers and saved as thumbnails with a JSON
+report in --out; the exit code is 1 when there is any.
+"""
+
+import argparse
+import importlib
+import json
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields, asdict
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import cv2
+import numpy as np
+
+from cv_tools.debug import save_image
+from cv_tools.detect_digit import get_refs, RoiRef
+from cv_tools.frame_generator import frame_generator
+from game_objects.frame_classifier import FrameClassifier
+from game_objects.frame_info import FrameInfo
+from game_objects.game_state import GameState, GameStateMachine
+
+fixtures_path = Path(__file__).parent.parent / "tests" / "fixtures_fullhd"
+example_video = Path(__file__).parent.parent / "gameplay_example_new.mp4"
+
+# Variant name -> (module, attribute) the detection code looks it up from
+TARGETS = {
+    "find_game_rect": ("game_objects.frame_classifier", "find_game_rect"),
+    "strip_frame": ("game_objects.frame_classifier", "find_game_rect"),
+    "Frame": ("game_objects.frame_classifier", "Frame"),
+    "detect_digit": ("game_objects.frame", "detect_digit"),
+    "get_countours": ("game_objects.frame", "get_countours"),
+    "find_game_over": ("game_objects.frame", "find_game_over"),
+}
+
+# FrameInfo fields that are compared (raw_frame is the input)
+COMPARED_FIELDS = tuple(f.name for f in fields(FrameInfo) if f.name != "raw_frame")
+
+THUMBNAIL_WIDTH = 480
+
+
+@dataclass
+class Mismatch:
+    """A frame classified differently by the variant."""
+
+    source: str
+    frame_number: int
+    # Field name -> (reference value, variant value)
+    fields: dict[str, tuple] = field(default_factory=dict)
+    thumbnail: str | None = None
+
+
+@dataclass
+class SourceResult:
+    """Comparison of one source.
+
+    Transitions are (frame number, old state, new state) of the
+    GameStateMachine fed with each side's FrameInfos.
+    """
+
+    source: str
+    frames: int = 0
+    mismatches: list[Mismatch] = field(default_factory=list)
+    reference_transitions: list[tuple[int, str, str]] = field(default_factory=list)
+    variant_transitions: list[tuple[int, str, str]] = field(default_factory=list)
+
+    @property
+    def transitions_match(self) -> bool:
+        return self.reference_transitions == self.variant_transitions
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches and self.transitions_match
+
+
+def load_variant(spec: str) -> tuple[str, object]:
+    """Parse "target=module:attribute" into the target and the object."""
+    target, _, location = spec.partition("=")
+    module_name, _, attribute = location.partition(":")
+    if target not in TARGETS:
+        raise ValueError(
+            f"Unknown target {target!r}, expected one of {', '.join(TARGETS)}"
+        )
+    if not module_name or not attribute:
+        raise ValueError(f"Expected target=module:attribute, got {spec!r}")
+    return target, getattr(importlib.import_module(module_name), attribute)
+
+
+@contextmanager
+def patched(variants: dict[str, object]) -> Iterator[None]:
+    """Swap the variants in where the detection code looks them up."""
+    saved = []
+    try:
+        for target, replacement in variants.items():
+            module = importlib.import_module(TARGETS[target][0])
+            attribute = TARGETS[target][1]
+            saved.append((module, attribute, getattr(module, attribute)))
+            setattr(module, attribute, replacement)
+        yield
+    finally:
+        for module, attribute, original in reversed(saved):
+            setattr(module, attribute, original)
+
+
+def diff_infos(reference: FrameInfo, variant: FrameInfo) -> dict[str, tuple]:
+    """Fields that differ, name -> (reference value, variant value)."""
+    diff = {}
+    for name in COMPARED_FIELDS:
+        expected = getattr(reference, name)
+        actual = getattr(variant, name)
+        if expected != actual:
+            diff[name] = (expected, actual)
+    return diff
+
+
+def save_thumbnail(path: Path, image: np.ndarray, diff: dict[str, tuple]) -> None:
+    """Downscaled frame with the differing fields written on it."""
+    scale = THUMBNAIL_WIDTH / image.shape[1]
+    thumbnail = cv2.resize(
+        image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+    )
+    for line, (name, (expected, actual)) in enumerate(diff.items()):
+        text = f"{name}: {expected} != {actual}"
+        position = (6, 18 + line * 18)
+        cv2.putText(
+            thumbnail, text, position, cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 3
+        )
+        cv2.putText(
+            thumbnail, text, position, cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 255), 1
+        )
+    save_image(path, thumbnail)
+
+
+def compare_source(
+    source: str,
+    frames: Iterable[np.ndarray],
+    variants: dict[str, object],
+    roi_ref: RoiRef,
+    out: Path | None = None,
+) -> SourceResult:
+    """Classify every frame with the reference and the variants and diff them.
+
+    Args:
+        source: Name of the source in the report and thumbnail names
+        frames: Full-HD frames of the source
+        variants: Target name -> replacement
+        roi_ref: Digit references
+        out: Folder for the thumbnails of mismatched frames, None for none
+    """
+    result = SourceResult(source)
+    reference = FrameClassifier(roi_ref)
+    candidate = FrameClassifier(roi_ref)
+    machines = (GameStateMachine(), GameStateMachine())
+    transitions = (result.reference_transitions, result.variant_transitions)
+    stem = Path(source).stem.replace(":", "_").replace(",", "_").replace("=", "-")
+
+    for frame_number, image in enumerate(frames):
+        result.frames += 1
+        expected = reference.classify(image)
+        with patched(variants):
+            try:
+                actual = candidate.classify(image)
+                diff = diff_infos(expected, actual)
+            except Exception as e:
+                actual = None
+                diff = {"exception": (None, f"{type(e).__name__}: {e}")}
+
+        for machine, infos, info in zip(machines, transitions, (expected, actual)):
+            if info is None:
+                continue
+            old, new = machine.update(info)
+            if old != new:
+                infos.append((frame_number, old.name, new.name))
+            if new == GameState.GAME_OVER:
+                # As the game loop does once the game is handled
+                machine.acknowledge_game_over()
+
+        if diff:
+            mismatch = Mismatch(source, frame_number, diff)
+            if out is not None:
+                path = out / f"{stem}_{frame_number:06d}.png"
+                save_thumbnail(path, image, diff)
+                mismatch.thumbnail = str(path)
+            result.mismatches.append(mismatch)
+    return result
+
+
+def image_frames(paths: Iterable[Path]) -> Iterator[np.ndarray]:
+    for path in paths:
+        image = cv2.imread(str(path))
+        if image is not None:
+            yield image
+
+
+def default_sources(video: bool = True) -> list[tuple[str, Iterable[np.ndarray]]]:
+    """Every fixture frame (as its own source) and the example video."""
+    sources = [
+        (path.name, image_frames([path]))
+        for path in sorted(fixtures_path.glob("*.png"))
+    ]
+    if video and example_video.exists():
+        sources.append((example_video.name, frame_generator(example_video)))
+    return sources
+
+
+def format_report(results: list[SourceResult], limit: int = 20) -> str:
+    lines = []
+    for result in results:
+        status = "ok" if result.ok else f"{len(result.mismatches)} mismatched frame(s)"
+        lines.append(f"{result.source:<32} {result.frames:6d} frames  {status}")
+        for mismatch in result.mismatches[:limit]:
+            diff = ", ".join(
+                f"{k}: {a} != {b}" for k, (a, b) in mismatch.fields.items()
+            )
+            lines.append(f"  frame {mismatch.frame_number}: {diff}")
+        if len(result.mismatches) > limit:
+            lines.append(f"  ... {len(result.mismatches) - limit} more")
+        if not result.transitions_match:
+            lines.append("  state transitions differ:")
+            lines.append(f"    reference: {result.reference_transitions}")
+            lines.append(f"    variant:   {result.variant_transitions}")
+    frames = sum(r.frames for r in results)
+    failed = [r for r in results if not r.ok]
+    lines.append(
+        f"{frames} frames in {len(results)} source(s), {len(failed)} with differences"
+    )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--variant",
+        action="append",
+        default=[],
+        metavar="TARGET=MODULE:NAME",
+        help=f"Replacement to check, targets: {', '.join(TARGETS)}",
+    )
+    parser.add_argument(
+        "--video",
+        action="append",
+        default=[],
+        help="Additional video or synthetic source",
+    )
+    parser.add_argument(
+        "--no-video", action="store_true", help="Skip the example video"
+    )
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=Path("differential_report"),
+        help="Thumbnails and report",
+    )
+    args = parser.parse_args()
+
+    variants = dict(load_variant(spec) for spec in args.variant)
+    if not variants:
+        print(
+            "No --variant given, comparing the reference with itself", file=sys.stderr
+        )
+    sources = default_sources(video=not args.no_video)
+    sources += [(video, frame_generator(Path(video))) for video in args.video]
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    roi_ref = get_refs()
+    results = [
+        compare_source(name, frames, variants, roi_ref, args.out)
+        for name, frames in sources
+    ]
+    report = {
+        "variants": args.variant,
+        "results": [asdict(r) | {"ok": r.ok} for r in results],
+    }
+    (args.out / "report.json").write_text(json.dumps(report, indent=2, default=str))
+    print(format_report(results))
+    if not all(r.ok for r in results):
+        print(f"Thumbnails and report in {args.out}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
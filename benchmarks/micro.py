@@ -0,0 +1,303 @@
+"""Micro-benchmarks of the CV hot paths on the full-HD test fixtures.
+
+Every benchmark times one call of a detection step (strip_frame, the
+Frame properties, the detectors, digit OCR, FrameClassifier.classify
+per branch, save_image) on a fixture frame, repeated for a fixed time:
+
+    python -m benchmarks.micro run --save baseline
+    python -m benchmarks.micro compare baseline
+    python -m benchmarks.micro compare baseline other --threshold 0.15
+
+`run` prints the per-call timings and, with --save, stores them as a
+JSON baseline in benchmarks/baselines/. `compare` diffs the median of
+every benchmark against a baseline (running the suite first unless a
+second baseline is given) and exits with 1 when one got slower than
+the threshold. Baselines only compare on the same machine.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from cv_tools.debug import save_image
+from cv_tools.detect_digit import detect_digit, get_refs, RoiRef
+from cv_tools.find_game_over import find_game_over
+from cv_tools.score_detect import get_countours
+from cv_tools.strip_frame import strip_frame
+from game_objects.frame import Frame
+from game_objects.frame_classifier import FrameClassifier
+
+fixtures_path = Path(__file__).parent.parent / "tests" / "fixtures_fullhd"
+baselines_path = Path(__file__).parent / "baselines"
+
+
+@dataclass
+class BenchmarkResult:
+    """Per-call timings of one benchmark in seconds."""
+
+    name: str
+    calls: int
+    median: float
+    mean: float
+    min: float
+    p90: float
+    stdev: float
+
+    @classmethod
+    def from_samples(cls, name: str, samples: list[float]) -> "BenchmarkResult":
+        samples = sorted(samples)
+        return cls(
+            name=name,
+            calls=len(samples),
+            median=statistics.median(samples),
+            mean=statistics.fmean(samples),
+            min=samples[0],
+            p90=samples[int(0.9 * (len(samples) - 1))],
+            stdev=statistics.pstdev(samples),
+        )
+
+
+def measure(
+    func: Callable[[], object],
+    min_time: float = 1.0,
+    min_calls: int = 10,
+    max_calls: int = 100_000,
+) -> list[float]:
+    """Time single calls of `func` until `min_time` and `min_calls` are reached."""
+    func()  # Warm up caches and lazy template loading
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < max_calls:
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= min_calls and t0 - start >= min_time:
+            break
+    return samples
+
+
+def load_fixture(name: str) -> np.ndarray:
+    image = cv2.imread(str(fixtures_path / name))
+    if image is None:
+        raise FileNotFoundError(fixtures_path / name)
+    return image
+
+
+def fresh_frame(stripped: np.ndarray, **cached) -> Frame:
+    """A Frame without cached properties, except the given ones."""
+    frame = Frame(stripped)
+    frame.__dict__.update(cached)
+    return frame
+
+
+def score_digits(frame: Frame, roi_ref: RoiRef) -> np.ndarray:
+    """Thresholded score line of P2, the input of get_countours."""
+    side = frame.get_score_frame().get_sides(roi_ref)[1]
+    image = side.crop_image(side.image, side.lines_stripped[0])
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    _, thresh = cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY)
+    return thresh
+
+
+def build_benchmarks(tmpdir: Path) -> dict[str, Callable[[], object]]:
+    """Benchmark name -> function doing one call of the measured step."""
+    roi_ref = get_refs()
+    classifier = FrameClassifier(roi_ref)
+
+    versus = load_fixture("game_versus.png")
+    paused = load_fixture("game_pause.png")
+    bonus = load_fixture("game_bonus.png")
+    menu = load_fixture("menu.png")
+    game_over = load_fixture("game_over_both.png")
+    black = np.zeros_like(versus)
+
+    stripped = strip_frame(versus)
+    frame = Frame(stripped)
+    arc_pos = frame.arc_pos
+    stripped_over = strip_frame(game_over)
+    left_over = Frame(stripped_over).get_player_screens(roi_ref)[0].screen
+    left_playing = frame.get_player_screens(roi_ref)[0].screen
+    stripped_paused = strip_frame(paused)
+    stripped_bonus = strip_frame(bonus)
+    thresh = score_digits(frame, roi_ref)
+    digit = get_countours(thresh)[0]
+    output = tmpdir / "frame.png"
+
+    return {
+        "strip_frame": lambda: strip_frame(versus),
+        "frame.arc_pos": lambda: fresh_frame(stripped).arc_pos,
+        "frame.score_pos": lambda: fresh_frame(stripped, arc_pos=arc_pos).score_pos,
+        "frame.is_paused[game]": lambda: fresh_frame(stripped).is_paused,
+        "frame.is_paused[paused]": lambda: fresh_frame(stripped_paused).is_paused,
+        "frame.is_bonus[game]": lambda: fresh_frame(stripped).is_bonus,
+        "frame.is_bonus[bonus]": lambda: fresh_frame(stripped_bonus).is_bonus,
+        "frame.is_two_player": lambda: fresh_frame(
+            stripped, arc_pos=arc_pos
+        ).is_two_player,
+        "find_game_over[playing]": lambda: find_game_over(left_playing),
+        "find_game_over[game_over]": lambda: find_game_over(left_over),
+        "get_countours": lambda: get_countours(thresh),
+        "detect_digit": lambda: detect_digit(digit, roi_ref),
+        "classify[black]": lambda: classifier.classify(black),
+        "classify[menu]": lambda: classifier.classify(menu),
+        "classify[paused]": lambda: classifier.classify(paused),
+        "classify[bonus]": lambda: classifier.classify(bonus),
+        "classify[game,skip_score]": lambda: classifier.classify(
+            versus, skip_score=True
+        ),
+        "classify[game]": lambda: classifier.classify(versus),
+        "classify[game_over]": lambda: classifier.classify(game_over),
+        "save_image": lambda: save_image(output, versus),
+    }
+
+
+def run(
+    pattern: str | None = None, min_time: float = 1.0, out=sys.stdout
+) -> list[BenchmarkResult]:
+    """Run the benchmarks whose name contains `pattern` (all if None)."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, func in build_benchmarks(Path(tmpdir)).items():
+            if pattern and pattern not in name:
+                continue
+            result = BenchmarkResult.from_samples(name, measure(func, min_time))
+            results.append(result)
+            print(
+                f"{name:<28} {result.median * 1000:9.3f} {result.p90 * 1000:9.3f} "
+                f"{result.min * 1000:9.3f} {result.calls:7d}",
+                file=out,
+            )
+    return results
+
+
+def save(results: list[BenchmarkResult], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "created_at": datetime.now(UTC).isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "cv_threads": cv2.getNumThreads(),
+        },
+        "results": {r.name: asdict(r) for r in results},
+    }
+    path.write_text(json.dumps(data, indent=2))
+
+
+def load(path: Path) -> dict[str, BenchmarkResult]:
+    data = json.loads(path.read_text())
+    return {name: BenchmarkResult(**r) for name, r in data["results"].items()}
+
+
+def compare(
+    baseline: dict[str, BenchmarkResult],
+    current: dict[str, BenchmarkResult],
+    threshold: float = 0.1,
+) -> list[tuple[str, float | None, float | None, str]]:
+    """Compare medians, returns (name, baseline, current, verdict) rows.
+
+    The verdict is "slower" or "faster" when the median changed by more
+    than `threshold` (a ratio), "same" otherwise, and "new"/"missing"
+    for benchmarks that exist on one side only.
+    """
+    rows = []
+    for name in list(baseline) + [n for n in current if n not in baseline]:
+        before = baseline[name].median if name in baseline else None
+        after = current[name].median if name in current else None
+        if before is None:
+            verdict = "new"
+        elif after is None:
+            verdict = "missing"
+        elif after > before * (1 + threshold):
+            verdict = "slower"
+        elif after < before * (1 - threshold):
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append((name, before, after, verdict))
+    return rows
+
+
+def baseline_path(name: str) -> Path:
+    """A baseline name in benchmarks/baselines/, or a path to a JSON file."""
+    path = Path(name)
+    if path.suffix == ".json":
+        return path
+    return baselines_path / f"{name}.json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    compare_parser = commands.add_parser("compare", help="Compare against a baseline")
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("-k", dest="pattern", help="Only benchmarks containing this")
+        sub.add_argument(
+            "--min-time", type=float, default=1.0, help="Seconds per benchmark"
+        )
+    run_parser.add_argument(
+        "--save", metavar="NAME", help="Store the results as a baseline"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument(
+        "current", nargs="?", help="Baseline to compare instead of a run"
+    )
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Median change flagged (0.1 = 10%%)",
+    )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        print(
+            f"{'benchmark':<28} {'median ms':>9} {'p90 ms':>9} {'min ms':>9} {'calls':>7}"
+        )
+        results = run(args.pattern, args.min_time)
+        if args.save:
+            path = baseline_path(args.save)
+            save(results, path)
+            print(f"Saved to {path}")
+        return
+
+    baseline = load(baseline_path(args.baseline))
+    if args.current:
+        current = load(baseline_path(args.current))
+    else:
+        current = {r.name: r for r in run(args.pattern, args.min_time, out=sys.stderr)}
+    if args.pattern:
+        baseline = {n: r for n, r in baseline.items() if args.pattern in n}
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'benchmark':<28} {'before ms':>9} {'after ms':>9} {'change':>8}")
+    for name, before, after, verdict in rows:
+        change = f"{after / before - 1:+7.1%}" if before and after else ""
+        print(
+            f"{name:<28} {before * 1000 if before else 0:9.3f} "
+            f"{after * 1000 if after else 0:9.3f} {change:>8} {verdict}"
+        )
+    slower = [row[0] for row in rows if row[3] == "slower"]
+    if slower:
+        print(
+            f"{len(slower)} regression(s) over {args.threshold:.0%}: {', '.join(slower)}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,65 @@
 from pathlib import Path
 
 from aiogram import Bot
-from aiogram.types import FSInputFile
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import FSInputFile, InputMediaVideo, Message
 
 from config import settings
 
 
 def get_bot() -> Bot:
-    return Bot(token=settings.bot_token)
+    """Create the bot. It keeps one pooled HTTP session for all requests.
 
+    `bot_api_url` points the bot at another Bot API server, e.g. a local
+    server (which allows bigger uploads) or a stand-in for testing.
+    """
+    api_url = getattr(settings, "bot_api_url", "")
+    if api_url:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(api_url))
+    else:
+        session = AiohttpSession()
+    return Bot(token=settings.bot_token, session=session)
 
-async def send_video_to_telegram(bot: Bot, video_path: Path, caption: str):
-    await bot.send_video(
+
+async def send_video_to_telegram(
+    bot: Bot,
+    video_path: Path,
+    caption: str,
+    thumbnail: Path | None = None,
+    dimensions: tuple[int, int] | None = None,
+) -> Message:
+    width, height = dimensions or (None, None)
+    return await bot.send_video(
         chat_id=settings.bot_channel,
         video=FSInputFile(video_path),
         caption=caption,
+        thumbnail=FSInputFile(thumbnail) if thumbnail is not None else None,
+        width=width,
+        height=height,
+        supports_streaming=True,
+    )
+
+
+async def edit_video_on_telegram(
+    bot: Bot,
+    message_id: int,
+    video_path: Path,
+    caption: str,
+    thumbnail: Path | None = None,
+    dimensions: tuple[int, int] | None = None,
+):
+    """Replace the video of an earlier post (e.g. a preview)."""
+    width, height = dimensions or (None, None)
+    await bot.edit_message_media(
+        chat_id=settings.bot_channel,
+        message_id=message_id,
+        media=InputMediaVideo(
+            media=FSInputFile(video_path),
+            caption=caption,
+            thumbnail=FSInputFile(thumbnail) if thumbnail is not None else None,
+            width=width,
+            height=height,
+            supports_streaming=True,
+        ),
     )
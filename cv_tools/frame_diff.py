@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+
+
+class FrameDeduplicator:
+    """Detects frames that are unchanged since the last kept frame.
+
+    The console often repeats frames and the game over tail is static for
+    seconds, so most consecutive frames are identical apart from capture
+    noise. Frames are compared on a strided subsample, which is cheap
+    enough to run on every captured frame.
+    """
+
+    def __init__(
+        self, pixel_tolerance: int = 16, max_changed: int = 0, stride: int = 8
+    ):
+        """Initialize the deduplicator.
+
+        Args:
+            pixel_tolerance: Per-channel difference treated as capture noise
+            max_changed: Number of sampled values allowed to differ by more
+                than the tolerance for a frame to still count as duplicate
+            stride: Sample every Nth pixel in both directions
+        """
+        self.pixel_tolerance = pixel_tolerance
+        self.max_changed = max_changed
+        self.stride = stride
+        self._last: np.ndarray | None = None
+
+    def signature(self, image: np.ndarray) -> np.ndarray:
+        return image[:: self.stride, :: self.stride].astype(np.int16)
+
+    def is_duplicate(self, image: np.ndarray) -> bool:
+        """Check a frame against the last kept frame.
+
+        Frames that are not duplicates become the new reference, so slow
+        changes can't accumulate across a run of near-identical frames.
+        """
+        sig = self.signature(image)
+        if self._last is not None and self._last.shape == sig.shape:
+            changed = np.count_nonzero(np.abs(sig - self._last) > self.pixel_tolerance)
+            if changed <= self.max_changed:
+                return True
+        self._last = sig
+        return False
+
+    def reset(self) -> None:
+        self._last = None
+
+
+def dhash(image: np.ndarray, size: int = 8, margin: int = 2) -> int:
+    """Perceptual difference hash of a frame.
+
+    The frame is reduced to a (size + 1) x size grayscale thumbnail and
+    each bit records whether a pixel is brighter than its left neighbour.
+    Differences up to `margin` are ignored so that capture noise on black
+    or no-signal frames doesn't produce random hashes.
+
+    Returns:
+        Hash as an integer of size * size bits
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    small = small.astype(np.int16)
+    bits = (small[:, 1:] - small[:, :-1]) > margin
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
@@ -1,55 +1,127 @@
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator
 
 import cv2
 import numpy as np
 
+from cv_tools.synthetic import is_synthetic, synthetic_frames, timeline_from_spec
+
+
+@dataclass
+class CapturedFrame:
+    """A frame with the timing reported by the capture backend.
+
+    Attributes:
+        image: BGR frame
+        sequence: Frame number in the source; consecutive frames of a
+            source without drops have consecutive numbers
+        device_time: Backend timestamp in seconds (device buffer time or
+            media position), None if the source has no timing
+    """
+
+    image: np.ndarray
+    sequence: int
+    device_time: float | None = None
+
 
 def _is_capture_device(path: Path) -> bool:
     """Check if path is a capture device (e.g., /dev/video0)."""
     return str(path).startswith("/dev/")
 
 
+def captured_frames(path: Path, loop: bool = False) -> Iterator[CapturedFrame]:
+    """Generate frames with their backend timestamps (see frame_generator).
+
+    Video files report their media position (CAP_PROP_POS_MSEC) and frame
+    index. Capture devices report the V4L2 buffer timestamp; OpenCV
+    doesn't expose the V4L2 sequence counter, so the sequence number is
+    derived from the timestamp and the nominal frame rate, and a frame
+    dropped by the device or driver shows up as a skipped number.
+    Directories of images have no timing. Synthetic sources (see
+    cv_tools.synthetic) report the media time of the rendered frame.
+    """
+    if is_synthetic(path):
+        timeline, seed = timeline_from_spec(str(path))
+        sequence = 0
+        offset = 0.0
+        while True:
+            for image, t in synthetic_frames(timeline, seed):
+                yield CapturedFrame(image, sequence, offset + t)
+                sequence += 1
+            offset += len(timeline) / timeline.fps
+            if not loop:
+                yield CapturedFrame(np.zeros((1080, 1920, 3), dtype=np.uint8), sequence)
+                return
+
+    if path.is_dir():
+        sequence = 0
+        for i in sorted(path.iterdir()):
+            if i.suffix == ".png":
+                yield CapturedFrame(cv2.imread(str(i)), sequence)
+                sequence += 1
+        # Add black frame at end of directory
+        yield CapturedFrame(np.zeros((1080, 1920, 3), dtype=np.uint8), sequence)
+        return
+
+    is_device = _is_capture_device(path)
+    sequence = 0
+    offset = 0.0  # Media time of previous loops of a file
+    # Handle video files and video devices (e.g., /dev/video0)
+    while True:
+        # Use V4L2 backend explicitly for capture devices to avoid GStreamer issues
+        if is_device:
+            cap = cv2.VideoCapture(str(path), cv2.CAP_V4L2)
+        else:
+            cap = cv2.VideoCapture(str(path))
+        if is_device:
+            # Use MJPEG format for capture devices (much faster than YUYV)
+            fourcc = cv2.VideoWriter_fourcc(*'MJPG')
+            cap.set(cv2.CAP_PROP_FOURCC, fourcc)
+        # Set resolution to 1920x1080 for video capture devices
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        first_time = None
+        first_sequence = sequence
+        device_time = None
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+            device_time = msec / 1000 + offset if msec > 0 or not is_device else None
+            if is_device and device_time is not None and fps > 0:
+                if first_time is None:
+                    first_time = device_time
+                sequence = first_sequence + round((device_time - first_time) * fps)
+            elif not is_device:
+                sequence = first_sequence + int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+            yield CapturedFrame(frame, sequence, device_time)
+            sequence += 1
+        cap.release()
+        if device_time is not None and not is_device:
+            offset = device_time + (1 / fps if fps > 0 else 0.0)
+        if not loop:
+            # For video files, yield a black frame to trigger state transition
+            if not is_device:
+                yield CapturedFrame(
+                    np.zeros((1080, 1920, 3), dtype=np.uint8), sequence, None
+                )
+            break
+
+
 def frame_generator(path: Path, loop: bool = False):
     """Generate frames from a 1920x1080 video file, device, or directory of images.
 
     Args:
-        path: Path to video file, video device (e.g., /dev/video0), or directory of PNG images
+        path: Path to video file, video device (e.g., /dev/video0), directory
+            of PNG images, or a synthetic source ("synthetic:games=2,fps=60")
         loop: If True, loop the video indefinitely (useful for debug mode)
 
     Note:
-        For video files (not capture devices), a black frame is yielded at the end
+        For video files and synthetic sources (not capture devices), a black frame is yielded at the end
         to trigger proper state transitions in the game loop.
     """
-    if path.is_dir():
-        for i in sorted(path.iterdir()):
-            if i.suffix == ".png":
-                yield cv2.imread(str(i))
-        # Add black frame at end of directory
-        yield np.zeros((1080, 1920, 3), dtype=np.uint8)
-    else:
-        is_device = _is_capture_device(path)
-        # Handle video files and video devices (e.g., /dev/video0)
-        while True:
-            # Use V4L2 backend explicitly for capture devices to avoid GStreamer issues
-            if is_device:
-                cap = cv2.VideoCapture(str(path), cv2.CAP_V4L2)
-            else:
-                cap = cv2.VideoCapture(str(path))
-            if is_device:
-                # Use MJPEG format for capture devices (much faster than YUYV)
-                fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-                cap.set(cv2.CAP_PROP_FOURCC, fourcc)
-            # Set resolution to 1920x1080 for video capture devices
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                yield frame
-            cap.release()
-            if not loop:
-                # For video files, yield a black frame to trigger state transition
-                if not is_device:
-                    yield np.zeros((1080, 1920, 3), dtype=np.uint8)
-                break
+    for captured in captured_frames(path, loop):
+        yield captured.image
@@ -1,11 +1,14 @@
 import cv2
 import numpy as np
 
+GameRect = tuple[int, int, int, int]
 
-def strip_frame(frame: np.ndarray) -> np.ndarray:
-    """Extract game area from 1920x1080 frame.
 
-    Returns the cropped game area with even dimensions for video encoding.
+def find_game_rect(frame: np.ndarray) -> GameRect:
+    """Find the game area in a 1920x1080 frame.
+
+    Returns the (x, y, w, h) rectangle of the game area, excluding the
+    border line and trimmed to even dimensions for video encoding.
     Raises Exception if frame is invalid (black screen, wrong dimensions).
     """
     im_bw = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
@@ -22,19 +25,28 @@ def strip_frame(frame: np.ndarray) -> np.ndarray:
         raise Exception("No contours")
     x, y, w, h = sorted(lst_contours, key=lambda coef: coef[3])[-2]
 
-    _frame = frame[y + 1 : y + h - 1, x + 1 : x + w - 1]
+    # Skip the one pixel border line on each side
+    x, y, w, h = x + 1, y + 1, w - 2, h - 2
 
     # Validate dimensions for 1080p input (game area ~900-1250px)
-    h, w = _frame.shape[:2]
     if not (1250 > h > 900):
         raise Exception(f"Wrong height: {h}")
     if not (1250 > w > 900):
         raise Exception(f"Wrong width: {w}")
 
     # Ensure even dimensions for video encoding
-    if _frame.shape[0] % 2:
-        _frame = _frame[:-1, :]
-    if _frame.shape[1] % 2:
-        _frame = _frame[:, :-1]
+    return x, y, w - w % 2, h - h % 2
+
+
+def crop_game_rect(frame: np.ndarray, rect: GameRect) -> np.ndarray:
+    x, y, w, h = rect
+    return frame[y : y + h, x : x + w]
+
 
-    return _frame
+def strip_frame(frame: np.ndarray) -> np.ndarray:
+    """Extract game area from 1920x1080 frame.
+
+    Returns the cropped game area with even dimensions for video encoding.
+    Raises Exception if frame is invalid (black screen, wrong dimensions).
+    """
+    return crop_game_rect(frame, find_game_rect(frame))
@@ -0,0 +1,411 @@
+"""Synthetic 1080p frames of the two player Tetris layout.
+
+Renders what the capture card would deliver for a scripted timeline of
+screens (black, menu, game, pause, bonus) and player states (scores,
+game over), so the recorder can be load and stress tested without a
+console: hour-long games, many games back to back, any frame rate.
+
+The layout follows the fixtures in tests/fixtures_fullhd: the border
+around the game area, the arc between the playfields, NEXT labels,
+the SCORE/LINES/LEVEL rows drawn with the digit templates from
+digits_fullhd, and the PAUSE and BONUS overlays from templates/. The
+GAME OVER box is drawn (there is no template for it). Frames are
+deterministic for a timeline and seed.
+
+As a frame_generator source, a path like
+
+    synthetic:games=3,seconds=600,fps=60,seed=1
+
+replays `games` standard games (see standard_game) of `seconds` each.
+"""
+
+import random
+from dataclasses import dataclass, field, replace
+from functools import cache
+from pathlib import Path
+from typing import Iterator, Literal
+
+import cv2
+import numpy as np
+
+Screen = Literal["black", "menu", "game", "pause", "bonus"]
+
+_root = Path(__file__).parent.parent
+
+# Game area inside the border, as found by strip_frame (x, y, w, h)
+GAME_RECT = (363, 73, 1198, 934)
+BORDER_WIDTH = 75
+
+# Positions below are relative to the game area
+ARC_LEFT, ARC_RIGHT, ARC_TOP = 433, 773, 215
+ARC_WALL = 74
+FIELD_LEFT_X = (5, 432)
+FIELD_RIGHT_X = (778, 1193)
+FIELD_TOP = 219
+CELL = 42
+FIELD_COLUMNS, FIELD_ROWS = 10, 17
+
+# Stats rows: label, top of the digits, bracket (left, right, bottom)
+STAT_ROWS = (
+    ("SCORE", 3, (182, 1005, 52)),
+    ("LINES", 75, (267, 920, 124)),
+    ("LEVEL", 146, (352, 835, 185)),
+)
+DIGIT_ADVANCE = 43
+LEFT_DIGITS_END = 466
+RIGHT_DIGITS_START = 722
+LABELS_X = (494, 688)
+BRACKET_THICKNESS = 8
+
+PAUSE_POS = (427, 216)
+BONUS_POS = (11, 211)
+GAME_OVER_BOX = (84, 359, 256, 144)  # x, y, w, h over the left playfield
+
+# BGR colors sampled from the fixtures
+BORDER_LIGHT = (255, 225, 150)
+BORDER_DARK = (200, 60, 30)
+BRACKET = (53, 53, 53)
+ORANGE = (0, 58, 221)
+WHITE = (255, 255, 255)
+MENU_BLUE = (230, 60, 90)
+# Piece colors, none of them in the red range of the game over and
+# NEXT detection or the orange range of the bonus detection
+PIECE_COLORS = ((80, 190, 40), (30, 200, 200), (220, 80, 60), (200, 120, 230))
+
+
+@dataclass
+class Player:
+    """What one player's side shows."""
+
+    score: int = 0
+    lines: int = 0
+    level: int = 0
+    game_over: bool = False
+
+
+@dataclass
+class Phase:
+    """A stretch of the timeline showing one screen.
+
+    During a game phase the scores count up from the previous phase's
+    values to `p1`/`p2`; other screens show these values as they are.
+    """
+
+    screen: Screen
+    seconds: float
+    p1: Player = field(default_factory=Player)
+    p2: Player = field(default_factory=Player)
+    # Side showing the bonus screen (1 or 2)
+    bonus_player: int = 1
+
+
+def standard_game(
+    seconds: float = 60.0,
+    p1: Player | None = None,
+    p2: Player | None = None,
+    pause_seconds: float = 3.0,
+    bonus_seconds: float = 2.0,
+) -> list[Phase]:
+    """Phases of a complete game as the recorder sees it.
+
+    Menu, game start at 0-0, play with a pause in the middle, P1 game
+    over, bonus screen for P2, both game over, back to the menu.
+    """
+    p1 = p1 or Player(score=3320, lines=24, level=2)
+    p2 = p2 or Player(score=2380, lines=18, level=1)
+    zero = Player()
+    half = lambda p: Player(p.score // 20 * 10, p.lines // 2, p.level)  # noqa: E731
+    p2_late = Player(p2.score * 7 // 100 * 10, p2.lines * 7 // 10, p2.level)
+    over1 = replace(p1, game_over=True)
+    play = max(seconds - pause_seconds - bonus_seconds - 9.0, 1.0)
+    return [
+        Phase("menu", 2.0, zero, zero),
+        Phase("game", 2.0, zero, zero),
+        Phase("game", play * 0.45, half(p1), half(p2)),
+        Phase("pause", pause_seconds, half(p1), half(p2)),
+        Phase("game", play * 0.45, p1, p2_late),
+        Phase("game", play * 0.1, over1, p2),
+        Phase("bonus", bonus_seconds, over1, p2, bonus_player=2),
+        Phase("game", 3.0, over1, replace(p2, game_over=True)),
+        Phase("menu", 2.0, over1, replace(p2, game_over=True)),
+    ]
+
+
+class Timeline:
+    """Scripted phases sampled at a fixed frame rate."""
+
+    def __init__(self, phases: list[Phase], fps: float = 30.0):
+        self.phases = phases
+        self.fps = fps
+        self._ends = []
+        end = 0.0
+        for phase in phases:
+            end += phase.seconds
+            self._ends.append(end)
+
+    @property
+    def duration(self) -> float:
+        return self._ends[-1] if self._ends else 0.0
+
+    def __len__(self) -> int:
+        return int(self.duration * self.fps)
+
+    def state_at(self, t: float) -> tuple[Phase, Player, Player]:
+        """Phase and interpolated player states at `t` seconds."""
+        for index, end in enumerate(self._ends):
+            if t < end or index == len(self._ends) - 1:
+                break
+        phase = self.phases[index]
+        if phase.screen != "game" or index == 0:
+            return phase, phase.p1, phase.p2
+        previous = self.phases[index - 1]
+        start = end - phase.seconds
+        progress = (
+            min(max((t - start) / phase.seconds, 0.0), 1.0) if phase.seconds else 1.0
+        )
+        return (
+            phase,
+            _interpolate(previous.p1, phase.p1, progress),
+            _interpolate(previous.p2, phase.p2, progress),
+        )
+
+
+def _interpolate(start: Player, end: Player, progress: float) -> Player:
+    if start.game_over and end.game_over:
+        return end
+    score = start.score + (end.score - start.score) * progress
+    return Player(
+        score=int(score) // 10 * 10,
+        lines=int(start.lines + (end.lines - start.lines) * progress),
+        level=int(start.level + (end.level - start.level) * progress),
+        game_over=end.game_over,
+    )
+
+
+@cache
+def _digits() -> dict[str, np.ndarray]:
+    return {
+        path.stem: cv2.imread(str(path)) for path in (_root / "digits_fullhd").iterdir()
+    }
+
+
+@cache
+def _template(name: str) -> np.ndarray:
+    return cv2.imread(str(_root / "templates" / f"{name}.png"))
+
+
+class SyntheticRenderer:
+    """Draws frames; the static parts are drawn once and copied."""
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self._backgrounds: dict[str, np.ndarray] = {}
+
+    def render(self, phase: Phase, p1: Player, p2: Player, t: float) -> np.ndarray:
+        if phase.screen == "black":
+            return np.zeros((1080, 1920, 3), dtype=np.uint8)
+        kind = "menu" if phase.screen == "menu" else "game"
+        frame = self._background(kind).copy()
+        x, y, w, h = GAME_RECT
+        area = frame[y : y + h, x : x + w]
+        self._draw_stats(area, p1, p2)
+        if kind == "menu":
+            return frame
+
+        for side, player in ((0, p1), (1, p2)):
+            if phase.screen == "bonus" and phase.bonus_player == side + 1:
+                self._draw_bonus(area, side)
+                continue
+            self._draw_field(area, side, player, t)
+            if player.game_over:
+                self._draw_game_over(area, side)
+        if phase.screen == "pause":
+            _paste(area, _template("pause"), *PAUSE_POS)
+        return frame
+
+    def _background(self, kind: str) -> np.ndarray:
+        if kind not in self._backgrounds:
+            self._backgrounds[kind] = _draw_background(kind)
+        return self._backgrounds[kind]
+
+    def _draw_stats(self, area: np.ndarray, p1: Player, p2: Player) -> None:
+        digits = _digits()
+        for (_, top, _), v1, v2 in zip(
+            STAT_ROWS,
+            (p1.score, p1.lines, p1.level),
+            (p2.score, p2.lines, p2.level),
+        ):
+            text = str(v1)
+            start = LEFT_DIGITS_END - DIGIT_ADVANCE * len(text)
+            for i, digit in enumerate(text):
+                _paste(area, digits[digit], start + i * DIGIT_ADVANCE, top)
+            for i, digit in enumerate(str(v2)):
+                _paste(area, digits[digit], RIGHT_DIGITS_START + i * DIGIT_ADVANCE, top)
+
+    def _draw_field(
+        self, area: np.ndarray, side: int, player: Player, t: float
+    ) -> None:
+        left = (FIELD_LEFT_X if side == 0 else FIELD_RIGHT_X)[0]
+        # The stack grows with the cleared lines, the same for a given seed
+        rng = random.Random(self.seed * 1000 + side)
+        height = min(3 + player.lines // 4, FIELD_ROWS - 4)
+        for row in range(height):
+            hole = rng.randrange(FIELD_COLUMNS)
+            color = PIECE_COLORS[rng.randrange(len(PIECE_COLORS))]
+            for column in range(FIELD_COLUMNS):
+                if column != hole:
+                    _cell(area, left, FIELD_ROWS - 1 - row, column, color)
+        if player.game_over:
+            return
+        # A falling piece moving every frame, so no two frames are the same
+        fall = (t * 3.0 + side * 0.37) % max(FIELD_ROWS - height - 2, 1)
+        piece = int(t * 3.0 / max(FIELD_ROWS - height - 2, 1)) + side
+        color = PIECE_COLORS[piece % len(PIECE_COLORS)]
+        column = (piece * 3) % (FIELD_COLUMNS - 3)
+        y = FIELD_TOP + int(fall * CELL)
+        for dx in range(3):
+            _block(area, left + (column + dx) * CELL, y, color)
+        _block(area, left + (column + 1) * CELL, y + CELL, color)
+
+    def _draw_bonus(self, area: np.ndarray, side: int) -> None:
+        x = BONUS_POS[0] if side == 0 else FIELD_RIGHT_X[0] + BONUS_POS[0]
+        _paste(area, _template("bonus"), x, BONUS_POS[1])
+
+    def _draw_game_over(self, area: np.ndarray, side: int) -> None:
+        x, y, bw, bh = GAME_OVER_BOX
+        if side == 1:
+            x += FIELD_RIGHT_X[0] - FIELD_LEFT_X[0]
+        cv2.rectangle(area, (x, y), (x + bw, y + bh), ORANGE, -1)
+        cv2.rectangle(area, (x + 8, y + 8), (x + bw - 8, y + bh - 8), BRACKET, -1)
+        cv2.rectangle(area, (x + 34, y + 30), (x + bw - 34, y + bh - 30), (0, 0, 0), -1)
+        for line, text in enumerate(("GAME", "OVER")):
+            cv2.putText(
+                area,
+                text,
+                (x + 42, y + 68 + line * 38),
+                cv2.FONT_HERSHEY_DUPLEX,
+                1.3,
+                WHITE,
+                3,
+            )
+
+
+def _draw_background(kind: str) -> np.ndarray:
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    x, y, w, h = GAME_RECT
+    b = BORDER_WIDTH
+    cv2.rectangle(
+        frame, (x - b, y - b + 4), (x + w + b - 1, y + h + b - 4), BORDER_LIGHT, -1
+    )
+    cv2.rectangle(frame, (x - 8, y - 8), (x + w + 7, y + h + 7), BORDER_DARK, 4)
+    frame[y : y + h, x : x + w] = 0
+    area = frame[y : y + h, x : x + w]
+
+    for label, top, (left, right, bottom) in STAT_ROWS:
+        t = BRACKET_THICKNESS
+        cv2.rectangle(area, (left, bottom), (right, bottom + t - 1), BRACKET, -1)
+        cv2.rectangle(area, (left, top - 3), (left + t - 1, bottom), BRACKET, -1)
+        cv2.rectangle(area, (right - t + 1, top - 3), (right, bottom), BRACKET, -1)
+        _text(area, label, LABELS_X, top + 35, WHITE, 1.45, 3)
+
+    if kind == "menu":
+        cv2.putText(
+            area, "GAME SELECT", (340, 465), cv2.FONT_HERSHEY_DUPLEX, 1.6, MENU_BLUE, 4
+        )
+        for line, text in enumerate(("1 PLAYER", "2 PLAYER", "VERSUS COMPUTER")):
+            cv2.putText(
+                area,
+                text,
+                (425, 540 + line * 40),
+                cv2.FONT_HERSHEY_DUPLEX,
+                1.4,
+                MENU_BLUE,
+                3,
+            )
+        return frame
+
+    _text(area, "NEXT", (3, 165), 35, ORANGE, 1.45, 4)
+    _text(area, "NEXT", (1028, 1190), 35, ORANGE, 1.45, 4)
+    # The arc: a pillar between the playfields with a black shaft
+    cv2.rectangle(area, (ARC_LEFT, ARC_TOP), (ARC_RIGHT - 1, h - 1), BORDER_LIGHT, -1)
+    cv2.rectangle(
+        area, (ARC_LEFT + 10, ARC_TOP + 10), (ARC_RIGHT - 11, h - 1), BORDER_DARK, 4
+    )
+    cv2.rectangle(
+        area,
+        (ARC_LEFT + ARC_WALL, ARC_TOP + 65),
+        (ARC_RIGHT - ARC_WALL - 1, h - 1),
+        (0, 0, 0),
+        -1,
+    )
+    return frame
+
+
+def _text(
+    area, text: str, span: tuple[int, int], baseline: int, color, scale, thickness
+):
+    """Draw text centered in a horizontal span, scaled down to fit."""
+    font = cv2.FONT_HERSHEY_DUPLEX
+    (width, _), _ = cv2.getTextSize(text, font, scale, thickness)
+    if width > span[1] - span[0]:
+        scale *= (span[1] - span[0]) / width
+        (width, _), _ = cv2.getTextSize(text, font, scale, thickness)
+    x = span[0] + (span[1] - span[0] - width) // 2
+    cv2.putText(area, text, (x, baseline), font, scale, color, thickness)
+
+
+def _paste(area: np.ndarray, image: np.ndarray, x: int, y: int) -> None:
+    h, w = image.shape[:2]
+    area[y : y + h, x : x + w] = image
+
+
+def _block(area: np.ndarray, x: int, y: int, color) -> None:
+    cv2.rectangle(area, (x + 1, y + 1), (x + CELL - 2, y + CELL - 2), color, -1)
+    shade = tuple(c // 2 for c in color)
+    cv2.rectangle(area, (x + 10, y + 10), (x + CELL - 11, y + CELL - 11), shade, -1)
+
+
+def _cell(area: np.ndarray, left: int, row: int, column: int, color) -> None:
+    _block(area, left + column * CELL, FIELD_TOP + row * CELL, color)
+
+
+def parse_spec(spec: str) -> dict[str, float]:
+    """Options of a "synthetic:key=value,..." source path."""
+    options = {"games": 1, "seconds": 60.0, "fps": 30.0, "seed": 0}
+    body = spec.split(":", 1)[1] if ":" in spec else ""
+    for item in filter(None, body.split(",")):
+        key, _, value = item.partition("=")
+        if key not in options:
+            raise ValueError(f"Unknown synthetic source option: {key}")
+        options[key] = type(options[key])(float(value))
+    return options
+
+
+def is_synthetic(path: Path | str) -> bool:
+    return str(path).startswith("synthetic:")
+
+
+def synthetic_frames(
+    timeline: Timeline, seed: int = 0
+) -> Iterator[tuple[np.ndarray, float]]:
+    """Frames of a timeline with their media time in seconds."""
+    renderer = SyntheticRenderer(seed)
+    for index in range(len(timeline)):
+        t = index / timeline.fps
+        phase, p1, p2 = timeline.state_at(t)
+        yield renderer.render(phase, p1, p2, t), t
+
+
+def timeline_from_spec(spec: str) -> tuple[Timeline, int]:
+    """Timeline and seed of a "synthetic:..." source path."""
+    options = parse_spec(spec)
+    rng = random.Random(options["seed"])
+    phases = [Phase("black", 1.0)]
+    for _ in range(options["games"]):
+        lines = [rng.randrange(10, 60) for _ in range(2)]
+        players = [
+            Player(score=rng.randrange(100, 2000) * 10, lines=n, level=n // 10)
+            for n in lines
+        ]
+        phases += standard_game(options["seconds"], *players)
+    return Timeline(phases, options["fps"]), options["seed"]
@@ -1,12 +1,13 @@
 import time
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 
 import numpy as np
 
 from cv_tools.detect_digit import RoiRef
-from cv_tools.strip_frame import strip_frame
+from cv_tools.strip_frame import crop_game_rect, find_game_rect
 from game_objects.frame import Frame
 from game_objects.frame_info import FrameInfo
+from utils.latency import LatencyHistogram
 
 
 @dataclass
@@ -16,6 +17,7 @@ class TimingStats:
     strip_time: float = 0.0
     is_paused_time: float = 0.0
     is_two_player_time: float = 0.0
+    game_over_time: float = 0.0
     score_detect_time: float = 0.0
     total_time: float = 0.0
 
@@ -24,50 +26,79 @@ class TimingStats:
             f"strip={self.strip_time * 1000:.1f}ms, "
             f"pause={self.is_paused_time * 1000:.1f}ms, "
             f"2p={self.is_two_player_time * 1000:.1f}ms, "
+            f"game_over={self.game_over_time * 1000:.1f}ms, "
             f"score={self.score_detect_time * 1000:.1f}ms, "
             f"total={self.total_time * 1000:.1f}ms"
         )
 
 
-@dataclass
+# Stage name, TimingStats field and short label for logs
+TIMING_STAGES = (
+    ("strip", "strip_time", "strip"),
+    ("pause", "is_paused_time", "pause"),
+    ("two_player", "is_two_player_time", "2p"),
+    ("game_over", "game_over_time", "game_over"),
+    ("score", "score_detect_time", "score"),
+    ("total", "total_time", "total"),
+)
+
+
 class CumulativeTimingStats:
-    """Cumulative timing statistics across multiple frames."""
+    """Latency histograms of each classification stage across many frames.
 
-    strip_time: float = 0.0
-    is_paused_time: float = 0.0
-    is_two_player_time: float = 0.0
-    score_detect_time: float = 0.0
-    total_time: float = 0.0
-    frame_count: int = 0
+    Stages a frame didn't reach (e.g. score OCR of a menu frame) are not
+    recorded for it, so percentiles only cover frames that ran the stage.
+    Stats of several intervals or workers are combined with merge().
+    """
+
+    def __init__(self):
+        self.stages = {name: LatencyHistogram() for name, _, _ in TIMING_STAGES}
+        self.frame_count = 0
 
     def add(self, stats: TimingStats):
-        self.strip_time += stats.strip_time
-        self.is_paused_time += stats.is_paused_time
-        self.is_two_player_time += stats.is_two_player_time
-        self.score_detect_time += stats.score_detect_time
-        self.total_time += stats.total_time
+        stages = self.stages
+        for name, attr, _ in TIMING_STAGES:
+            value = getattr(stats, attr)
+            if value or name in ("strip", "total"):
+                stages[name].record(value)
         self.frame_count += 1
 
+    def merge(self, other: "CumulativeTimingStats"):
+        for name, histogram in other.stages.items():
+            self.stages[name].merge(histogram)
+        self.frame_count += other.frame_count
+
     def reset(self):
-        self.strip_time = 0.0
-        self.is_paused_time = 0.0
-        self.is_two_player_time = 0.0
-        self.score_detect_time = 0.0
-        self.total_time = 0.0
+        for histogram in self.stages.values():
+            histogram.reset()
         self.frame_count = 0
 
     def avg_str(self) -> str:
         if self.frame_count == 0:
             return "no frames"
-        n = self.frame_count
-        return (
-            f"strip={self.strip_time / n * 1000:.1f}ms, "
-            f"pause={self.is_paused_time / n * 1000:.1f}ms, "
-            f"2p={self.is_two_player_time / n * 1000:.1f}ms, "
-            f"score={self.score_detect_time / n * 1000:.1f}ms, "
-            f"total={self.total_time / n * 1000:.1f}ms"
+        return ", ".join(
+            f"{label}={self.stages[name].mean * 1000:.1f}ms"
+            for name, _, label in TIMING_STAGES
         )
 
+    def percentile_str(self) -> str:
+        """p50/p90/p99/max of every stage that ran, for logs."""
+        if self.frame_count == 0:
+            return "no frames"
+        return ", ".join(
+            f"{label}: {self.stages[name]}"
+            for name, _, label in TIMING_STAGES
+            if self.stages[name].count
+        )
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Percentiles per stage, e.g. for a game's record."""
+        return {
+            name: self.stages[name].summary()
+            for name, _, _ in TIMING_STAGES
+            if self.stages[name].count
+        }
+
 
 class FrameClassifier:
     """Classifies raw video frames and extracts game state information.
@@ -102,7 +133,7 @@ class FrameClassifier:
         # Try to strip the frame (isolate game area)
         t0 = time.perf_counter()
         try:
-            stripped = strip_frame(raw_frame)
+            game_rect = find_game_rect(raw_frame)
         except Exception:
             timing.strip_time = time.perf_counter() - t0
             timing.total_time = time.perf_counter() - total_start
@@ -121,6 +152,7 @@ class FrameClassifier:
                 is_paused=False,
                 raw_frame=raw_frame,
             )
+        stripped = crop_game_rect(raw_frame, game_rect)
         timing.strip_time = time.perf_counter() - t0
 
         frame = Frame(stripped)
@@ -159,6 +191,7 @@ class FrameClassifier:
                 is_paused=True,
                 is_bonus=False,
                 raw_frame=raw_frame,
+                game_rect=game_rect,
             )
 
         # Bonus frames SHOULD be recorded (return as in_game=True)
@@ -178,6 +211,7 @@ class FrameClassifier:
                 is_paused=False,
                 is_bonus=True,
                 raw_frame=raw_frame,
+                game_rect=game_rect,
             )
 
         # Check if this is a 2-player game
@@ -204,6 +238,7 @@ class FrameClassifier:
                 p2_game_over=False,
                 is_paused=False,
                 raw_frame=raw_frame,
+                game_rect=game_rect,
             )
 
         # Two-player game detected - extract scores and game over status
@@ -218,14 +253,17 @@ class FrameClassifier:
             # Always check game_over status (needed for state machine)
             p1_game_over = screens[0].is_game_over
             p2_game_over = screens[1].is_game_over
+            timing.game_over_time = time.perf_counter() - t0
             # Only do score OCR if not skipping
             if not skip_score:
+                t0 = time.perf_counter()
                 p1_score = screens[0].score_frame.score
                 p2_score = screens[1].score_frame.score
+                timing.score_detect_time = time.perf_counter() - t0
         except Exception:
             # Could not detect player screens (transitional frame)
-            pass
-        timing.score_detect_time = time.perf_counter() - t0
+            if not timing.game_over_time:
+                timing.game_over_time = time.perf_counter() - t0
 
         timing.total_time = time.perf_counter() - total_start
         self.last_timing = timing
@@ -242,4 +280,5 @@ class FrameClassifier:
             p2_game_over=p2_game_over,
             is_paused=False,
             raw_frame=raw_frame,
+            game_rect=game_rect,
         )
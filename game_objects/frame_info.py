@@ -20,6 +20,7 @@ class FrameInfo:
         is_paused: True if game is paused (should NOT be recorded)
         is_bonus: True if showing bonus screen (SHOULD be recorded)
         raw_frame: The original frame for recording purposes
+        game_rect: Game area (x, y, w, h) found in raw_frame, None if not tetris
     """
 
     is_tetris: bool
@@ -33,6 +34,7 @@ class FrameInfo:
     is_paused: bool
     is_bonus: bool = False
     raw_frame: np.ndarray | None = None
+    game_rect: tuple[int, int, int, int] | None = None
 
     def __hash__(self):
         # raw_frame is not hashable, so we exclude it
@@ -1,38 +1,97 @@
 import argparse
 import asyncio
 import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
 from asyncio import sleep
 from copy import deepcopy
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
 from pathlib import Path
-from typing import Set
+from typing import Iterator, Set
 
+import cv2
 from aiogram import Bot
 
-from bot import get_bot, send_video_to_telegram
+from bot import edit_video_on_telegram, get_bot, send_video_to_telegram
 
 # Track background tasks to prevent garbage collection
 _background_tasks: Set[asyncio.Task] = set()
 from config import settings
-from cv_tools.debug import save_image
 from cv_tools.detect_digit import get_refs, RoiRef
-from cv_tools.frame_generator import frame_generator
-from game_objects.frame_classifier import FrameClassifier
+from cv_tools.frame_diff import FrameDeduplicator
+from cv_tools.frame_generator import CapturedFrame, captured_frames
+from game_objects.frame_classifier import CumulativeTimingStats, FrameClassifier
 from game_objects.game_state import GameState, GameStateMachine
+from utils.capture_gaps import GapDetector
+from utils.catalog import GameCatalog
+from utils.clock import MediaClock, RealClock, create_clock
+from utils.deferred import DeferredScheduler, IdleTracker
 from utils.dirs import (
-    cleanup_not_tetris_frames,
-    cleanup_old_games,
+    catalog_path,
     create_game_folder,
     frames_not_tetris_path,
+    games_path,
+    outbox_path,
+    profiles_path,
     videos_path,
 )
-from utils.ffmpeg_tools import create_video
+from utils.ffmpeg_tools import (
+    ProcessLimits,
+    Rendition,
+    archive_rendition,
+    create_quick_preview,
+    create_video,
+    fit_to_size,
+    is_valid_video,
+    preview_rendition,
+    remux_frames,
+    set_process_limits,
+    thumbnail_rendition,
+    timestamps_duration,
+    video_dimensions,
+)
+from utils.job_queue import JobQueue
+from utils.metrics import benchmark_report, metrics, start_metrics_server
+from utils.journal import GameJournal, find_unfinished_games
+from utils.not_tetris_sampler import NotTetrisSampler
+from utils.outbox import Outbox, OutboxSender, Post
+from utils.preroll import PrerollBuffer, PrerollFrame
+from utils.profiler import FrameProfiler
+from utils.recorder import GameRecorder, TIMESTAMPS_FILE
+from utils.retention import path_size, RetentionManager
+from utils.soak import SoakMonitor
+
+
+# Give up on a game after this many failed processing attempts
+MAX_PROCESSING_ATTEMPTS = 3
+
+# Pending post-game processing jobs, kept across restarts
+VIDEO_QUEUE_FILE = "video_queue.json"
+
+# Frames remuxed without re-encoding, when the full encode is deferred
+ARCHIVE_FILE = "frames.mkv"
+
+# Set in the environment of the replay started by --benchmark/--soak
+BENCHMARK_CHILD_ENV = "_TETRIS_BENCHMARK_CHILD"
 
 
 def utcnow():
     return datetime.now(UTC)
 
 
+def spawn_background(coro) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference to its task."""
+    task = asyncio.create_task(coro)
+    # Store reference to prevent garbage collection
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
 class ILoggerAdapter(logging.LoggerAdapter):
     def __init__(self, logger, extra):
         super().__init__(logger, extra)
@@ -50,6 +109,291 @@ class ILoggerAdapter(logging.LoggerAdapter):
         return msg, result
 
 
+def create_preroll_buffer() -> PrerollBuffer:
+    """Create the pre-roll ring buffer from settings."""
+    preroll_seconds = getattr(settings, "preroll_seconds", 1.0)
+    capture_fps = getattr(settings, "capture_fps", 60)
+    # Frames stay raw by default, so nothing is encoded on the capture
+    # loop; one second of 1080p at 60 fps takes about 356 MiB
+    max_mb = getattr(settings, "preroll_max_mb", 384)
+    return PrerollBuffer(
+        max_frames=int(preroll_seconds * capture_fps),
+        max_bytes=int(max_mb * 1024 * 1024),
+        encoding=getattr(settings, "preroll_encoding", "raw"),
+    )
+
+
+def flush_preroll(
+    preroll: PrerollBuffer,
+    folder: Path,
+    classifier: FrameClassifier,
+    transform=None,
+) -> list[PrerollFrame]:
+    """Write the pre-roll from its first gameplay frame into a game folder.
+
+    Runs in a worker thread at game start, with its own classifier, so the
+    capture loop keeps recording meanwhile.
+    """
+    try:
+        start = preroll.find_start(
+            lambda image: classifier.classify(image, skip_score=True).in_game
+        )
+        return preroll.flush(
+            folder, start.frame_number if start is not None else None, transform=transform
+        )
+    except Exception:
+        logging.exception(f"Failed to flush the pre-roll into {folder}")
+        return []
+
+
+def index_preroll(
+    recorder: GameRecorder,
+    flushed: list[PrerollFrame],
+    retention: RetentionManager,
+    started_at: float,
+) -> float:
+    """Index flushed pre-roll frames ahead of the frames recorded meanwhile.
+
+    Returns:
+        Seconds between the first flushed frame and `started_at`
+    """
+    for frame in flushed:
+        recorder.add_frame(frame.frame_number, frame.timestamp, frame.sequence)
+    recorder.release()
+    retention.add("games", recorder.folder)
+    if not flushed:
+        return 0.0
+    logging.info(
+        f"Flushed {len(flushed)} pre-roll frame(s), "
+        f"game started at frame {flushed[0].frame_number}"
+    )
+    return started_at - flushed[0].timestamp
+
+
+def apply_resource_limits() -> None:
+    """Keep background encodes from starving the live capture.
+
+    ffmpeg runs niced, with a lower IO priority, a capped number of
+    threads and optionally pinned to `encode_cpus`. The recorder process
+    itself (capture and classification) can be pinned to `capture_cpus`,
+    and OpenCV's thread pool is capped with `cv_threads`.
+    """
+    ionice_class = getattr(settings, "encode_ionice_class", 2)
+    set_process_limits(
+        ProcessLimits(
+            nice=getattr(settings, "encode_nice", 10),
+            ionice_class=ionice_class if ionice_class else None,
+            ionice_level=getattr(settings, "encode_ionice_level", 7),
+            threads=getattr(settings, "encode_threads", 0),
+            cpus=tuple(getattr(settings, "encode_cpus", [])),
+        )
+    )
+    cv_threads = getattr(settings, "cv_threads", 0)
+    if cv_threads:
+        cv2.setNumThreads(cv_threads)
+    capture_cpus = getattr(settings, "capture_cpus", [])
+    if capture_cpus:
+        try:
+            os.sched_setaffinity(0, capture_cpus)
+        except (AttributeError, OSError) as e:
+            logging.warning(f"Could not pin the recorder to cores {capture_cpus}: {e}")
+        else:
+            logging.info(f"Recorder pinned to cores {capture_cpus}")
+
+
+def create_game_catalog() -> GameCatalog:
+    """Open the game catalog and index game folders it doesn't know yet."""
+    catalog = GameCatalog(catalog_path)
+    catalog.sync(games_path)
+    return catalog
+
+
+def create_retention_manager(catalog: GameCatalog | None = None) -> RetentionManager:
+    """Create the retention manager and index existing recordings once.
+
+    With a catalog, game folders are indexed from it instead of listing
+    and measuring every folder, and folders deleted by retention are
+    marked as removed in it.
+    """
+    mb = 1024 * 1024
+
+    def removed(category: str, path: Path):
+        if catalog is not None and category == "games":
+            catalog.mark_removed(path)
+
+    retention = RetentionManager(
+        budgets={
+            "games": int(getattr(settings, "retention_games_mb", 4096) * mb),
+            "videos": int(getattr(settings, "retention_videos_mb", 4096) * mb),
+        },
+        min_free_bytes=int(getattr(settings, "retention_min_free_mb", 500) * mb),
+        on_remove=removed,
+        background=True,
+    )
+    if catalog is not None:
+        # Sizes of games interrupted while recording were never stored
+        entries = catalog.games(with_frames=True)
+        retention.index("games", [(e.folder, e.frames_bytes or None) for e in entries])
+    else:
+        retention.scan(
+            "games", games_path, lambda p: p.is_dir() and p.name.startswith("game_")
+        )
+    retention.scan("videos", videos_path, lambda p: p.is_file())
+    retention.check_disk()
+    return retention
+
+
+def create_gap_detector(image_device: Path) -> GapDetector:
+    """Create the detector of frames dropped by the capture and loop stalls."""
+    return GapDetector(
+        tolerance=getattr(settings, "gap_tolerance", 1.5),
+        live=str(image_device).startswith("/dev/"),
+    )
+
+
+def create_soak_monitor() -> SoakMonitor | None:
+    """Create the resource monitor of a --soak run, None otherwise."""
+    if not getattr(settings, "soak", False):
+        return None
+    return SoakMonitor(
+        limits={
+            "rss": getattr(settings, "soak_max_rss_mb", 64),
+            "fds": getattr(settings, "soak_max_fds", 8),
+            "threads": getattr(settings, "soak_max_threads", 4),
+            "tasks": getattr(settings, "soak_max_tasks", 8),
+        },
+        interval=getattr(settings, "soak_interval", 5),
+    )
+
+
+def create_not_tetris_sampler() -> NotTetrisSampler:
+    """Create the not-tetris frame sampler from settings."""
+    return NotTetrisSampler(
+        frames_not_tetris_path,
+        max_count=getattr(settings, "not_tetris_max_count", 1000),
+        max_bytes=int(getattr(settings, "not_tetris_max_mb", 200) * 1024 * 1024),
+        min_distance=getattr(settings, "not_tetris_min_distance", 6),
+    )
+
+
+def create_video_queue(
+    retention: RetentionManager,
+    sender: OutboxSender | None = None,
+    deferred: DeferredScheduler | None = None,
+    catalog: GameCatalog | None = None,
+) -> JobQueue:
+    """Create the post-game processing queue from settings.
+
+    `video_workers` limits concurrent encodes.
+    """
+
+    async def handle(game_folder: Path):
+        journal = GameJournal.load(game_folder)
+        if journal is None or journal.is_finished:
+            retention.unprotect(game_folder)
+            return
+        await process_game_video(retention, journal, sender, deferred, catalog)
+
+    return JobQueue(
+        handle,
+        workers=getattr(settings, "video_workers", 1),
+        max_size=getattr(settings, "video_queue_size", 16),
+        state_path=games_path / VIDEO_QUEUE_FILE,
+    )
+
+
+def create_deferred_scheduler(
+    idle: IdleTracker, release
+) -> DeferredScheduler | None:
+    """Create the idle-time encode scheduler, if `deferred_encoding` is on."""
+    if not getattr(settings, "deferred_encoding", False):
+        return None
+    return DeferredScheduler(
+        release,
+        idle,
+        idle_seconds=getattr(settings, "deferred_idle_seconds", 120),
+        max_load=getattr(settings, "deferred_max_load", 0.3),
+    )
+
+
+def release_deferred(video_queue: JobQueue, game_folder: Path) -> bool:
+    """Queue a deferred encode, but only while the video queue is empty."""
+    if video_queue.depth or video_queue.running:
+        return False
+    return video_queue.submit_nowait(game_folder)
+
+
+def create_outbox_sender(
+    bot: Bot, retention: RetentionManager, catalog: GameCatalog | None = None
+) -> OutboxSender:
+    """Create the Telegram outbox and its sender from settings.
+
+    `upload_workers` limits concurrent uploads. Videos of posts that are
+    still waiting to be sent are protected from retention. Upload results
+    are recorded in the catalog.
+    """
+    outbox = Outbox(
+        outbox_path,
+        max_attempts=getattr(settings, "upload_max_attempts", 10),
+        base_delay=getattr(settings, "upload_retry_delay", 5.0),
+    )
+    for video in outbox.pending():
+        retention.protect(video)
+
+    async def send(post: Post) -> int:
+        if not post.video.exists():
+            raise FileNotFoundError(f"Video {post.video} was deleted")
+        thumbnail = post.thumbnail
+        if thumbnail is not None and not thumbnail.exists():
+            thumbnail = None
+        start_time = utcnow()
+        if post.edit_message_id is not None:
+            # Replace the preview posted earlier with the final video
+            await edit_video_on_telegram(
+                bot,
+                post.edit_message_id,
+                post.video,
+                post.caption,
+                thumbnail=thumbnail,
+                dimensions=post.dimensions,
+            )
+            message_id = post.edit_message_id
+        else:
+            message = await send_video_to_telegram(
+                bot,
+                post.video,
+                post.caption,
+                thumbnail=thumbnail,
+                dimensions=post.dimensions,
+            )
+            message_id = message.message_id
+        send_time = (utcnow() - start_time).total_seconds()
+        metrics.upload_seconds.observe(send_time)
+        logging.info(f"Video sent to channel {settings.bot_channel} ({send_time:.1f}s)")
+        return message_id
+
+    def done(post: Post, sent: bool):
+        retention.unprotect(post.video)
+        if catalog is not None:
+            catalog.update_post(post.id, "sent" if sent else "failed")
+        spawn_background(asyncio.to_thread(retention.enforce, "videos"))
+
+    return OutboxSender(
+        outbox, send, max_parallel=getattr(settings, "upload_workers", 1), on_done=done
+    )
+
+
+def create_deduplicator() -> FrameDeduplicator | None:
+    """Create the duplicate frame filter for recording, if enabled."""
+    if not getattr(settings, "dedup_enabled", True):
+        return None
+    return FrameDeduplicator(
+        pixel_tolerance=getattr(settings, "dedup_pixel_tolerance", 16),
+        max_changed=getattr(settings, "dedup_max_changed", 0),
+        stride=getattr(settings, "dedup_stride", 8),
+    )
+
+
 def get_frame_logger(name):
     _log = logging.getLogger(name)
     h = logging.StreamHandler()
@@ -66,107 +410,416 @@ def get_frame_logger(name):
 
 
 async def process_game_video(
-    bot: Bot | None,
-    game_folder: Path,
-    recorded_frame_count: int,
-    real_duration: float | None,
-    final_p1: int | None,
-    final_p2: int | None,
+    retention: RetentionManager,
+    journal: GameJournal,
+    sender: OutboxSender | None = None,
+    deferred: DeferredScheduler | None = None,
+    catalog: GameCatalog | None = None,
 ):
     """Process video compilation and telegram sending in background.
 
-    This runs asynchronously so it doesn't block the game loop from
-    starting to record the next game.
+    This runs as a video queue job so it doesn't block the game loop from
+    starting to record the next game. The video is then posted through
+    the outbox, so the encode worker is free for the next game meanwhile
+    and the post survives network problems and restarts.
+
+    With deferred encoding, a finished game is only archived and a quick
+    preview is posted; the full encode runs when the scheduler releases
+    the game again, and replaces the preview post.
     """
+    game_folder = journal.folder
+    video_path = None
+    caption = game_caption(journal)
+    journal.mark(journal.status, attempts=journal.attempts + 1)
     try:
+        if (
+            deferred is not None
+            and journal.status in ("recording", "recorded")
+            and (game_folder / TIMESTAMPS_FILE).exists()
+        ):
+            await archive_game(retention, journal, sender, caption, catalog)
+            deferred.add(game_folder)
+            return
+
+        # What the video must last, read before the frames can be deleted
+        expected_duration = expected_video_duration(
+            game_folder, journal.frame_count, journal.real_duration
+        )
         # Run video compilation in a thread to not block the event loop
         start_time = utcnow()
-        video_path = await asyncio.to_thread(
-            compile_video, game_folder, recorded_frame_count, real_duration
+        outputs = await asyncio.to_thread(
+            compile_video, game_folder, journal.frame_count, journal.real_duration
         )
+        video_path = outputs["video"]
         video_time = (utcnow() - start_time).total_seconds()
+        metrics.encode_seconds.observe(video_time)
         logging.info(f"Video created: {video_path} ({video_time:.1f}s)")
+        journal.mark("processed")
+        if catalog is not None:
+            catalog.update(
+                game_folder.name,
+                status="processed",
+                video=video_path,
+                video_bytes=video_path.stat().st_size,
+                thumbnail=outputs.get("thumbnail"),
+                preview=outputs.get("preview"),
+                archive=outputs.get("archive"),
+                encode_seconds=video_time,
+            )
+
+        # The quick preview is replaced by the final video
+        quick_path = videos_path / f"{game_folder.name}.quick.mp4"
+        if quick_path.exists() and not retention.is_protected(quick_path):
+            retention.remove("videos", quick_path)
+
+        retention.protect(video_path)
+        for path in outputs.values():
+            retention.add("videos", path)
+        # Raw frames are no longer needed once the encode is verified
+        if getattr(settings, "delete_frames_after_encode", True):
+            if await asyncio.to_thread(is_valid_video, video_path, expected_duration):
+                retention.unprotect(game_folder)
+                freed = await asyncio.to_thread(retention.remove, "games", game_folder)
+                logging.info(f"Removed frames of {game_folder.name} ({freed / 1e6:.1f} MB)")
+            else:
+                logging.warning(f"Keeping frames of {game_folder.name}: the video is incomplete")
+
+        max_bytes = upload_limit()
+        if sender and max_bytes and video_path.stat().st_size > max_bytes:
+            # The Bot API would reject it after the whole upload
+            logging.error(f"Not sending {video_path.name}: over the upload limit")
+        elif sender:
+            post_id = sender.outbox.add(
+                video_path,
+                caption,
+                thumbnail=outputs.get("thumbnail"),
+                dimensions=video_dimensions(video_path),
+                edit_of=journal.post_id,
+            )
+            sender.wake()
+            if catalog is not None:
+                catalog.update(game_folder.name, post_id=post_id, upload_status="pending")
+            video_path = None  # Released once the post is sent
 
-        if bot:
-            caption = f"Game Over!\nP1: {final_p1} | P2: {final_p2}"
-            start_time = utcnow()
-            await send_video_to_telegram(bot, video_path, caption)
-            send_time = (utcnow() - start_time).total_seconds()
-            logging.info(f"Video sent to channel {settings.bot_channel} ({send_time:.1f}s)")
-
-        # Cleanup old game folders, keep last 5
-        removed = await asyncio.to_thread(cleanup_old_games, 5)
-        if removed:
-            logging.info(f"Cleaned up {len(removed)} old game folder(s)")
     except Exception as e:
         logging.error(f"Error processing game video: {e}")
+        if not journal.is_finished and journal.attempts >= MAX_PROCESSING_ATTEMPTS:
+            journal.mark("failed")
+            if catalog is not None:
+                catalog.update(game_folder.name, status="failed")
+    finally:
+        # Archived games wait protected for their deferred encode
+        if journal.status != "archived":
+            retention.unprotect(game_folder)
+        if video_path is not None:
+            retention.unprotect(video_path)
+        # Keep game folders and videos within their byte budgets
+        await asyncio.to_thread(retention.enforce, "games")
+        await asyncio.to_thread(retention.enforce, "videos")
+
+
+async def archive_game(
+    retention: RetentionManager,
+    journal: GameJournal,
+    sender: OutboxSender | None,
+    caption: str,
+    catalog: GameCatalog | None = None,
+):
+    """Archive a game's frames without re-encoding and post a quick preview."""
+    game_folder = journal.folder
+    quick_path = videos_path / f"{game_folder.name}.quick.mp4"
+    start_time = utcnow()
+    await asyncio.to_thread(archive_frames, game_folder, quick_path)
+    archive_time = (utcnow() - start_time).total_seconds()
+    logging.info(f"Game archived, full encode deferred ({archive_time:.1f}s)")
+    retention.add("games", game_folder)
+    retention.add("videos", quick_path)
+
+    post_id = None
+    if sender:
+        retention.protect(quick_path)
+        post_id = sender.outbox.add(
+            quick_path,
+            f"{caption}\n(preview, full video follows)",
+            dimensions=video_dimensions(quick_path),
+        )
+        sender.wake()
+    # The full encode gets its own processing attempts
+    journal.mark("archived", post_id=post_id, attempts=0)
+    if catalog is not None:
+        catalog.update(
+            game_folder.name,
+            status="archived",
+            archive=game_folder / ARCHIVE_FILE,
+            frames_bytes=retention.entry_size("games", game_folder),
+            preview=quick_path,
+            post_id=post_id,
+            upload_status="pending" if post_id is not None else None,
+        )
+
+
+def archive_frames(game_folder: Path, quick_path: Path) -> None:
+    """Encode a quick preview and remux the frames into ARCHIVE_FILE.
+
+    The PNG frames are deleted once the archive is written, since it
+    holds the same images. The encode reads them from the archive later.
+    """
+    videos_path.mkdir(exist_ok=True)
+    timestamps = game_folder / TIMESTAMPS_FILE
+    create_quick_preview(
+        timestamps, quick_path, height=getattr(settings, "quick_preview_height", 360)
+    )
+    archive = game_folder / ARCHIVE_FILE
+    duration = remux_frames(timestamps, archive)
+    if is_valid_video(archive, duration):
+        for frame in game_folder.glob("*.png"):
+            frame.unlink()
+
+
+def game_caption(journal: GameJournal) -> str:
+    if journal.status == "recording" or journal.interrupted:
+        # Recovered after a crash - the last known scores are not final
+        return (
+            f"Game Over! (recording interrupted)\n"
+            f"P1: {journal.p1_score} | P2: {journal.p2_score}"
+        )
+    return f"Game Over!\nP1: {journal.final_p1_score} | P2: {journal.final_p2_score}"
+
 
+async def recover_games(video_queue: JobQueue, journals, enqueued_at: dict[Path, float]):
+    """Queue games left unfinished by a previous run, waiting for room."""
+    for journal in journals:
+        logging.info(f"Recovering unfinished game {journal.folder.name} ({journal.status})")
+        await video_queue.submit(journal.folder, enqueued_at.get(journal.folder))
 
-async def game_loop(bot: Bot | None, image_device: Path, roi_ref: RoiRef):
+
+def recover_unfinished_games(
+    retention: RetentionManager,
+    video_queue: JobQueue,
+    deferred: DeferredScheduler | None = None,
+    catalog: GameCatalog | None = None,
+) -> None:
+    """Find games interrupted by a crash and queue them for processing.
+
+    Live capture starts right away; recovered games are compiled and
+    posted by the video queue workers. Jobs that were queued by the
+    previous run keep their order and original enqueue time. Archived
+    games go back to the deferred scheduler.
+    """
+    enqueued_at = {job.folder: job.enqueued_at for job in video_queue.load_pending()}
+    order = {folder: i for i, folder in enumerate(enqueued_at)}
+    unfinished = sorted(
+        find_unfinished_games(games_path),
+        key=lambda j: (order.get(j.folder, len(order)), j.folder.name),
+    )
+    pending = []
+    for journal in unfinished:
+        if journal.status == "recording" and (not journal.valid or not journal.frame_count):
+            journal.mark("discarded")
+        elif journal.attempts >= MAX_PROCESSING_ATTEMPTS:
+            journal.mark("failed")
+        elif journal.status == "archived" and deferred is not None:
+            retention.protect(journal.folder)
+            deferred.add(journal.folder)
+        else:
+            if journal.status == "recording":
+                journal.mark("recording", interrupted=True)
+            retention.protect(journal.folder)
+            pending.append(journal)
+        if catalog is not None:
+            catalog.update(journal.folder.name, status=journal.status)
+    if pending:
+        logging.info(f"Found {len(pending)} unfinished game(s) from a previous run")
+        spawn_background(recover_games(video_queue, pending, enqueued_at))
+
+
+def close_interrupted_game(
+    recorder: GameRecorder,
+    journal: GameJournal,
+    valid: bool,
+    retention: RetentionManager,
+    video_queue: JobQueue,
+    catalog: GameCatalog | None = None,
+) -> None:
+    """Finish a game whose source ended before the game over.
+
+    Valid games with frames are queued like a crash recovered game, with
+    the last known scores; anything else is discarded.
+    """
+    game_folder = recorder.folder
+    recorder.close()
+    if valid and recorder.frame_count:
+        logging.warning(f"Source ended during {game_folder.name}, queueing it as interrupted")
+        metrics.games["recorded"] += 1
+        journal.mark(
+            "recorded", valid=True, interrupted=True, frame_count=recorder.frame_count
+        )
+        if catalog is not None:
+            catalog.update(
+                game_folder.name, status="recorded", frame_count=recorder.frame_count
+            )
+        if not video_queue.submit_nowait(game_folder):
+            logging.warning("Video queue full, game left for the next start")
+    else:
+        logging.info(f"Source ended during {game_folder.name}, discarding it")
+        metrics.games["discarded"] += 1
+        journal.mark("discarded", frame_count=recorder.frame_count)
+        if catalog is not None:
+            catalog.update(game_folder.name, status="discarded")
+        retention.unprotect(game_folder)
+
+
+async def game_loop(
+    image_device: Path,
+    roi_ref: RoiRef,
+    retention: RetentionManager,
+    video_queue: JobQueue,
+    sampler: NotTetrisSampler | None = None,
+    idle: IdleTracker | None = None,
+    catalog: GameCatalog | None = None,
+    profiler: FrameProfiler | None = None,
+    frames: Iterator[CapturedFrame] | None = None,
+    clock: RealClock | MediaClock | None = None,
+    gaps: GapDetector | None = None,
+) -> bool:
     """Main game loop using FrameClassifier and GameStateMachine.
 
     Simplified flow:
     1. Classify each frame
     2. Skip paused frames
     3. Update state machine
-    4. Record frames during GAME state (to timestamped folder)
-    5. Handle game over (compile video, send to Telegram, cleanup old games)
+    4. Record frames during GAME state (to timestamped folder), starting
+       with the pre-roll frames buffered before the game was detected
+    5. Handle game over (queue the game for compiling and sending)
+
+    Every game is added to the catalog when it starts and completed with
+    its scores and durations at game over.
+
+    Frames are read from `frames` if given (so that replays of sources
+    with several games carry on where the previous game ended), otherwise
+    from a new capture of `image_device`. Game and pause durations are
+    measured with `clock`: the wall clock for capture devices, the frame
+    timestamps for replays (see utils.clock). `gaps` keeps counting
+    capture gaps and loop stalls across games.
+
+    Returns:
+        True when the source ran out of frames, False after a game over
     """
     _log = get_frame_logger("game")
     classifier = FrameClassifier(roi_ref)
     state_machine = GameStateMachine()
+    preroll = create_preroll_buffer()
+    # The pre-roll is flushed in a thread, with a classifier of its own
+    preroll_classifier = FrameClassifier(roi_ref)
+    preroll_task: asyncio.Task | None = None
+    preroll_started_at = 0.0
 
     pause_started = False
     last_score = [None, None]
     last_game_over = [False, False]
     game_folder: Path | None = None
+    recorder: GameRecorder | None = None
+    journal: GameJournal | None = None
 
     # Game timing for normalized video framerate
     game_start_time: datetime | None = None
     pause_start_time: datetime | None = None
     total_pause_duration: float = 0.0  # seconds
-    recorded_frame_count: int = 0
 
-    # FPS tracking
-    fps_start_time = utcnow()
-    fps_frame_count = 0
+    if clock is None:
+        clock = create_clock(image_device)
 
-    for frame_number, raw_frame in enumerate(frame_generator(image_device)):
-        await sleep(0)
+    # FPS tracking: throughput is wall time, also when `clock` is media time
+    fps_start_time = time.monotonic()
+    fps_frame_count = 0
+    # Classification latency of the current game, merged every interval
+    game_timing = CumulativeTimingStats()
+    if gaps is None:
+        gaps = create_gap_detector(image_device)
+
+    # Replays of files can be paced to a frame rate, 0 runs them flat out
+    replay_fps = getattr(settings, "replay_fps", 0)
+    replay_start = time.monotonic()
+
+    if frames is None:
+        frames = captured_frames(image_device)
+        gaps.new_source()
+    for frame_number, captured in enumerate(frames):
+        delay = 0.0
+        if replay_fps:
+            delay = replay_start + frame_number / replay_fps - time.monotonic()
+        await sleep(max(delay, 0))
+        clock.tick(captured.device_time)
+        capture_time = clock.monotonic()
+        raw_frame = captured.image
+        stalls = gaps.total.loop_stalls
+        dropped = gaps.update(captured.device_time, capture_time)
+        # Counters only grow, whatever detector counted them
+        metrics.capture_dropped += dropped
+        metrics.loop_stalls += gaps.total.loop_stalls - stalls
         log = ILoggerAdapter(_log, {"frame_number": frame_number})
         fps_frame_count += 1
 
-        debug_mode = getattr(settings, "debug", False)
+        if preroll_task is not None and preroll_task.done():
+            game_start_time -= timedelta(
+                seconds=index_preroll(
+                    recorder, preroll_task.result(), retention, preroll_started_at
+                )
+            )
+            preroll_task = None
+        metrics.captured.tick()
+        if profiler is not None:
+            profiler.tick()
+
+        # Benchmarks replay with the classification cadence of a live capture
+        debug_mode = getattr(settings, "debug", False) and not getattr(
+            settings, "benchmark", False
+        )
 
         # Performance optimization: only classify every 10th frame
         # During GAME state, record all frames but skip classification on non-10th frames
         should_classify = frame_number % 10 == 0 or debug_mode
 
-        if state_machine.state == GameState.GAME and game_folder is not None:
-            # Always record frames during game
-            save_image(game_folder / f"{frame_number:06d}.png", raw_frame)
-            recorded_frame_count += 1
+        if state_machine.state == GameState.GAME and recorder is not None:
+            if dropped:
+                log.debug(f"Capture dropped {dropped} frame(s)")
+            # Always record frames during game, unless the disk is full
+            if not retention.poll():
+                t0 = time.perf_counter()
+                written = recorder.bytes_written
+                recorder.record(frame_number, raw_frame, capture_time, captured.sequence)
+                metrics.record_seconds.observe(time.perf_counter() - t0)
+                metrics.bytes_recorded += recorder.bytes_written - written
+                metrics.frames_recorded += 1
+            else:
+                metrics.frames_dropped += 1
 
             if not should_classify and not state_machine.game_over_detected:
                 # Skip classification but keep recording
                 continue
+        else:
+            # Keep recent frames so the game start can be recovered later
+            preroll.push(frame_number, raw_frame, capture_time, captured.sequence)
 
         # Log state every 100 frames with FPS and timing info (only during active game)
         if frame_number % 100 == 0 and state_machine.state == GameState.GAME:
-            elapsed = (utcnow() - fps_start_time).total_seconds()
+            elapsed = time.monotonic() - fps_start_time
             fps = fps_frame_count / elapsed if elapsed > 0 else 0
-            avg_timing = classifier.cumulative_timing.avg_str()
+            timing = classifier.cumulative_timing.percentile_str()
             log.info(
                 f"FPS: {fps:.1f}, "
-                f"avg timing: [{avg_timing}]"
+                f"timing: [{timing}], "
+                f"capture: {gaps.game}"
             )
-            # Reset counters for next interval
-            fps_start_time = utcnow()
+            # Reset counters for next interval, keeping the game's totals
+            fps_start_time = time.monotonic()
             fps_frame_count = 0
+            game_timing.merge(classifier.cumulative_timing)
             classifier.cumulative_timing.reset()
 
-        # Skip classification on non-10th frames when not in game
-        if not should_classify:
+        # Skip classification on non-10th frames when not in game; after a
+        # game over every frame is classified to catch the end of the game
+        if not should_classify and not state_machine.game_over_detected:
             continue
 
         # 1. Classify frame
@@ -181,10 +834,12 @@ async def game_loop(bot: Bot | None, image_device: Path, roi_ref: RoiRef):
             skip_score = False
 
         info = classifier.classify(raw_frame, skip_score=skip_score)
+        metrics.observe_timing(classifier.last_timing)
 
         # If game_over just detected and we skipped scores, re-classify to get final scores
         if info.both_game_over and skip_score:
             info = classifier.classify(raw_frame, skip_score=False)
+            metrics.observe_timing(classifier.last_timing)
 
         # 2. Handle paused frames
         # When include_pause_frames is True (default), pause frames are recorded
@@ -194,14 +849,16 @@ async def game_loop(bot: Bot | None, image_device: Path, roi_ref: RoiRef):
             if not pause_started:
                 log.info("Pause")
                 pause_started = True
-                pause_start_time = utcnow()
+                pause_start_time = clock.now()
+                if journal is not None:
+                    journal.pause_count += 1
             if not include_pause:
                 continue  # Skip recording pause frames
         elif pause_started:
             log.info("Resume")
             pause_started = False
             if pause_start_time is not None:
-                pause_duration = (utcnow() - pause_start_time).total_seconds()
+                pause_duration = (clock.now() - pause_start_time).total_seconds()
                 total_pause_duration += pause_duration
                 log.info(f"Pause duration: {pause_duration:.1f}s, total paused: {total_pause_duration:.1f}s")
                 pause_start_time = None
@@ -210,8 +867,13 @@ async def game_loop(bot: Bot | None, image_device: Path, roi_ref: RoiRef):
         if info.is_bonus:
             log.info("Bonus screen detected")
 
+        # Frames up to here are known not to be gameplay
+        if not info.in_game and state_machine.state != GameState.GAME:
+            preroll.mark_boundary(frame_number)
+
         # 3. Update state machine
         old_state, new_state = state_machine.update(info)
+        metrics.state = new_state.name
 
         # In debug mode, log detailed frame info
         if debug_mode:
@@ -221,6 +883,10 @@ async def game_loop(bot: Bot | None, image_device: Path, roi_ref: RoiRef):
                 f"go=[{info.p1_game_over},{info.p2_game_over}]"
             )
 
+        # Deferred encodes wait until no game was seen for a while
+        if idle is not None:
+            idle.update(new_state in (GameState.GAME, GameState.GAME_OVER))
+
         # Log state transitions
         if old_state != new_state:
             log.info(f"State transition: {old_state.name} -> {new_state.name}")
@@ -228,22 +894,57 @@ async def game_loop(bot: Bot | None, image_device: Path, roi_ref: RoiRef):
         # Create game folder when game starts
         if old_state != GameState.GAME and new_state == GameState.GAME:
             game_folder = create_game_folder()
-            game_start_time = utcnow()
+            retention.add("games", game_folder, 0)
+            retention.protect(game_folder)
+            if retention.check_disk():
+                log.warning("Disk almost full, game will not be recorded")
+            recorder = GameRecorder(
+                game_folder,
+                create_deduplicator(),
+                crop=getattr(settings, "record_crop", False),
+                output_height=getattr(settings, "record_height", 0),
+                on_write=lambda nbytes, folder=game_folder: retention.grow(
+                    "games", folder, nbytes
+                ),
+            )
+            # Reuse the game area found while classifying this frame
+            recorder.set_crop_rect(info.game_rect)
+            game_start_time = clock.now()
             total_pause_duration = 0.0
-            recorded_frame_count = 0
+            game_timing.reset()
+            classifier.cumulative_timing.reset()
+            gaps.start_game()
             log.info(f"Created game folder: {game_folder}")
 
+            # Flush pre-roll so the video starts with the first gameplay
+            # frame; frames recorded meanwhile are indexed after it
+            recorder.hold()
+            preroll_started_at = capture_time
+            preroll_task = asyncio.create_task(
+                asyncio.to_thread(
+                    flush_preroll,
+                    preroll.take(),
+                    game_folder,
+                    preroll_classifier,
+                    recorder.transform if recorder.transforms else None,
+                )
+            )
+            journal = GameJournal(game_folder, valid=state_machine.valid_game_started)
+            journal.flush()
+            if catalog is not None:
+                catalog.add(
+                    game_folder, started_at=journal.started_at, valid=journal.valid
+                )
+
         # Skip recording when in menu
         if new_state == GameState.MENU:
             continue
 
-        # Save not-tetris frames for later analysis
+        # Save distinct not-tetris frames for later analysis
         if new_state == GameState.NOT_TETRIS:
-            frames_not_tetris_path.mkdir(exist_ok=True)
-            save_image(frames_not_tetris_path / f"{frame_number:06d}.png", raw_frame)
-            # Cleanup old frames periodically
-            if frame_number % 1000 == 0:
-                cleanup_not_tetris_frames(keep_count=1000)
+            if sampler is not None and not retention.poll():
+                if sampler.offer(raw_frame) is not None:
+                    log.info(f"Saved not-tetris sample ({len(sampler)} kept)")
             continue
 
         # 4. Handle GAME state (frames already recorded above)
@@ -251,6 +952,15 @@ async def game_loop(bot: Bot | None, image_device: Path, roi_ref: RoiRef):
             if frame_number % 100 == 0:
                 log.info("📹 Recording in progress")
 
+            # Keep the crash journal current (flushed every few seconds)
+            journal.update(
+                valid=state_machine.valid_game_started,
+                frame_count=recorder.frame_count,
+                p1_score=state_machine.last_p1_score,
+                p2_score=state_machine.last_p2_score,
+                pause_duration=total_pause_duration,
+            )
+
             # Log score changes (only when we have valid scores)
             if info.has_valid_scores:
                 current_score = [info.p1_score, info.p2_score]
@@ -274,13 +984,31 @@ async def game_loop(bot: Bot | None, image_device: Path, roi_ref: RoiRef):
 
         # 5. Handle game over
         if new_state == GameState.GAME_OVER:
-            if state_machine.video_ready and game_folder is not None:
+            if preroll_task is not None:
+                game_start_time -= timedelta(
+                    seconds=index_preroll(
+                        recorder, await preroll_task, retention, preroll_started_at
+                    )
+                )
+                preroll_task = None
+            if recorder is not None:
+                recorder.close(capture_time)
+            if state_machine.video_ready and recorder is not None and not recorder.frame_count:
+                log.warning("Game over but no frames were recorded (disk full)")
+                metrics.games["discarded"] += 1
+                journal.mark("discarded")
+                retention.unprotect(game_folder)
+                if catalog is not None:
+                    catalog.update(game_folder.name, status="discarded")
+            elif state_machine.video_ready and game_folder is not None:
                 final_p1 = state_machine.final_p1_score
                 final_p2 = state_machine.final_p2_score
                 log.info(f"Game over! Final score: P1={final_p1} P2={final_p2}")
+                recorded_frame_count = recorder.frame_count
+                metrics.games["recorded"] += 1
 
                 # Calculate real game duration (excluding pauses)
-                game_end_time = utcnow()
+                game_end_time = clock.now()
                 if game_start_time is not None:
                     total_duration = (game_end_time - game_start_time).total_seconds()
                     real_duration = total_duration - total_pause_duration
@@ -288,31 +1016,87 @@ async def game_loop(bot: Bot | None, image_device: Path, roi_ref: RoiRef):
                         f"Game duration: {total_duration:.1f}s total, "
                         f"{total_pause_duration:.1f}s paused, {real_duration:.1f}s actual"
                     )
-                    log.info(f"Recorded frames: {recorded_frame_count}")
+                    log.info(
+                        f"Recorded frames: {recorded_frame_count}, "
+                        f"duplicates skipped: {recorder.duplicate_count} "
+                        f"({recorder.dedup_ratio:.0%})"
+                    )
                 else:
                     real_duration = None
+                game_timing.merge(classifier.cumulative_timing)
+                classifier.cumulative_timing.reset()
+                log.info(f"Game classification timing: [{game_timing.percentile_str()}]")
+                log.info(f"Game capture: {gaps.game}")
+
+                journal.mark(
+                    "recorded",
+                    valid=True,
+                    frame_count=recorded_frame_count,
+                    final_p1_score=final_p1,
+                    final_p2_score=final_p2,
+                    pause_duration=total_pause_duration,
+                    real_duration=real_duration,
+                )
+                if catalog is not None:
+                    catalog.update(
+                        game_folder.name,
+                        status="recorded",
+                        ended_at=game_end_time.isoformat(),
+                        valid=True,
+                        p1_score=final_p1,
+                        p2_score=final_p2,
+                        frame_count=recorded_frame_count,
+                        real_duration=real_duration,
+                        pause_duration=total_pause_duration,
+                        pause_count=journal.pause_count,
+                        frames_bytes=retention.entry_size("games", game_folder),
+                        timing=game_timing.summary(),
+                        gaps=gaps.game.as_dict(),
+                    )
 
-                # Spawn background task for video compilation and sending
-                # This doesn't block the game loop from starting to record the next game
-                task = asyncio.create_task(
-                    process_game_video(
-                        bot, game_folder, recorded_frame_count, real_duration,
-                        final_p1, final_p2
+                # Queue video compilation and sending; the queue workers
+                # limit concurrent encodes so capture isn't starved
+                if video_queue.submit_nowait(game_folder):
+                    log.info(
+                        f"Video processing queued ({video_queue.depth} waiting, "
+                        f"{video_queue.running} running)"
                     )
-                )
-                # Store reference to prevent garbage collection
-                _background_tasks.add(task)
-                task.add_done_callback(_background_tasks.discard)
-                log.info("Video processing started in background")
+                else:
+                    # The journal stays "recorded", so the next start retries
+                    # it; it stays protected until then
+                    log.warning("Video queue full, game left for the next start")
             else:
                 log.info("Game over detected but not a valid game (mid-game join)")
+                metrics.games["discarded"] += 1
+                if game_folder is not None:
+                    journal.mark("discarded", valid=False)
+                    if catalog is not None:
+                        catalog.update(game_folder.name, status="discarded", valid=False)
+                    # Nothing will be processed, let retention reclaim the folder
+                    retention.unprotect(game_folder)
 
             state_machine.acknowledge_game_over()
             game_folder = None
+            recorder = None
+            journal = None
             break
+    else:
+        if recorder is not None:
+            if preroll_task is not None:
+                index_preroll(recorder, await preroll_task, retention, preroll_started_at)
+            close_interrupted_game(
+                recorder,
+                journal,
+                state_machine.valid_game_started,
+                retention,
+                video_queue,
+                catalog,
+            )
+        return True
 
     # Pause for a moment before starting a new recording
     await sleep(1)
+    return False
 
 
 async def main():
@@ -329,39 +1113,230 @@ async def main():
     else:
         image_device = Path(settings.image_device)
 
+    apply_resource_limits()
+    catalog = create_game_catalog()
+    retention = create_retention_manager(catalog)
+    sampler = create_not_tetris_sampler()
+
     # Initialize bot unless --no-bot is specified
     bot = None
+    sender = None
+    sender_task = None
     if not no_bot:
         bot = get_bot()
+        # Posts left in the outbox by a previous run are sent first
+        sender = create_outbox_sender(bot, retention, catalog)
+        sender_task = asyncio.create_task(sender.run())
     else:
         logging.info("Running without Telegram bot")
 
-    while True:
-        await game_loop(bot, image_device, roi_ref)
-        if debug_mode:
-            logging.info("Debug mode: exiting after processing video")
-            break
+    # Full encodes of archived games wait for idle time, if enabled
+    idle = IdleTracker()
+    deferred = create_deferred_scheduler(
+        idle, lambda folder: release_deferred(video_queue, folder)
+    )
+    video_queue = create_video_queue(retention, sender, deferred, catalog)
+    video_queue.start()
+    deferred_task = None
+    if deferred is not None:
+        deferred_task = asyncio.create_task(deferred.run())
+
+    # Compile and post games interrupted by a crash, without delaying capture
+    recover_unfinished_games(retention, video_queue, deferred, catalog)
+
+    metrics.bind(
+        video_queue=video_queue,
+        outbox=sender.outbox if sender is not None else None,
+        retention=retention,
+    )
+    # SIGUSR1 (or POST /profile) profiles the next frames of the game loop
+    profiler = FrameProfiler(
+        profiles_path,
+        frames=getattr(settings, "profile_frames", 600),
+        interval=getattr(settings, "profile_interval_ms", 5) / 1000,
+    )
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, profiler.request)
+    except (AttributeError, NotImplementedError):
+        logging.info("SIGUSR1 profiling is not available on this platform")
+
+    benchmark = getattr(settings, "benchmark", False)
+    metrics_runner = None
+    metrics_port = getattr(settings, "metrics_port", 0)
+    # A benchmark runs next to the live recorder, which owns the port
+    if metrics_port and not benchmark:
+        metrics_runner = await start_metrics_server(
+            metrics,
+            getattr(settings, "metrics_host", "127.0.0.1"),
+            metrics_port,
+            profiler,
+        )
+
+    # Replays read all their games from one pass over the source
+    soak = create_soak_monitor()
+    # Soak runs replay the source over and over
+    frames = captured_frames(image_device, loop=soak is not None) if debug_mode else None
+    clock = create_clock(image_device) if debug_mode else None
+    # One detector for the whole run, so the interval is estimated once
+    gaps = create_gap_detector(image_device)
+    replay_start = time.monotonic()
+    soak_task = None
+    if soak is not None:
+        soak.start()
+        soak_task = asyncio.create_task(soak.run())
+    exit_code = 0
+    try:
+        while True:
+            source_ended = await game_loop(
+                image_device,
+                roi_ref,
+                retention,
+                video_queue,
+                sampler,
+                idle,
+                catalog,
+                profiler,
+                frames,
+                clock,
+                gaps,
+            )
+            if soak is not None and not source_ended:
+                soak.game_finished()
+                source_ended = soak.games >= getattr(settings, "soak_games", 20)
+            if debug_mode and source_ended:
+                replay_seconds = time.monotonic() - replay_start
+                # The source ended, don't profile the wait for the encodes
+                profiler.stop()
+                await video_queue.join()
+                # Don't wait for idle time, run the deferred encodes now
+                while deferred is not None and deferred.release_due(force=True):
+                    await video_queue.join()
+                if sender is not None:
+                    await sender.wait_idle()
+                await asyncio.gather(*_background_tasks)
+                if benchmark:
+                    output_bytes = path_size(videos_path) if videos_path.exists() else 0
+                    print(benchmark_report(metrics, replay_seconds, output_bytes))
+                if soak is not None:
+                    soak_task.cancel()
+                    soak.stop()
+                    print(soak.report())
+                    exit_code = 1 if soak.failures() else 0
+                logging.info("Debug mode: exiting after processing video")
+                break
+    finally:
+        if soak_task is not None:
+            soak_task.cancel()
+        if deferred_task is not None:
+            deferred_task.cancel()
+        if sender_task is not None:
+            sender_task.cancel()
+            sender.outbox.close()
+        if bot is not None:
+            await bot.session.close()
+        profiler.stop()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        catalog.close()
+    return exit_code
+
+
+def upload_limit() -> int | None:
+    """Maximum video size for upload in bytes, None if unlimited."""
+    max_mb = getattr(settings, "max_upload_mb", 50)
+    return int(max_mb * 1000 * 1000) if max_mb else None
+
+
+def create_renditions(name: str, duration: float) -> dict[str, Rendition]:
+    """Extra outputs enabled by the `video_renditions` setting.
+
+    Supported: "archive" (high quality MKV), "thumbnail" (JPEG poster of
+    the game over screen) and "preview" (short sped-up WebM or GIF, see
+    `preview_format`).
+    """
+    enabled = getattr(
+        settings, "video_renditions", ["thumbnail", "preview", "archive"]
+    )
+    preview_format = getattr(settings, "preview_format", "webm")
+    renditions = {}
+    if "archive" in enabled:
+        renditions["archive"] = archive_rendition(videos_path / f"{name}.archive.mkv")
+    if "thumbnail" in enabled:
+        renditions["thumbnail"] = thumbnail_rendition(videos_path / f"{name}.jpg")
+    if "preview" in enabled:
+        renditions["preview"] = preview_rendition(
+            videos_path / f"{name}.preview.{preview_format}",
+            duration,
+            seconds=getattr(settings, "preview_seconds", 10),
+        )
+    return renditions
+
+
+def expected_video_duration(
+    game_folder: Path,
+    frame_count: int | None = None,
+    real_duration: float | None = None,
+) -> float | None:
+    """Duration compile_video gives the video of a game, None if unknown."""
+    timestamps = game_folder / TIMESTAMPS_FILE
+    if timestamps.exists():
+        return timestamps_duration(timestamps)
+    if frame_count and real_duration and real_duration > 0:
+        return real_duration
+    if frame_count:
+        return frame_count / settings.fps
+    return None
 
 
 def compile_video(
     game_folder: Path,
     frame_count: int | None = None,
     real_duration: float | None = None,
-) -> Path:
+) -> dict[str, Path]:
     """Compile frames from a game folder into a video.
 
+    Games recorded with capture timestamps are encoded as variable frame
+    rate video with each frame shown for its real duration. Older folders
+    without timestamps fall back to a constant framerate. The extra
+    renditions (see create_renditions) are encoded from the same decode.
+
+    The video's bitrate is capped so it fits the Telegram upload limit
+    (`max_upload_mb`), and its size is verified before it is returned.
+
     Args:
         game_folder: Path to the game folder containing PNG frames
         frame_count: Number of recorded frames
         real_duration: Real game duration in seconds (excluding pauses)
 
     Returns:
-        Path to the created video file
+        Paths of the created files by rendition, "video" being the MP4
+        that is posted to Telegram
     """
     videos_path.mkdir(exist_ok=True)
     # Use the game folder name for the video (already timestamped)
     video_name = f"{game_folder.name}.mp4"
     video_path = videos_path / video_name
+    max_bytes = upload_limit()
+
+    timestamps = game_folder / TIMESTAMPS_FILE
+    archive = game_folder / ARCHIVE_FILE
+    if timestamps.exists():
+        logging.info("Using capture timestamps (variable framerate)")
+        duration = timestamps_duration(timestamps)
+        renditions = create_renditions(game_folder.name, duration)
+        # Long games are split into chunks encoded on several cores
+        create_video(
+            video_path,
+            timestamps=timestamps,
+            chunks=getattr(settings, "encode_chunks", 0),
+            renditions=list(renditions.values()),
+            max_bytes=max_bytes,
+            # Frames of deferred games were moved into the archive
+            source=archive if archive.exists() else None,
+        )
+        if max_bytes:
+            fit_to_size(video_path, max_bytes, duration)
+        return {"video": video_path} | {k: r.path for k, r in renditions.items()}
 
     # Calculate framerate to match real game duration
     if frame_count and real_duration and real_duration > 0:
@@ -374,8 +1349,18 @@ def compile_video(
         framerate = settings.fps
         logging.info(f"Using default framerate: {framerate} fps")
 
-    create_video(video_path, frames_path=game_folder / "*.png", framerate=framerate)
-    return video_path
+    duration = frame_count / framerate if frame_count else 0.0
+    renditions = create_renditions(game_folder.name, duration)
+    create_video(
+        video_path,
+        frames_path=game_folder / "*.png",
+        framerate=framerate,
+        renditions=list(renditions.values()),
+        max_bytes=max_bytes,
+    )
+    if max_bytes:
+        fit_to_size(video_path, max_bytes, duration)
+    return {"video": video_path} | {k: r.path for k, r in renditions.items()}
 
 
 def parse_args():
@@ -388,16 +1373,56 @@ def parse_args():
     parser.add_argument(
         "--video",
         type=str,
-        help="Path to video file (implies --debug)",
+        help="Path to video file, or a synthetic source such as "
+        "synthetic:games=2,fps=60 (implies --debug)",
     )
     parser.add_argument(
         "--no-bot",
         action="store_true",
         help="Skip Telegram bot integration (useful for testing)",
     )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Replay the video (or --video) into a temporary folder without the bot "
+        "and print a throughput report (implies --debug --no-bot)",
+    )
+    parser.add_argument(
+        "--soak",
+        type=int,
+        nargs="?",
+        const=-1,
+        metavar="GAMES",
+        help="Like --benchmark, but replay the video over and over for GAMES games "
+        "(default soak_games) and fail if memory, fds, threads or tasks keep growing",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Replay at this many frames per second instead of as fast as possible",
+    )
     return parser.parse_args()
 
 
+def run_benchmark() -> int:
+    """Run this script again with its data folders in a temporary folder.
+
+    The data paths are set when utils.dirs is imported, so the replay
+    runs in a child process with TETRIS_DATA_DIR pointing to the
+    temporary folder, which is removed afterwards. The child is marked
+    with BENCHMARK_CHILD_ENV, since TETRIS_DATA_DIR may also be set for
+    the live recorder.
+
+    Returns:
+        Exit code of the replay
+    """
+    with tempfile.TemporaryDirectory(prefix="tetris_benchmark_") as data_dir:
+        logging.info(f"Benchmark data folder: {data_dir}")
+        env = os.environ | {"TETRIS_DATA_DIR": data_dir, BENCHMARK_CHILD_ENV: "1"}
+        return subprocess.run([sys.executable] + sys.argv, env=env).returncode
+
+
 if __name__ == "__main__":
     args = parse_args()
     if args.debug or args.video:
@@ -406,4 +1431,17 @@ if __name__ == "__main__":
             settings.debug_video = args.video
     if args.no_bot:
         settings.no_bot = True
-    asyncio.run(main())
+    if args.rate:
+        settings.replay_fps = args.rate
+    if args.benchmark or args.soak is not None:
+        if not os.environ.get(BENCHMARK_CHILD_ENV):
+            logging.basicConfig(level=logging.INFO)
+            sys.exit(run_benchmark())
+        settings.debug = True
+        settings.no_bot = True
+        settings.benchmark = True
+        if args.soak is not None:
+            settings.soak = True
+            if args.soak > 0:
+                settings.soak_games = args.soak
+    sys.exit(asyncio.run(main()))
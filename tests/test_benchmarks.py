@@ -0,0 +1,39 @@
+import io
+import tempfile
+from pathlib import Path
+
+from benchmarks.micro import BenchmarkResult, compare, load, run, save
+
+
+def result(name: str, median: float) -> BenchmarkResult:
+    return BenchmarkResult(name, 10, median, median, median, median, 0.0)
+
+
+class TestMicroBenchmarks:
+    """Tests for the micro-benchmark baselines."""
+
+    def test_compare_flags_changes_over_threshold(self):
+        baseline = {n: result(n, 1.0) for n in ("a", "b", "c", "gone")}
+        current = {
+            "a": result("a", 1.05),
+            "b": result("b", 1.2),
+            "c": result("c", 0.5),
+            "added": result("added", 1.0),
+        }
+        verdicts = {row[0]: row[3] for row in compare(baseline, current, 0.1)}
+        assert verdicts == {
+            "a": "same",
+            "b": "slower",
+            "c": "faster",
+            "gone": "missing",
+            "added": "new",
+        }
+
+    def test_run_and_save_baseline(self):
+        results = run("get_countours", min_time=0.0, out=io.StringIO())
+        assert [r.name for r in results] == ["get_countours"]
+        assert results[0].calls >= 10
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "baseline.json"
+            save(results, path)
+            assert load(path) == {"get_countours": results[0]}
@@ -0,0 +1,107 @@
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from cv_tools.frame_generator import captured_frames, frame_generator
+from utils.capture_gaps import GapDetector
+
+
+class TestGapDetector:
+    """Tests for capture gap and loop stall detection."""
+
+    def test_counts_dropped_frames(self):
+        gaps = GapDetector(interval=0.1, live=False)
+        for t in (0.0, 0.1, 0.2, 0.5, 0.6):
+            gaps.update(t, t)
+        assert gaps.total.capture_gaps == 1
+        assert gaps.total.dropped_frames == 2
+        assert gaps.total.loop_stalls == 0
+
+    def test_jitter_is_not_a_gap(self):
+        gaps = GapDetector(interval=0.1, live=False)
+        for t in (0.0, 0.11, 0.19, 0.31, 0.4):
+            assert gaps.update(t, t) == 0
+        assert gaps.total.dropped_frames == 0
+
+    def test_estimates_interval_despite_gaps(self):
+        gaps = GapDetector(live=False, warmup=10)
+        times = [i / 30 for i in range(12)] + [0.5, 0.5 + 1 / 30]
+        del times[5]  # A gap during the warm-up
+        for t in times:
+            gaps.update(t, t)
+        assert abs(gaps.interval - 1 / 30) < 1e-6
+        # 0.5 comes 4 intervals after 11/30
+        assert gaps.total.dropped_frames == 3
+
+    def test_loop_stalls_only_for_live_sources(self):
+        for live, stalls, longest in ((True, 1, 0.35), (False, 0, 0.0)):
+            gaps = GapDetector(interval=0.1, live=live)
+            for t, loop_time in ((0.0, 0.0), (0.1, 0.1), (0.2, 0.45)):
+                gaps.update(t, loop_time)
+            assert gaps.total.loop_stalls == stalls
+            assert abs(gaps.total.longest_stall - longest) < 1e-9
+
+    def test_per_game_counts(self):
+        gaps = GapDetector(interval=0.1, live=False)
+        gaps.update(0.0, 0.0)
+        gaps.update(0.3, 0.3)
+        gaps.start_game()
+        gaps.update(0.4, 0.4)
+        gaps.update(0.6, 0.6)
+        assert gaps.total.dropped_frames == 3
+        assert gaps.game.as_dict()["dropped_frames"] == 1
+
+    def test_new_source_is_not_a_gap(self):
+        gaps = GapDetector(interval=0.1, live=True)
+        gaps.update(0.0, 0.0)
+        gaps.update(0.1, 0.1)
+        gaps.new_source()
+        # The capture was reopened a second later, with new timestamps
+        gaps.update(50.0, 1.1)
+        gaps.update(50.1, 1.2)
+        assert gaps.total.dropped_frames == 0
+        assert gaps.total.loop_stalls == 0
+        assert gaps.interval == 0.1
+
+    def test_frames_without_timestamps(self):
+        gaps = GapDetector(interval=0.1, live=False)
+        for _ in range(3):
+            assert gaps.update(None, 0.0) == 0
+        assert gaps.total.capture_gaps == 0
+
+
+class TestCapturedFrames:
+    """Tests for frames with backend timestamps."""
+
+    def test_video_file_timestamps(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "clip.avi"
+            writer = cv2.VideoWriter(
+                str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48)
+            )
+            for i in range(5):
+                writer.write(np.full((48, 64, 3), i * 40, dtype=np.uint8))
+            writer.release()
+
+            frames = list(captured_frames(path))
+        assert [f.sequence for f in frames] == [0, 1, 2, 3, 4, 5]
+        times = [f.device_time for f in frames[:-1]]
+        assert times == sorted(times)
+        assert abs(times[-1] - times[0] - 0.4) < 1e-6
+        # Black end frame without a timestamp
+        assert frames[-1].device_time is None
+        assert not frames[-1].image.any()
+
+    def test_image_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(3):
+                cv2.imwrite(
+                    str(Path(tmp) / f"{i:03d}.png"), np.zeros((8, 8, 3), np.uint8)
+                )
+            frames = list(captured_frames(Path(tmp)))
+            images = list(frame_generator(Path(tmp)))
+        assert [f.sequence for f in frames] == [0, 1, 2, 3]
+        assert all(f.device_time is None for f in frames)
+        assert len(images) == 4
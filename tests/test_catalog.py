@@ -0,0 +1,94 @@
+import tempfile
+from pathlib import Path
+
+from utils.catalog import GameCatalog
+from utils.journal import GameJournal
+
+
+class TestGameCatalog:
+    """Tests for the SQLite index of recorded games."""
+
+    def test_add_update_and_get(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            catalog = GameCatalog(Path(tmpdir) / "games.sqlite3")
+            folder = Path(tmpdir) / "game_2024_01_10_12_00_00"
+            catalog.add(folder, started_at="2024-01-10T12:00:00", valid=True)
+
+            catalog.update(
+                folder.name,
+                status="processed",
+                p1_score=1200,
+                frame_count=300,
+                video=Path(tmpdir) / "game.mp4",
+                video_bytes=4096,
+            )
+            entry = catalog.get(folder.name)
+
+            assert entry.folder == folder
+            assert entry.valid is True
+            assert entry.status == "processed"
+            assert entry.p1_score == 1200
+            assert entry.video == Path(tmpdir) / "game.mp4"
+            assert catalog.get("game_missing") is None
+
+    def test_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "games.sqlite3"
+            catalog = GameCatalog(path)
+            catalog.add(Path(tmpdir) / "game_1", frame_count=10)
+            catalog.close()
+
+            assert GameCatalog(path).get("game_1").frame_count == 10
+
+    def test_queries(self):
+        catalog = GameCatalog(":memory:")
+        for i, status in enumerate(["processed", "discarded", "processed", "failed"]):
+            catalog.add(
+                Path(f"game_{i}"),
+                started_at=f"2024-01-1{i}",
+                status=status,
+                valid=status != "discarded",
+                frames_bytes=100,
+            )
+        catalog.mark_removed(Path("game_0"))
+
+        assert [e.name for e in catalog.games(status="processed")] == [
+            "game_0",
+            "game_2",
+        ]
+        assert catalog.count(valid=False) == 1
+        assert [e.name for e in catalog.games(with_frames=True, limit=2)] == [
+            "game_1",
+            "game_2",
+        ]
+        assert catalog.games(newest_first=True, limit=1)[0].name == "game_3"
+        assert catalog.count(since="2024-01-12") == 2
+        assert catalog.total_bytes() == (300, 0)
+
+    def test_upload_status_follows_post(self):
+        catalog = GameCatalog(":memory:")
+        catalog.add(Path("game_1"), post_id=7, upload_status="pending")
+
+        catalog.update_post(7, "sent")
+
+        assert catalog.get("game_1").upload_status == "sent"
+
+    def test_sync_indexes_folders_and_notes_removed_ones(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            games = Path(tmpdir) / "games"
+            legacy = games / "game_2024_01_10_12_00_00"
+            legacy.mkdir(parents=True)
+            (legacy / "000001.png").write_bytes(b"x" * 100)
+            GameJournal(legacy, status="processed", final_p1_score=500).flush()
+            (games / "other").mkdir()
+            catalog = GameCatalog(":memory:")
+            catalog.add(games / "game_2023_12_31_12_00_00")
+
+            assert catalog.sync(games) == 1
+
+            entry = catalog.get(legacy.name)
+            assert entry.status == "processed"
+            assert entry.p1_score == 500
+            assert entry.frames_bytes > 100  # frame and journal
+            assert not catalog.get("game_2023_12_31_12_00_00").frames_present
+            assert catalog.sync(games) == 0
@@ -0,0 +1,57 @@
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from utils.clock import MediaClock, RealClock, create_clock
+
+
+class TestMediaClock:
+    """Tests for the clock driven by frame timestamps."""
+
+    def test_follows_timestamps(self):
+        clock = MediaClock()
+        start = clock.now()
+        monotonic = clock.monotonic()
+        for t in (12.0, 12.5, 14.0):
+            clock.tick(t)
+        assert clock.elapsed == pytest.approx(2.0)
+        assert (clock.now() - start).total_seconds() == pytest.approx(2.0)
+        assert clock.monotonic() - monotonic == pytest.approx(2.0)
+
+    def test_independent_of_processing_speed(self):
+        clock = MediaClock()
+        clock.tick(0.0)
+        start = clock.now()
+        time.sleep(0.05)
+        assert clock.now() == start
+
+    def test_frames_without_timestamps(self):
+        clock = MediaClock(fps=10)
+        for _ in range(3):
+            clock.tick(None)
+        assert clock.elapsed == pytest.approx(0.2)
+        # The last interval is used once timestamps were seen
+        clock = MediaClock()
+        for t in (1.0, 1.25, None):
+            clock.tick(t)
+        assert clock.elapsed == pytest.approx(0.5)
+
+    def test_never_runs_backwards(self):
+        clock = MediaClock()
+        for t in (5.0, 6.0, 5.5):
+            clock.tick(t)
+        assert clock.elapsed == pytest.approx(1.0)
+
+
+class TestCreateClock:
+    def test_devices_use_the_wall_clock(self):
+        clock = create_clock(Path("/dev/video0"))
+        assert isinstance(clock, RealClock)
+        clock.tick(123.0)
+        assert abs((datetime.now(clock.now().tzinfo) - clock.now()).total_seconds()) < 1
+
+    def test_replays_use_the_media_clock(self):
+        assert isinstance(create_clock(Path("gameplay.mp4")), MediaClock)
+        assert isinstance(create_clock("synthetic:games=2"), MediaClock)
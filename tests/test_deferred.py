@@ -0,0 +1,85 @@
+from pathlib import Path
+
+from utils.deferred import DeferredScheduler, IdleTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_idle_tracker():
+    clock = FakeClock()
+    tracker = IdleTracker(clock)
+    assert tracker.idle_for == 0
+
+    tracker.update(busy=False)
+    clock.now = 30
+    tracker.update(busy=False)
+    assert tracker.idle_for == 30
+
+    tracker.update(busy=True)
+    assert tracker.idle_for == 0
+
+
+class TestDeferredScheduler:
+    """Tests for releasing deferred encodes at idle time."""
+
+    def make(self, load=1.0, accept=True):
+        clock = FakeClock()
+        tracker = IdleTracker(clock)
+        released = []
+
+        def release(folder):
+            if accept:
+                released.append(folder.name)
+            return accept
+
+        scheduler = DeferredScheduler(
+            release, tracker, idle_seconds=60, max_load=0.3, load=lambda: load
+        )
+        return scheduler, tracker, clock, released
+
+    def test_waits_for_idle_time(self):
+        scheduler, tracker, clock, released = self.make()
+        scheduler.add(Path("game_1"))
+        scheduler.add(Path("game_2"))
+        tracker.update(busy=False)
+
+        clock.now = 59
+        assert scheduler.release_due() == 0
+        clock.now = 60
+        assert scheduler.release_due() == 1
+        assert scheduler.release_due() == 1
+        assert released == ["game_1", "game_2"]
+
+    def test_busy_recorder_blocks_release(self):
+        scheduler, tracker, clock, released = self.make()
+        scheduler.add(Path("game_1"))
+        tracker.update(busy=True)
+        clock.now = 1000
+
+        assert scheduler.release_due() == 0
+        assert scheduler.release_due(force=True) == 1
+
+    def test_low_load_releases_between_games(self):
+        scheduler, tracker, clock, released = self.make(load=0.1)
+        scheduler.add(Path("game_1"))
+
+        # Never during a game, however low the load
+        tracker.update(busy=True)
+        assert scheduler.release_due() == 0
+        tracker.update(busy=False)
+        assert scheduler.release_due() == 1
+
+    def test_rejected_release_is_kept(self):
+        scheduler, tracker, clock, released = self.make(load=0.1, accept=False)
+        scheduler.add(Path("game_1"))
+        scheduler.add(Path("game_1"))
+        tracker.update(busy=False)
+
+        assert scheduler.release_due() == 0
+        assert len(scheduler) == 1
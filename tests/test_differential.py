@@ -0,0 +1,76 @@
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import game_objects.frame
+from benchmarks.differential import (
+    compare_source,
+    default_sources,
+    format_report,
+    load_variant,
+    patched,
+)
+from cv_tools.find_game_over import find_game_over
+
+
+def always_game_over(image):
+    return True
+
+
+class TestDifferential:
+    """Tests for the differential check of detection variants."""
+
+    def test_reference_matches_itself(self, refs):
+        for name, frames in default_sources(video=False)[:5]:
+            result = compare_source(name, frames, {}, refs)
+            assert result.frames == 1
+            assert result.ok
+
+    def test_reports_mismatches_with_thumbnails(self, load_image, refs):
+        frames = [load_image("game_versus.png"), load_image("menu.png")]
+        with tempfile.TemporaryDirectory() as tmp:
+            result = compare_source(
+                "frames", frames, {"find_game_over": always_game_over}, refs, Path(tmp)
+            )
+            assert [m.frame_number for m in result.mismatches] == [0]
+            mismatch = result.mismatches[0]
+            assert mismatch.fields["p1_game_over"] == (False, True)
+            assert mismatch.fields["p2_game_over"] == (False, True)
+            assert Path(mismatch.thumbnail).exists()
+        assert "frame 0: " in format_report([result])
+
+    def test_state_transitions_are_compared(self, load_image, refs):
+        frames = [load_image("menu.png"), load_image("game_started_multi.png")]
+        frames += [load_image("game_versus.png")] * 2 + [frames[0] * 0]
+        result = compare_source(
+            "game", frames, {"find_game_over": always_game_over}, refs
+        )
+        assert ("GAME", "GAME_OVER") not in [
+            t[1:] for t in result.reference_transitions
+        ]
+        assert ("GAME", "GAME_OVER") in [t[1:] for t in result.variant_transitions]
+        assert not result.transitions_match
+
+    def test_variant_exceptions_are_mismatches(self, load_image, refs):
+        def broken(image):
+            raise RuntimeError("boom")
+
+        result = compare_source("x", [load_image("menu.png")], {"Frame": broken}, refs)
+        assert result.mismatches[0].fields["exception"] == (None, "RuntimeError: boom")
+
+    def test_patched_restores_the_reference(self):
+        with patched({"find_game_over": always_game_over}):
+            assert game_objects.frame.find_game_over is always_game_over
+        assert game_objects.frame.find_game_over is find_game_over
+
+    def test_load_variant(self):
+        target, func = load_variant(
+            "find_game_over=tests.test_differential:always_game_over"
+        )
+        assert target == "find_game_over"
+        assert func is always_game_over
+        with pytest.raises(ValueError):
+            load_variant("unknown=tests.test_differential:always_game_over")
+        with pytest.raises(ValueError):
+            load_variant("find_game_over=always_game_over")
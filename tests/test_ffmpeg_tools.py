@@ -0,0 +1,392 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.ffmpeg_tools import (
+    ProcessLimits,
+    archive_rendition,
+    choose_chunk_count,
+    create_video,
+    fit_to_size,
+    frame_durations,
+    is_valid_video,
+    preview_rendition,
+    remux_frames,
+    set_process_limits,
+    size_budget_args,
+    split_range,
+    target_bitrate,
+    thumbnail_rendition,
+    video_duration,
+    write_concat_file,
+)
+
+
+class TestFrameDurations:
+    """Tests for deriving per-frame durations from capture timestamps."""
+
+    def test_durations_with_end(self):
+        frames = [("a.png", 1.0), ("b.png", 1.5), ("c.png", 3.0)]
+        assert frame_durations(frames, end=3.25) == [0.5, 1.5, 0.25]
+
+    def test_last_duration_falls_back_to_median(self):
+        frames = [("a.png", 0.0), ("b.png", 0.1), ("c.png", 0.2), ("d.png", 1.2)]
+        durations = frame_durations(frames)
+        assert durations[-1] == pytest.approx(0.1)
+
+    def test_single_frame_uses_default(self):
+        assert frame_durations([("a.png", 0.0)], default=0.04) == [0.04]
+
+
+def test_write_concat_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "frames.ffconcat"
+        total = write_concat_file(path, [("a.png", 1.0), ("b.png", 1.5)], end=2.0)
+
+        assert total == pytest.approx(1.0)
+        assert path.read_text().splitlines() == [
+            "ffconcat version 1.0",
+            "file 'a.png'",
+            "duration 0.500000",
+            "file 'b.png'",
+            "duration 0.500000",
+            "file 'b.png'",
+        ]
+
+
+def test_create_video_uses_timestamps():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        timestamps = Path(tmpdir) / "timestamps.txt"
+        timestamps.write_text("000001.png\t1.0\t1\n000002.png\t1.1\t2\nend\t1.2\n")
+        proc = MagicMock(returncode=0)
+        proc.communicate.return_value = (b"", b"")
+
+        with patch("utils.ffmpeg_tools.ffmpeg_cmd", return_value=proc) as cmd:
+            create_video(Path(tmpdir) / "out.mp4", timestamps=timestamps)
+
+        args = cmd.call_args[0][0]
+        assert "-f concat" in args
+        assert "-fps_mode vfr" in args
+        assert (Path(tmpdir) / "frames.ffconcat").exists()
+
+
+def test_create_video_raises_on_failure():
+    proc = MagicMock(returncode=1)
+    proc.communicate.return_value = (b"", b"boom")
+
+    with patch("utils.ffmpeg_tools.ffmpeg_cmd", return_value=proc):
+        with pytest.raises(RuntimeError, match="boom"):
+            create_video(Path("out.mp4"))
+
+
+def test_choose_chunk_count():
+    assert choose_chunk_count(30, cores=8) == 1
+    assert choose_chunk_count(20 * 60, cores=8, min_chunk_seconds=120) == 7
+    assert choose_chunk_count(5 * 60, cores=8, min_chunk_seconds=120) == 2
+    assert choose_chunk_count(20 * 60, cores=1) == 1
+
+
+class TestProcessLimits:
+    """Tests for running ffmpeg with lower priority and fewer threads."""
+
+    def test_default_runs_plain_ffmpeg(self):
+        limits = ProcessLimits()
+        assert limits.command_prefix() == []
+        assert limits.thread_args() == []
+        assert limits.global_args() == []
+
+    def test_command_prefix(self):
+        limits = ProcessLimits(nice=10, ionice_class=2, ionice_level=7, cpus=(2, 3))
+        assert limits.command_prefix() == [
+            "nice",
+            "-n 10",
+            "ionice",
+            "-c 2",
+            "-n 7",
+            "taskset",
+            "-c 2,3",
+        ]
+
+    def test_missing_tools_are_skipped(self):
+        limits = ProcessLimits(nice=10, ionice_class=3)
+        with patch("utils.ffmpeg_tools.shutil.which", return_value=None):
+            assert limits.command_prefix() == []
+
+    def test_limits_apply_to_every_output(self):
+        set_process_limits(ProcessLimits(nice=5, threads=2))
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                folder = Path(tmpdir)
+                timestamps = folder / "timestamps.txt"
+                timestamps.write_text("000001.png\t1.0\t1\nend\t1.1\n")
+                proc = MagicMock(returncode=0)
+                proc.communicate.return_value = (b"", b"")
+                renditions = [thumbnail_rendition(folder / "out.jpg")]
+
+                with patch(
+                    "utils.ffmpeg_tools.subprocess.Popen", return_value=proc
+                ) as popen:
+                    create_video(
+                        folder / "out.mp4", timestamps=timestamps, renditions=renditions
+                    )
+
+            command = popen.call_args[0][0]
+            assert command.startswith("exec nice -n 5 ffmpeg -filter_threads 2")
+            # Once for the decoder and once per output
+            assert command.count("-threads 2") == 3
+        finally:
+            set_process_limits(ProcessLimits())
+
+    def test_pinned_cores_pick_chunk_count(self):
+        set_process_limits(ProcessLimits(cpus=(1, 2, 3)))
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                folder = Path(tmpdir)
+                timestamps = folder / "timestamps.txt"
+                lines = [f"{i:06d}.png\t{i * 60.0:.1f}\t{i}" for i in range(20)]
+                timestamps.write_text("\n".join(lines + ["end\t1200.0"]) + "\n")
+
+                with patch("utils.ffmpeg_tools.create_video_chunked") as chunked:
+                    with patch("utils.ffmpeg_tools.create_renditions"):
+                        create_video(
+                            folder / "out.mp4", timestamps=timestamps, chunks=0
+                        )
+
+            assert chunked.call_args[0][2] == 3
+        finally:
+            set_process_limits(ProcessLimits())
+
+
+def test_split_range():
+    assert split_range(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert split_range(2, 4) == [(0, 1), (1, 2)]
+
+
+def test_create_video_chunked():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = Path(tmpdir)
+        timestamps = folder / "timestamps.txt"
+        lines = [f"{i:06d}.png\t{i * 0.1:.1f}\t{i}" for i in range(6)]
+        timestamps.write_text("\n".join(lines + ["end\t0.6"]) + "\n")
+        proc = MagicMock(returncode=0)
+        proc.communicate.return_value = (b"", b"")
+        lists = {}
+
+        def run(args):
+            # Chunk lists are deleted afterwards, read them while encoding
+            for path in folder.glob("*.ffconcat"):
+                lists[path.name] = path.read_text()
+            return proc
+
+        with patch("utils.ffmpeg_tools.ffmpeg_cmd", side_effect=run) as cmd:
+            create_video(folder / "out.mp4", timestamps=timestamps, chunks=3)
+
+        calls = [c[0][0] for c in cmd.call_args_list]
+        assert len(calls) == 4
+        assert all("-c:v libx264" in args for args in calls[:3])
+        assert "-c copy" in calls[3]
+        # Only the last chunk repeats its final frame
+        assert lists["chunk_000.ffconcat"].count("000001.png") == 1
+        assert lists["chunk_002.ffconcat"].count("000005.png") == 2
+        assert "chunk_002.mp4" in lists["chunks.ffconcat"]
+        assert not list(folder.glob("chunk*"))
+
+
+def test_create_video_with_renditions_decodes_once():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        folder = Path(tmpdir)
+        timestamps = folder / "timestamps.txt"
+        timestamps.write_text("000001.png\t1.0\t1\n000002.png\t1.1\t2\nend\t1.2\n")
+        proc = MagicMock(returncode=0)
+        proc.communicate.return_value = (b"", b"")
+        renditions = [
+            archive_rendition(folder / "a.mkv"),
+            thumbnail_rendition(folder / "t.jpg"),
+        ]
+
+        with patch("utils.ffmpeg_tools.ffmpeg_cmd", return_value=proc) as cmd:
+            create_video(
+                folder / "out.mp4", timestamps=timestamps, renditions=renditions
+            )
+
+        assert cmd.call_count == 1
+        args = " ".join(cmd.call_args[0][0])
+        assert args.count("-i ") == 1
+        assert "[0:v]split=3[s0][s1][s2];[s2]fps=1,signalstats," in args
+        assert args.count("-fps_mode vfr") == 3
+        assert "-map '[s0]' -fps_mode vfr -c:v libx264 -pix_fmt yuv420p" in args
+        assert (
+            f"-map '[o2]' -fps_mode vfr -update 1 -q:v 3 '{folder / 't.jpg'}'" in args
+        )
+
+
+def test_preview_rendition_speed():
+    preview = preview_rendition(Path("p.webm"), duration=300, seconds=10)
+    assert preview.filters.startswith("setpts=PTS/30.000,")
+    assert "-c:v libvpx-vp9" in preview.args
+    assert preview_rendition(Path("p.gif"), duration=5).filters.startswith(
+        "setpts=PTS/1.000,"
+    )
+
+
+def test_size_budget_args():
+    # 50 MB over 10 minutes leaves ~633 kbit/s for video
+    assert target_bitrate(600, 50_000_000) == 633
+    assert size_budget_args(600, 50_000_000) == [
+        "-crf 23",
+        "-maxrate 633k",
+        "-bufsize 1266k",
+    ]
+
+
+def test_create_video_with_size_budget():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        timestamps = Path(tmpdir) / "timestamps.txt"
+        timestamps.write_text("000001.png\t0.0\t1\n000002.png\t5.0\t2\nend\t10.0\n")
+        proc = MagicMock(returncode=0)
+        proc.communicate.return_value = (b"", b"")
+
+        with patch("utils.ffmpeg_tools.ffmpeg_cmd", return_value=proc) as cmd:
+            duration = create_video(
+                Path(tmpdir) / "out.mp4", timestamps=timestamps, max_bytes=1_000_000
+            )
+
+        assert duration == pytest.approx(10.0)
+        assert "-maxrate 760k" in cmd.call_args[0][0]
+
+
+class TestFitToSize:
+    """Tests for verifying and enforcing the upload size budget."""
+
+    def test_fitting_video_is_untouched(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            video = Path(tmpdir) / "out.mp4"
+            video.write_bytes(b"x" * 100)
+
+            with patch("utils.ffmpeg_tools.ffmpeg_cmd") as cmd:
+                assert fit_to_size(video, 100, 10.0) == 100
+            cmd.assert_not_called()
+
+    def test_oversized_video_is_reencoded_two_pass(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            video = Path(tmpdir) / "out.mp4"
+            video.write_bytes(b"x" * 200)
+            proc = MagicMock(returncode=0)
+            proc.communicate.return_value = (b"", b"")
+
+            def run(args):
+                if "-pass 2" in args:
+                    video.with_suffix(".fit.mp4").write_bytes(b"x" * 90)
+                return proc
+
+            with patch("utils.ffmpeg_tools.ffmpeg_cmd", side_effect=run) as cmd:
+                assert fit_to_size(video, 100, 10.0) == 90
+
+            passes = [
+                a for c in cmd.call_args_list for a in c[0][0] if a.startswith("-pass ")
+            ]
+            assert passes == ["-pass 1", "-pass 2"]
+
+    def test_raises_when_it_never_fits(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            video = Path(tmpdir) / "out.mp4"
+            video.write_bytes(b"x" * 200)
+            proc = MagicMock(returncode=0)
+            proc.communicate.return_value = (b"", b"")
+
+            def run(args):
+                if "-pass 2" in args:
+                    video.with_suffix(".fit.mp4").write_bytes(b"x" * 150)
+                return proc
+
+            with patch("utils.ffmpeg_tools.ffmpeg_cmd", side_effect=run):
+                with pytest.raises(RuntimeError, match="over the"):
+                    fit_to_size(video, 100, 10.0)
+
+
+def test_remux_frames_copies_without_encoding():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        timestamps = Path(tmpdir) / "timestamps.txt"
+        timestamps.write_text("000001.png\t1.0\t1\n000002.png\t1.5\t2\nend\t2.0\n")
+        proc = MagicMock(returncode=0)
+        proc.communicate.return_value = (b"", b"")
+
+        with patch("utils.ffmpeg_tools.ffmpeg_cmd", return_value=proc) as cmd:
+            duration = remux_frames(timestamps, Path(tmpdir) / "frames.mkv")
+
+        args = cmd.call_args[0][0]
+        assert duration == pytest.approx(1.0)
+        assert "-c copy" in args
+        assert not any("libx264" in a for a in args)
+
+
+class TestIsValidVideo:
+    """Tests for the check that gates deleting the source frames."""
+
+    def probe(self, stdout: bytes):
+        proc = MagicMock(returncode=0)
+        proc.communicate.return_value = (stdout, b"")
+        return patch("utils.ffmpeg_tools.ffmpeg_cmd", return_value=proc)
+
+    def test_duration_from_packets(self):
+        # The last packet in decode order isn't the last one shown
+        packets = (
+            b"#tb 0: 1/12800\n"
+            b"#media_type 0: video\n"
+            b"0,      -1024,          0,      512,     5000, 0x00000001\n"
+            b"0,       -512,    1024000,      512,      300, 0x00000002, F=0x0\n"
+            b"0,          0,      51200,      512,      300, 0x00000003, F=0x0\n"
+        )
+        with self.probe(packets):
+            assert video_duration(Path("x.mp4")) == pytest.approx(80.04)
+        with self.probe(b""):
+            assert video_duration(Path("x.mp4")) is None
+
+    def test_checks_duration(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            video = Path(tmpdir) / "out.mp4"
+            assert not is_valid_video(video)
+            video.write_bytes(b"x" * 100)
+            assert is_valid_video(video)
+            with self.probe(b"#tb 0: 1/1000\n0, 0, 0, 59800, 100, 0x1\n"):
+                assert is_valid_video(video, 60.0)
+            # A chunk missing from the join
+            with self.probe(b"#tb 0: 1/1000\n0, 0, 0, 45000, 100, 0x1\n"):
+                assert not is_valid_video(video, 60.0)
+            # Killed before the header was written
+            with self.probe(b""):
+                assert not is_valid_video(video, 60.0)
+
+    @pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg")
+    def test_frame_held_before_the_end(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            lines = []
+            timestamp = 0.0
+            for i in range(30):
+                image = np.zeros((64, 96, 3), dtype=np.uint8)
+                cv2.putText(image, str(i), (10, 40), 0, 1, (255, 255, 255), 2)
+                cv2.imwrite(str(folder / f"{i:06d}.png"), image)
+                lines.append(f"{i:06d}.png\t{timestamp:.6f}\t{i}")
+                # A static screen shown for 3s, two frames before the end
+                timestamp += 3.0 if i == 28 else 1 / 30
+            lines.append(f"end\t{timestamp:.6f}")
+            timestamps = folder / "timestamps.txt"
+            timestamps.write_text("\n".join(lines) + "\n")
+
+            video = folder / "game.mp4"
+            duration = create_video(video, timestamps=timestamps)
+            archive = folder / "frames.mkv"
+            remux_frames(timestamps, archive)
+
+            # The MP4 header says about 1s here
+            assert is_valid_video(video, duration)
+            assert is_valid_video(archive, duration)
+            truncated = folder / "truncated.mp4"
+            truncated.write_bytes(video.read_bytes()[: video.stat().st_size // 2])
+            assert not is_valid_video(truncated, duration)
@@ -1,5 +1,6 @@
 import pytest
 
+from cv_tools.strip_frame import strip_frame
 from game_objects.frame_classifier import FrameClassifier
 
 
@@ -133,3 +134,14 @@ def test_classifier_game_over(img_name, expected_game_over, load_image, refs):
     info = classifier.classify(frame)
 
     assert (info.p1_game_over, info.p2_game_over) == expected_game_over
+
+
+def test_classifier_game_rect(load_image, refs):
+    """The game area found by strip_frame is exposed for recording."""
+    classifier = FrameClassifier(refs)
+    frame = load_image("326_2580.png")
+    info = classifier.classify(frame)
+
+    x, y, w, h = info.game_rect
+    assert w % 2 == 0 and h % 2 == 0
+    assert (frame[y : y + h, x : x + w] == strip_frame(frame)).all()
@@ -0,0 +1,45 @@
+import numpy as np
+
+from cv_tools.frame_diff import FrameDeduplicator
+
+
+def make_image(value: int = 0) -> np.ndarray:
+    return np.full((108, 192, 3), value, dtype=np.uint8)
+
+
+class TestFrameDeduplicator:
+    """Tests for duplicate frame detection."""
+
+    def test_first_frame_is_not_duplicate(self):
+        dedup = FrameDeduplicator()
+        assert dedup.is_duplicate(make_image()) is False
+
+    def test_identical_frame_is_duplicate(self):
+        dedup = FrameDeduplicator()
+        dedup.is_duplicate(make_image())
+        assert dedup.is_duplicate(make_image()) is True
+
+    def test_noise_within_tolerance_is_duplicate(self):
+        dedup = FrameDeduplicator(pixel_tolerance=16)
+        dedup.is_duplicate(make_image(100))
+        assert dedup.is_duplicate(make_image(110)) is True
+
+    def test_changed_block_is_not_duplicate(self):
+        dedup = FrameDeduplicator(stride=8)
+        dedup.is_duplicate(make_image())
+        changed = make_image()
+        changed[40:80, 40:80] = 255
+        assert dedup.is_duplicate(changed) is False
+
+    def test_compares_against_last_kept_frame(self):
+        """Slow drift must not hide behind a chain of near-duplicates."""
+        dedup = FrameDeduplicator(pixel_tolerance=16)
+        dedup.is_duplicate(make_image(100))
+        assert dedup.is_duplicate(make_image(110)) is True
+        assert dedup.is_duplicate(make_image(120)) is False
+
+    def test_reset(self):
+        dedup = FrameDeduplicator()
+        dedup.is_duplicate(make_image())
+        dedup.reset()
+        assert dedup.is_duplicate(make_image()) is False
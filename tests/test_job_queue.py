@@ -0,0 +1,104 @@
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from utils.job_queue import JobQueue
+
+
+@pytest.mark.asyncio
+async def test_fifo_order_and_worker_limit():
+    order = []
+    active = 0
+    max_active = 0
+
+    async def handle(folder):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        order.append(folder.name)
+        active -= 1
+
+    queue = JobQueue(handle, workers=2)
+    queue.start()
+    for i in range(6):
+        assert queue.submit_nowait(Path(f"game_{i}"))
+    await queue.join()
+    await queue.stop()
+
+    assert sorted(order) == [f"game_{i}" for i in range(6)]
+    assert order[:2] == ["game_0", "game_1"]
+    assert max_active == 2
+    assert queue.stats.completed == 6
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_rejects_when_full():
+    queue = JobQueue(lambda folder: asyncio.sleep(0), max_size=2)
+
+    assert queue.submit_nowait(Path("game_1"))
+    assert not queue.submit_nowait(Path("game_1"))  # Already queued
+    assert queue.submit_nowait(Path("game_2"))
+    assert queue.full
+    assert not queue.submit_nowait(Path("game_3"))
+    assert queue.depth == 2
+    assert queue.stats.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_submit_waits_for_room():
+    queue = JobQueue(lambda folder: asyncio.sleep(0), max_size=1)
+    queue.submit_nowait(Path("game_1"))
+
+    waiting = asyncio.create_task(queue.submit(Path("game_2")))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+
+    queue.start()
+    assert await waiting
+    await queue.join()
+    await queue.stop()
+    assert queue.stats.completed == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_job_does_not_stop_worker():
+    async def handle(folder):
+        if folder.name == "bad":
+            raise RuntimeError("encode failed")
+
+    queue = JobQueue(handle)
+    queue.start()
+    queue.submit_nowait(Path("bad"))
+    queue.submit_nowait(Path("good"))
+    await queue.join()
+    await queue.stop()
+
+    assert queue.stats.failed == 1
+    assert queue.stats.completed == 1
+
+
+@pytest.mark.asyncio
+async def test_pending_jobs_are_persisted():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        state_path = Path(tmpdir) / "queue.json"
+        queue = JobQueue(lambda folder: asyncio.sleep(0), state_path=state_path)
+        queue.submit_nowait(Path("game_2"), enqueued_at=20.0)
+        queue.submit_nowait(Path("game_1"), enqueued_at=10.0)
+
+        saved = json.loads(state_path.read_text())
+        assert [e["folder"] for e in saved] == ["game_2", "game_1"]
+
+        pending = JobQueue(None, state_path=state_path).load_pending()
+        assert [(j.folder.name, j.enqueued_at) for j in pending] == [
+            ("game_2", 20.0),
+            ("game_1", 10.0),
+        ]
+
+        queue.start()
+        await queue.join()
+        await queue.stop()
+        assert json.loads(state_path.read_text()) == []
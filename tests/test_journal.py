@@ -0,0 +1,140 @@
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from utils.journal import JOURNAL_FILE, GameJournal, find_unfinished_games
+
+
+def make_game(root: Path, name: str, **fields) -> GameJournal:
+    folder = root / name
+    folder.mkdir(parents=True)
+    journal = GameJournal(folder, **fields)
+    journal.flush()
+    return journal
+
+
+class TestGameJournal:
+    """Tests for the per-game crash journal."""
+
+    def test_flush_and_load(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            journal = make_game(Path(tmpdir), "game_1", valid=True)
+            journal.mark(
+                "recorded", frame_count=120, final_p1_score=300, final_p2_score=500
+            )
+
+            loaded = GameJournal.load(journal.folder)
+
+            assert loaded.status == "recorded"
+            assert loaded.valid is True
+            assert loaded.frame_count == 120
+            assert loaded.final_p1_score == 300
+            assert loaded.final_p2_score == 500
+            assert loaded.started_at == journal.started_at
+
+    def test_update_is_throttled(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            journal = make_game(Path(tmpdir), "game_1", flush_interval=3600)
+
+            journal.update(frame_count=50)
+
+            assert journal.frame_count == 50
+            assert GameJournal.load(journal.folder).frame_count == 0
+
+    def test_load_missing_or_corrupt(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            assert GameJournal.load(folder) is None
+            (folder / JOURNAL_FILE).write_text("{not json")
+            assert GameJournal.load(folder) is None
+
+    def test_find_unfinished_games(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            make_game(root, "game_3", status="recorded")
+            make_game(root, "game_1", status="recording")
+            make_game(root, "game_2", status="processed")
+            make_game(root, "game_4", status="discarded")
+            (root / "game_5").mkdir()
+
+            unfinished = find_unfinished_games(root)
+
+            assert [j.folder.name for j in unfinished] == ["game_1", "game_3"]
+
+
+@pytest.mark.asyncio
+async def test_recover_unfinished_games():
+    import main
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        make_game(root, "game_1", status="recording", valid=False, frame_count=10)
+        make_game(root, "game_2", status="recording", valid=True, frame_count=10)
+        make_game(root, "game_3", status="recorded", valid=True, attempts=3)
+        make_game(root, "game_4", status="recorded", valid=True, frame_count=10)
+        retention = main.RetentionManager({"games": 10**9, "videos": 10**9})
+        processed = []
+
+        async def handle(folder):
+            processed.append(folder.name)
+
+        queue = main.JobQueue(handle, state_path=root / "queue.json")
+        # game_4 was queued before game_2 by the previous run
+        queue.state_path.write_text(
+            json.dumps([{"folder": str(root / "game_4"), "enqueued_at": 1.0}])
+        )
+        queue.start()
+
+        with patch("main.games_path", root):
+            main.recover_unfinished_games(retention, queue)
+            await asyncio.gather(*main._background_tasks)
+            await queue.join()
+        await queue.stop()
+
+        assert processed == ["game_4", "game_2"]
+        assert GameJournal.load(root / "game_1").status == "discarded"
+        assert GameJournal.load(root / "game_3").status == "failed"
+        assert retention.is_protected(root / "game_2")
+        assert queue.stats.wait_max > 1000  # Original enqueue time was kept
+
+
+@pytest.mark.asyncio
+async def test_close_interrupted_game():
+    import main
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        retention = main.RetentionManager({"games": 10**9, "videos": 10**9})
+        queued = []
+
+        async def handle(folder):
+            queued.append(folder.name)
+
+        queue = main.JobQueue(handle, state_path=root / "queue.json")
+        queue.start()
+        for name, valid in (("game_1", True), ("game_2", False)):
+            folder = root / name
+            folder.mkdir()
+            retention.protect(folder)
+            recorder = main.GameRecorder(folder)
+            recorder.add_frame(0, 1.0)
+            journal = GameJournal(folder)
+            main.close_interrupted_game(recorder, journal, valid, retention, queue)
+            assert (folder / "timestamps.txt").read_text().endswith("end\t1.000000\n")
+        await queue.join()
+        await queue.stop()
+
+        journal = GameJournal.load(root / "game_1")
+        assert (journal.status, journal.interrupted, journal.frame_count) == (
+            "recorded",
+            True,
+            1,
+        )
+        assert queued == ["game_1"]
+        assert retention.is_protected(root / "game_1")
+        assert GameJournal.load(root / "game_2").status == "discarded"
+        assert not retention.is_protected(root / "game_2")
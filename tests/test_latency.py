@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from game_objects.frame_classifier import CumulativeTimingStats, TimingStats
+from utils.latency import LatencyHistogram
+
+
+class TestLatencyHistogram:
+    """Tests for log-bucketed latency histograms."""
+
+    def test_quantiles_within_bucket_error(self):
+        rng = random.Random(1)
+        values = [rng.lognormvariate(-5, 1) for _ in range(10000)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        values.sort()
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            # One bucket is 2 ** (1/4) wide
+            assert exact <= histogram.quantile(q) <= exact * 1.2
+        assert histogram.max == values[-1]
+        assert histogram.quantile(1.0) == values[-1]
+
+    def test_out_of_range_values(self):
+        histogram = LatencyHistogram(min_value=1e-3, max_value=1.0)
+        histogram.record(0.0)
+        histogram.record(50.0)
+
+        assert histogram.quantile(0.5) == pytest.approx(1e-3)
+        assert histogram.quantile(1.0) == 50.0
+
+    def test_merge(self):
+        a, b = LatencyHistogram(), LatencyHistogram()
+        for _ in range(90):
+            a.record(0.001)
+        for _ in range(10):
+            b.record(0.1)
+
+        a.merge(b)
+
+        assert a.count == 100
+        assert a.quantile(0.5) == pytest.approx(0.001, rel=0.2)
+        assert a.quantile(0.99) == pytest.approx(0.1, rel=0.2)
+        assert a.max == 0.1
+
+    def test_merge_rejects_other_layout(self):
+        with pytest.raises(ValueError):
+            LatencyHistogram().merge(LatencyHistogram(buckets_per_octave=8))
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        assert histogram.quantile(0.99) == 0.0
+        assert str(histogram) == "-"
+
+
+def test_cumulative_timing_skips_stages_not_run():
+    stats = CumulativeTimingStats()
+    stats.add(TimingStats(strip_time=0.002, total_time=0.003))
+    stats.add(TimingStats(strip_time=0.002, score_detect_time=0.01, total_time=0.013))
+
+    summary = stats.summary()
+
+    assert summary["strip"]["count"] == 2
+    assert summary["score"]["count"] == 1
+    assert "pause" not in summary
+    assert "score: p50=" in stats.percentile_str()
+
+    other = CumulativeTimingStats()
+    other.merge(stats)
+    stats.reset()
+    assert other.frame_count == 2 and stats.frame_count == 0
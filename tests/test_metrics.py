@@ -0,0 +1,125 @@
+import tempfile
+from pathlib import Path
+
+import pytest
+from aiohttp import ClientSession
+
+from game_objects.frame_classifier import TimingStats
+from utils.job_queue import JobQueue
+from utils.metrics import (
+    benchmark_report,
+    Histogram,
+    RateMeter,
+    RecorderMetrics,
+    start_metrics_server,
+)
+from utils.profiler import FrameProfiler
+from utils.retention import RetentionManager
+
+
+def test_histogram_is_cumulative():
+    histogram = Histogram([0.01, 0.1])
+    for value in (0.005, 0.05, 0.05, 2.0):
+        histogram.observe(value)
+
+    assert histogram.samples("t", 'stage="x"') == [
+        't_bucket{stage="x",le="0.01"} 1',
+        't_bucket{stage="x",le="0.1"} 3',
+        't_bucket{stage="x",le="+Inf"} 4',
+        't_sum{stage="x"} 2.105000',
+        't_count{stage="x"} 4',
+    ]
+
+
+def test_rate_meter():
+    now = [0.0]
+    meter = RateMeter(window=1.0, clock=lambda: now[0])
+    for _ in range(30):
+        now[0] += 0.04
+        meter.tick()
+
+    assert meter.total == 30
+    assert meter.rate == pytest.approx(25.0)
+
+
+def test_render_includes_components():
+    metrics = RecorderMetrics()
+    metrics.state = "GAME"
+    metrics.observe_timing(TimingStats(strip_time=0.003, total_time=0.004))
+
+    async def handler(folder):
+        pass
+
+    metrics.bind(
+        video_queue=JobQueue(handler),
+        retention=RetentionManager({"games": 100, "videos": 200}),
+    )
+    text = metrics.render()
+
+    assert 'tetris_game_state{state="GAME"} 1' in text
+    assert 'tetris_game_state{state="MENU"} 0' in text
+    assert "tetris_frames_classified_total 1" in text
+    assert 'tetris_classify_stage_seconds_count{stage="strip"} 1' in text
+    # Stages that didn't run are not observed
+    assert 'tetris_classify_stage_seconds_count{stage="score"} 0' in text
+    assert "tetris_video_queue_waiting 0" in text
+    assert 'tetris_storage_budget_bytes{category="videos"} 200' in text
+    assert "tetris_disk_free_bytes" in text
+
+
+def test_benchmark_report():
+    metrics = RecorderMetrics()
+    metrics.captured.tick(200)
+    metrics.observe_timing(
+        TimingStats(strip_time=1.0, is_paused_time=0.5, total_time=2.0)
+    )
+    metrics.record_seconds.observe(3.0)
+    metrics.bytes_recorded = 5_000_000
+    report = benchmark_report(metrics, 10.0, output_bytes=2_000_000)
+
+    assert "200 in 10.0s, 20.0 fps sustained" in report
+    assert "Classifications: 1" in report
+    assert "5.0 MB" in report
+    assert "Peak RSS" in report
+    assert "strip            1.00s  10.0%" in report
+    assert "record           3.00s  30.0%" in report
+    # Loop time that is neither classification nor recording
+    assert "other            5.00s  50.0%" in report
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    metrics = RecorderMetrics()
+    metrics.captured.tick(5)
+    runner = await start_metrics_server(metrics, port=0)
+    try:
+        port = runner.addresses[0][1]
+        async with ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                assert response.status == 200
+                assert response.headers["Content-Type"].startswith("text/plain")
+                text = await response.text()
+    finally:
+        await runner.cleanup()
+
+    assert "tetris_frames_captured_total 5" in text
+
+
+@pytest.mark.asyncio
+async def test_profile_endpoint():
+    profiler = FrameProfiler(Path(tempfile.gettempdir()) / "profiles")
+    runner = await start_metrics_server(RecorderMetrics(), port=0, profiler=profiler)
+    try:
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}/profile"
+        async with ClientSession() as session:
+            for frames in ("-5", "0", "many"):
+                async with session.post(url, params={"frames": frames}) as response:
+                    assert response.status == 400
+            async with session.post(url, params={"frames": "50"}) as response:
+                assert response.status == 202
+            async with session.post(url) as response:
+                assert response.status == 409
+    finally:
+        await runner.cleanup()
+
+    assert profiler._requested == 50
@@ -0,0 +1,94 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from cv_tools.frame_diff import dhash, hamming_distance
+from utils.not_tetris_sampler import INDEX_FILE, NotTetrisSampler
+
+
+def black_frame() -> np.ndarray:
+    return np.zeros((108, 192, 3), dtype=np.uint8)
+
+
+def pattern_frame(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, size=(8, 9, 3), dtype=np.uint8)
+    return np.repeat(np.repeat(small, 12, axis=0), 12, axis=1)
+
+
+def test_dhash_ignores_noise_on_black():
+    noisy = black_frame()
+    noisy[::7, ::5] = 2
+    assert dhash(black_frame()) == 0
+    assert dhash(noisy) == 0
+
+
+def test_hamming_distance():
+    assert hamming_distance(0b1010, 0b0110) == 2
+
+
+class TestNotTetrisSampler:
+    """Tests for the novelty-sampled not-tetris archive."""
+
+    def test_keeps_only_novel_frames(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sampler = NotTetrisSampler(Path(tmpdir))
+
+            assert sampler.offer(black_frame()) is not None
+            assert sampler.offer(black_frame()) is None
+            assert sampler.offer(pattern_frame(1)) is not None
+            assert sampler.offer(pattern_frame(1)) is None
+
+            assert len(sampler) == 2
+            assert sampler.offered == 4
+
+    def test_uniform_color_change_is_novel(self):
+        """A blue no-signal screen must not be confused with a black one."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sampler = NotTetrisSampler(Path(tmpdir))
+            blue = black_frame()
+            blue[:, :, 0] = 200
+
+            assert sampler.offer(black_frame()) is not None
+            assert sampler.offer(blue) is not None
+
+    def test_evicts_oldest_by_count(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            sampler = NotTetrisSampler(folder, max_count=2, min_distance=1)
+            paths = [sampler.offer(pattern_frame(i)) for i in range(3)]
+
+            assert len(sampler) == 2
+            assert not paths[0].exists()
+            assert paths[1].exists() and paths[2].exists()
+
+    def test_evicts_by_bytes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sampler = NotTetrisSampler(Path(tmpdir), max_bytes=1, min_distance=1)
+            sampler.offer(pattern_frame(1))
+
+            assert len(sampler) == 0
+            assert sampler.nbytes == 0
+
+    def test_index_is_reloaded(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            sampler = NotTetrisSampler(folder)
+            sampler.offer(pattern_frame(1))
+
+            reloaded = NotTetrisSampler(folder)
+
+            assert (folder / INDEX_FILE).exists()
+            assert len(reloaded) == 1
+            assert reloaded.nbytes == sampler.nbytes
+            assert reloaded.offer(pattern_frame(1)) is None
+
+    def test_legacy_frames_removed_without_index(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            (folder / "000010.png").write_bytes(b"x")
+
+            NotTetrisSampler(folder)
+
+            assert not (folder / "000010.png").exists()
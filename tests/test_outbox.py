@@ -0,0 +1,247 @@
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+from bot import send_video_to_telegram
+from utils.outbox import Outbox, OutboxSender, Post
+
+
+class TestOutbox:
+    """Tests for the persistent queue of Telegram posts."""
+
+    def test_add_and_next_due(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outbox = Outbox(Path(tmpdir) / "outbox.sqlite3")
+            first = outbox.add(Path("a.mp4"), "A", Path("a.jpg"), (640, 360))
+            outbox.add(Path("b.mp4"), "B")
+
+            post = outbox.next_due()
+
+            assert post.id == first
+            assert post.caption == "A"
+            assert post.thumbnail == Path("a.jpg")
+            assert post.dimensions == (640, 360)
+            assert outbox.pending() == [Path("a.mp4"), Path("b.mp4")]
+
+    def test_survives_restart_and_resets_sending(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "outbox.sqlite3"
+            outbox = Outbox(path)
+            post_id = outbox.add(Path("a.mp4"), "A")
+            outbox.mark_sending(post_id)
+            outbox.close()
+
+            outbox = Outbox(path)
+
+            assert outbox.status(post_id) == "pending"
+            assert outbox.next_due().id == post_id
+
+    def test_retry_later_backs_off_exponentially(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outbox = Outbox(Path(tmpdir) / "outbox.sqlite3", base_delay=10)
+            outbox.add(Path("a.mp4"), "A")
+
+            delays = []
+            for _ in range(3):
+                post = outbox.next_due(now=time.time() + 10**6)
+                delays.append(outbox.retry_later(post, "timeout"))
+
+            assert 8 <= delays[0] <= 12
+            assert 16 <= delays[1] <= 24
+            assert 32 <= delays[2] <= 48
+            assert outbox.next_due() is None
+
+    def test_retry_after_is_honored(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outbox = Outbox(Path(tmpdir) / "outbox.sqlite3")
+            outbox.add(Path("a.mp4"), "A")
+
+            delay = outbox.retry_later(outbox.next_due(), "flood", retry_after=42)
+
+            assert delay == 42
+            assert outbox.next_attempt_time() == pytest.approx(time.time() + 42, abs=1)
+
+    def test_edit_waits_for_original_post(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outbox = Outbox(Path(tmpdir) / "outbox.sqlite3")
+            preview = outbox.add(Path("quick.mp4"), "Preview")
+            outbox.retry_later(outbox.next_due(), "timeout")
+            final = outbox.add(Path("final.mp4"), "Final", edit_of=preview)
+
+            # Not due while the preview is still waiting to be sent
+            assert outbox.next_due() is None
+
+            post = outbox.next_due(now=time.time() + 10**6)
+            assert post.id == preview
+            outbox.mark_sent(preview, message_id=77)
+
+            post = outbox.next_due()
+            assert post.id == final
+            assert post.edit_message_id == 77
+
+    def test_edit_of_failed_post_is_sent_as_new(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outbox = Outbox(Path(tmpdir) / "outbox.sqlite3")
+            preview = outbox.add(Path("quick.mp4"), "Preview")
+            outbox.mark_failed(preview, "rejected")
+            outbox.add(Path("final.mp4"), "Final", edit_of=preview)
+
+            post = outbox.next_due()
+            assert post.caption == "Final"
+            assert post.edit_message_id is None
+
+    def test_gives_up_after_max_attempts(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outbox = Outbox(Path(tmpdir) / "outbox.sqlite3", max_attempts=2)
+            post_id = outbox.add(Path("a.mp4"), "A")
+
+            outbox.retry_later(outbox.next_due(), "timeout")
+            post = outbox.next_due(now=time.time() + 10**6)
+            assert outbox.retry_later(post, "timeout") is None
+
+            assert outbox.status(post_id) == "failed"
+            assert outbox.pending() == []
+
+
+class FakeBotAPI:
+    """Stand-in Bot API server answering sendVideo."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+    async def send_video(self, request):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            data = await request.post()
+            self.requests.append(data["caption"])
+            await asyncio.sleep(0.05)
+            status, body = self.responses.pop(0) if self.responses else (200, None)
+            if body is None:
+                body = {
+                    "ok": True,
+                    "result": {
+                        "message_id": len(self.requests),
+                        "date": 0,
+                        "chat": {"id": -100, "type": "channel"},
+                    },
+                }
+            return web.json_response(body, status=status)
+        finally:
+            self.active -= 1
+
+
+async def start_fake_api(api: FakeBotAPI) -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendVideo", api.send_video)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def wait_sent(outbox: Outbox):
+    while outbox.pending():
+        await asyncio.sleep(0.05)
+
+
+async def run_sender(api: FakeBotAPI, captions, max_parallel=1, **outbox_kwargs):
+    runner, url = await start_fake_api(api)
+    session = AiohttpSession(api=TelegramAPIServer.from_base(url))
+    bot = Bot(token="123456:TEST", session=session)
+    done = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        video = Path(tmpdir) / "game.mp4"
+        video.write_bytes(b"\0" * 1024)
+        outbox = Outbox(Path(tmpdir) / "outbox.sqlite3", **outbox_kwargs)
+        for caption in captions:
+            outbox.add(video, caption)
+
+        async def send(post: Post):
+            message = await send_video_to_telegram(bot, post.video, post.caption)
+            return message.message_id
+
+        sender = OutboxSender(
+            outbox, send, max_parallel, on_done=lambda post, sent: done.append(sent)
+        )
+        task = asyncio.create_task(sender.run())
+        try:
+            await asyncio.wait_for(wait_sent(outbox), 10)
+            statuses = [outbox.status(i + 1) for i in range(len(captions))]
+        finally:
+            task.cancel()
+            outbox.close()
+            await bot.session.close()
+            await runner.cleanup()
+    return statuses, done
+
+
+@pytest.mark.asyncio
+async def test_sender_honors_retry_after(monkeypatch):
+    monkeypatch.setattr("bot.settings.bot_channel", -100, raising=False)
+    flood = {
+        "ok": False,
+        "error_code": 429,
+        "description": "Too Many Requests: retry after 1",
+        "parameters": {"retry_after": 1},
+    }
+    api = FakeBotAPI([(429, flood)])
+
+    start = time.monotonic()
+    statuses, done = await run_sender(api, ["Game Over!"])
+
+    assert statuses == ["sent"]
+    assert done == [True]
+    assert api.requests == ["Game Over!", "Game Over!"]
+    assert time.monotonic() - start >= 1
+
+
+@pytest.mark.asyncio
+async def test_sender_retries_server_errors(monkeypatch):
+    monkeypatch.setattr("bot.settings.bot_channel", -100, raising=False)
+    error = {"ok": False, "error_code": 502, "description": "Bad Gateway"}
+    api = FakeBotAPI([(502, error)])
+
+    statuses, done = await run_sender(api, ["A"], base_delay=0.1)
+
+    assert statuses == ["sent"]
+    assert len(api.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_sender_drops_rejected_posts(monkeypatch):
+    monkeypatch.setattr("bot.settings.bot_channel", -100, raising=False)
+    error = {
+        "ok": False,
+        "error_code": 400,
+        "description": "Bad Request: chat not found",
+    }
+    api = FakeBotAPI([(400, error)])
+
+    statuses, done = await run_sender(api, ["A", "B"])
+
+    assert statuses == ["failed", "sent"]
+    assert done == [False, True]
+
+
+@pytest.mark.asyncio
+async def test_sender_limits_parallel_uploads(monkeypatch):
+    monkeypatch.setattr("bot.settings.bot_channel", -100, raising=False)
+    api = FakeBotAPI([])
+
+    statuses, _ = await run_sender(api, ["A", "B", "C", "D"], max_parallel=2)
+
+    assert statuses == ["sent"] * 4
+    assert api.max_active == 2
@@ -0,0 +1,96 @@
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.preroll import PrerollBuffer
+
+
+def make_image(value: int) -> np.ndarray:
+    return np.full((36, 64, 3), value, dtype=np.uint8)
+
+
+class TestPrerollBuffer:
+    """Tests for the pre-roll ring buffer."""
+
+    def test_evicts_by_frame_count(self):
+        buf = PrerollBuffer(max_frames=3, max_bytes=10**9)
+        for i in range(5):
+            buf.push(i, make_image(i), float(i))
+
+        assert len(buf) == 3
+        assert [f.frame_number for f in buf.candidates()] == [2, 3, 4]
+
+    def test_evicts_by_bytes(self):
+        frame_bytes = make_image(0).nbytes
+        buf = PrerollBuffer(max_frames=100, max_bytes=frame_bytes * 2)
+        for i in range(5):
+            buf.push(i, make_image(i), float(i))
+
+        assert len(buf) == 2
+        assert buf.nbytes == frame_bytes * 2
+
+    def test_disabled_when_no_frames_allowed(self):
+        buf = PrerollBuffer(max_frames=0, max_bytes=10**9)
+        buf.push(0, make_image(0), 0.0)
+        assert len(buf) == 0
+
+    def test_boundary_excludes_older_frames(self):
+        buf = PrerollBuffer(max_frames=10, max_bytes=10**9)
+        for i in range(6):
+            buf.push(i, make_image(i), float(i))
+        buf.mark_boundary(3)
+
+        assert [f.frame_number for f in buf.candidates()] == [4, 5]
+
+    def test_find_start(self):
+        buf = PrerollBuffer(max_frames=10, max_bytes=10**9)
+        for i in range(6):
+            buf.push(i, make_image(i * 10), float(i))
+
+        start = buf.find_start(lambda image: image[0, 0, 0] >= 30)
+
+        assert start is not None
+        assert start.frame_number == 3
+
+    def test_take_moves_candidates(self):
+        buf = PrerollBuffer(max_frames=10, max_bytes=10**9)
+        for i in range(6):
+            buf.push(i, make_image(i), float(i))
+        buf.mark_boundary(3)
+
+        taken = buf.take()
+
+        assert [f.frame_number for f in taken.candidates()] == [4, 5]
+        assert taken.nbytes == 2 * make_image(0).nbytes
+        assert len(buf) == 0
+        buf.push(6, make_image(6), 6.0)
+        assert len(taken) == 2
+
+    def test_invalid_encoding(self):
+        with pytest.raises(ValueError):
+            PrerollBuffer(max_frames=10, max_bytes=10**9, encoding="bmp")
+
+    @pytest.mark.parametrize("encoding", ["raw", "png", "jpg"])
+    def test_flush_writes_frames(self, encoding):
+        buf = PrerollBuffer(max_frames=10, max_bytes=10**9, encoding=encoding)
+        for i in range(5):
+            buf.push(i, make_image(i * 40), float(i))
+        buf.mark_boundary(1)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            flushed = buf.flush(folder, start_frame=3)
+
+            assert [f.frame_number for f in flushed] == [3, 4]
+            assert sorted(p.name for p in folder.iterdir()) == [
+                "000003.png",
+                "000004.png",
+            ]
+            image = cv2.imread(str(folder / "000004.png"))
+            assert image.shape == (36, 64, 3)
+            assert abs(int(image[0, 0, 0]) - 160) <= 2
+
+        assert len(buf) == 0
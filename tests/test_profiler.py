@@ -0,0 +1,81 @@
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from utils.profiler import FrameProfiler, report
+
+
+def busy_frame(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestFrameProfiler:
+    """Tests for profiling the next frames of the game loop."""
+
+    def test_profiles_requested_frames(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            profiler = FrameProfiler(Path(tmpdir), frames=100, interval=0.001)
+            assert profiler.request(frames=20)
+            # Only one profile at a time
+            assert not profiler.request()
+
+            for _ in range(25):
+                profiler.tick()
+                busy_frame(0.005)
+            profiler._thread.join(5)
+
+            assert not profiler.active
+            folded = profiler.last_profile
+            assert folded.suffix == ".folded"
+            lines = folded.read_text().splitlines()
+            assert any("busy_frame (test_profiler.py" in line for line in lines)
+            # Root first, count last
+            stack, count = lines[0].rsplit(" ", 1)
+            assert int(count) > 0 and ";" in stack
+            assert "over 20 frames" in folded.with_suffix(".txt").read_text()
+            assert profiler.request()
+
+    def test_stop_writes_partial_profile(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            profiler = FrameProfiler(Path(tmpdir), interval=0.001)
+            profiler.request(frames=1000)
+            for _ in range(5):
+                profiler.tick()
+                busy_frame(0.005)
+
+            profiler.stop()
+
+            assert not profiler.active
+            assert profiler.last_profile.exists()
+
+    def test_rejects_non_positive_frames(self):
+        profiler = FrameProfiler(Path(tempfile.gettempdir()))
+        for frames in (0, -5):
+            with pytest.raises(ValueError):
+                profiler.request(frames)
+        assert not profiler._requested
+
+    def test_idle_profiler_does_nothing(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            profiler = FrameProfiler(Path(tmpdir))
+            for _ in range(10):
+                profiler.tick()
+
+            assert profiler._thread is None
+            assert not list(Path(tmpdir).iterdir())
+
+
+def test_report_counts_self_and_total():
+    samples = Counter({("main", "loop", "classify"): 3, ("main", "loop"): 1})
+
+    text = report(samples, frames=10, interval=0.01)
+
+    assert "4 samples" in text
+    self_part, total_part = text.split("Total:")
+    assert " 75.0%       3  classify" in self_part
+    assert "100.0%       4  loop" in total_part
@@ -0,0 +1,130 @@
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from cv_tools.frame_diff import FrameDeduplicator
+from utils.ffmpeg_tools import frame_durations, read_timestamps
+from utils.recorder import GameRecorder
+
+
+class TestGameRecorder:
+    """Tests for per-frame recording with capture timestamps."""
+
+    def test_record_writes_frames_and_timestamps(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            recorder = GameRecorder(folder)
+            image = np.zeros((36, 64, 3), dtype=np.uint8)
+
+            recorder.record(10, image, 100.0)
+            recorder.record(11, image, 100.5, sequence=42)
+            recorder.close(101.0)
+
+            assert (folder / "000010.png").exists()
+            assert (folder / "000011.png").exists()
+            assert recorder.frame_count == 2
+            assert recorder.duration == 0.5
+
+            frames, end = read_timestamps(recorder.timestamps_path)
+            assert frames == [("000010.png", 100.0), ("000011.png", 100.5)]
+            assert end == 101.0
+            lines = recorder.timestamps_path.read_text().splitlines()
+            assert lines[1].split("\t")[2] == "42"
+
+    def test_add_frame_indexes_existing_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            recorder = GameRecorder(folder)
+
+            recorder.add_frame(5, 1.0)
+            recorder.close()
+
+            frames, end = read_timestamps(recorder.timestamps_path)
+            assert frames == [("000005.png", 1.0)]
+            assert end == 1.0
+
+    def test_held_frames_are_indexed_after_released(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            recorder = GameRecorder(folder)
+            image = np.zeros((36, 64, 3), dtype=np.uint8)
+
+            recorder.hold()
+            recorder.record(10, image, 10.0)
+            recorder.record(11, image, 11.0)
+            # The pre-roll is indexed once it has been written
+            recorder.add_frame(8, 8.0)
+            recorder.add_frame(9, 9.0)
+            recorder.release()
+            recorder.record(12, image, 12.0)
+            recorder.close(13.0)
+
+            frames, end = read_timestamps(recorder.timestamps_path)
+            assert [name for name, _ in frames] == [
+                f"{i:06d}.png" for i in range(8, 13)
+            ]
+            assert recorder.first_timestamp == 8.0
+            assert recorder.last_timestamp == 12.0
+
+    def test_close_releases_held_frames(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recorder = GameRecorder(Path(tmpdir))
+            recorder.hold()
+            recorder.add_frame(1, 1.0)
+            recorder.close(2.0)
+
+            frames, end = read_timestamps(recorder.timestamps_path)
+            assert frames == [("000001.png", 1.0)]
+
+    def test_duplicates_extend_previous_frame(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            recorder = GameRecorder(folder, FrameDeduplicator())
+            still = np.zeros((36, 64, 3), dtype=np.uint8)
+            moved = np.full((36, 64, 3), 255, dtype=np.uint8)
+
+            assert recorder.record(0, still, 0.0) is True
+            assert recorder.record(1, still, 0.1) is False
+            assert recorder.record(2, still, 0.2) is False
+            assert recorder.record(3, moved, 0.3) is True
+            assert recorder.record(4, moved, 0.4) is False
+            recorder.close()
+
+            assert recorder.frame_count == 2
+            assert recorder.duplicate_count == 3
+            assert recorder.dedup_ratio == 0.6
+            assert not (folder / "000001.png").exists()
+
+            frames, end = read_timestamps(recorder.timestamps_path)
+            assert [name for name, _ in frames] == ["000000.png", "000003.png"]
+            assert end == 0.4
+            durations = frame_durations(frames, end)
+            assert durations[0] == 0.3
+            assert abs(durations[1] - 0.1) < 1e-9
+
+    def test_crop_and_scale(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = Path(tmpdir)
+            recorder = GameRecorder(folder, crop=True, output_height=50)
+            image = np.zeros((200, 300, 3), dtype=np.uint8)
+
+            recorder.set_crop_rect((10, 20, 200, 100))
+            # The rectangle is locked for the whole game
+            recorder.set_crop_rect((0, 0, 300, 200))
+            recorder.record(0, image, 0.0)
+            recorder.close()
+
+            assert recorder.crop_rect == (10, 20, 200, 100)
+            saved = cv2.imread(str(folder / "000000.png"))
+            assert saved.shape == (50, 100, 3)
+
+    def test_crop_rect_ignored_when_disabled(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recorder = GameRecorder(Path(tmpdir))
+            recorder.set_crop_rect((10, 20, 200, 100))
+            recorder.close()
+
+            assert recorder.crop_rect is None
+            assert recorder.transforms is False
@@ -0,0 +1,188 @@
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+from utils.retention import RetentionManager, path_size
+
+
+def write_file(path: Path, nbytes: int) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * nbytes)
+    return path
+
+
+class TestRetentionManager:
+    """Tests for byte-budget retention."""
+
+    def test_scan_indexes_existing_entries(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / "games"
+            write_file(root / "game_2" / "000001.png", 100)
+            write_file(root / "game_1" / "000001.png", 50)
+            write_file(root / "game_1" / "000002.png", 50)
+            (root / "other").mkdir()
+
+            retention = RetentionManager({"games": 1000})
+            retention.scan("games", root, lambda p: p.name.startswith("game_"))
+
+            assert [p.name for p in retention.entries("games")] == ["game_1", "game_2"]
+            assert retention.size("games") == 200
+
+    def test_enforce_removes_oldest_until_within_budget(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            retention = RetentionManager({"videos": 250})
+            paths = [write_file(root / f"v{i}.mp4", 100) for i in range(4)]
+            for p in paths:
+                retention.add("videos", p)
+
+            removed = retention.enforce("videos")
+
+            assert removed == paths[:2]
+            assert not paths[0].exists() and not paths[1].exists()
+            assert paths[2].exists() and paths[3].exists()
+            assert retention.size("videos") == 200
+
+    def test_enforce_skips_protected(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            retention = RetentionManager({"games": 100})
+            old = write_file(root / "game_1" / "a.png", 100).parent
+            new = write_file(root / "game_2" / "a.png", 100).parent
+            retention.add("games", old)
+            retention.add("games", new)
+            retention.protect(old)
+
+            removed = retention.enforce("games")
+
+            assert removed == [new]
+            assert old.exists()
+
+    def test_grow_tracks_running_size(self):
+        retention = RetentionManager({"games": 10**9})
+        folder = Path("game_1")
+        retention.add("games", folder, 0)
+        retention.grow("games", folder, 10)
+        retention.grow("games", folder, 20)
+
+        assert retention.size("games") == 30
+
+    def test_add_replaces_size(self):
+        retention = RetentionManager({"not_tetris": 10**9})
+        retention.add("not_tetris", Path("a.png"), 10)
+        retention.add("not_tetris", Path("a.png"), 15)
+
+        assert retention.size("not_tetris") == 15
+        assert retention.entries("not_tetris") == [Path("a.png")]
+
+    def test_remove_deletes_folder(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            folder = write_file(Path(tmpdir) / "game_1" / "a.png", 100).parent
+            retention = RetentionManager({"games": 10**9})
+            retention.add("games", folder)
+
+            freed = retention.remove("games", folder)
+
+            assert freed == 100
+            assert not folder.exists()
+            assert retention.size("games") == 0
+
+    def test_emergency_mode(self):
+        retention = RetentionManager({"games": 10**9}, min_free_bytes=1000)
+        with patch.object(retention, "disk_free", return_value=500):
+            assert retention.check_disk() is True
+        assert retention.emergency is True
+        with patch.object(retention, "disk_free", return_value=5000):
+            assert retention.check_disk() is False
+        assert retention.emergency is False
+
+    def test_emergency_is_rechecked_without_writes(self):
+        now = [0.0]
+        retention = RetentionManager(
+            {"games": 10**9},
+            min_free_bytes=1000,
+            recheck_interval=10,
+            clock=lambda: now[0],
+        )
+        with patch.object(retention, "disk_free", return_value=500):
+            retention.check_disk()
+        with patch.object(retention, "disk_free", return_value=5000) as disk_free:
+            now[0] = 5.0
+            assert retention.poll() is True
+            disk_free.assert_not_called()
+            now[0] = 10.0
+            assert retention.poll() is False
+        assert retention.emergency is False
+
+    def test_removal_leaves_emergency_mode(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            video = write_file(Path(tmpdir) / "v.mp4", 100)
+            retention = RetentionManager({"videos": 10**9}, min_free_bytes=1000)
+            retention.add("videos", video)
+            with patch.object(retention, "disk_free", return_value=500):
+                retention.check_disk()
+            with patch.object(retention, "disk_free", return_value=5000):
+                retention.remove("videos", video)
+            assert retention.emergency is False
+
+    def test_emergency_enforces_budgets_first(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            video = write_file(Path(tmpdir) / "v.mp4", 100)
+            retention = RetentionManager({"videos": 0}, min_free_bytes=1000)
+            retention.add("videos", video)
+
+            with patch.object(retention, "disk_free", return_value=500):
+                retention.check_disk()
+
+            assert not video.exists()
+
+    def test_background_enforcement(self):
+        retention = RetentionManager(
+            {"videos": 0}, min_free_bytes=1000, background=True
+        )
+        retention.add("videos", Path("v.mp4"), 100)
+        free = [500]
+        release = threading.Event()
+
+        def delete(path):
+            release.wait(5)
+            free[0] = 5000
+
+        with patch.object(retention, "disk_free", side_effect=lambda: free[0]):
+            with patch("utils.retention._delete", side_effect=delete):
+                # The check returns while the worker is still deleting
+                assert retention.check_disk() is True
+                release.set()
+                retention._enforcer.join(5)
+
+        assert retention.size("videos") == 0
+        assert retention.emergency is False
+
+    def test_index_and_removal_callback(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            old = write_file(root / "game_1" / "a.png", 100).parent
+            new = write_file(root / "game_2" / "a.png", 100).parent
+            removed = []
+            retention = RetentionManager(
+                {"games": 150}, on_remove=lambda category, path: removed.append(path)
+            )
+
+            # Unknown sizes are measured
+            retention.index("games", [(old, 100), (new, None)])
+            assert retention.size("games") == 200
+            assert retention.entry_size("games", new) == 100
+
+            retention.enforce("games")
+            assert removed == [old]
+
+
+def test_path_size():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        write_file(root / "a" / "1.png", 10)
+        write_file(root / "a" / "b" / "2.png", 20)
+
+        assert path_size(root / "a") == 30
+        assert path_size(root / "a" / "1.png") == 10
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from utils.soak import ResourceSample, SoakMonitor, current_rss, fitted_growth, open_fds
+
+
+def sample(
+    elapsed: float, games: int, rss_mb: float = 100, fds: int = 10
+) -> ResourceSample:
+    return ResourceSample(elapsed, games, int(rss_mb * 2**20), fds, 3, 5, 0)
+
+
+class TestFittedGrowth:
+    def test_linear(self):
+        assert fitted_growth([0, 1, 2, 3], [10, 12, 14, 16]) == pytest.approx(6)
+
+    def test_sawtooth_without_trend(self):
+        xs = list(range(20))
+        ys = [100 + (10 if x % 2 else -10) for x in xs]
+        assert abs(fitted_growth(xs, ys)) < 3
+
+    def test_too_few_points(self):
+        assert fitted_growth([1.0], [5.0]) == 0.0
+        assert fitted_growth([], []) == 0.0
+
+
+class TestSoakMonitor:
+    """Tests for the soak resource monitor."""
+
+    def test_growth_after_warmup(self):
+        monitor = SoakMonitor(limits={"rss": 64, "fds": 8}, warmup_games=1)
+        monitor.games = 5
+        # The warm-up grows a lot, then memory is flat and fds leak
+        monitor.samples = [sample(0, 0, 50, 10), sample(10, 0, 100, 10)]
+        monitor.samples += [
+            sample(10 + 10 * i, i, 100 + i % 2, 10 + 3 * i) for i in range(1, 6)
+        ]
+        growth = monitor.growth()
+        assert growth["rss"] < 2
+        assert growth["fds"] == pytest.approx(12)
+        assert monitor.failures() == ["fds grew by 12.0 (limit 8)"]
+
+    def test_needs_games_after_warmup(self):
+        monitor = SoakMonitor(limits={}, warmup_games=2)
+        monitor.games = 2
+        assert monitor.failures()
+
+    def test_samples_the_process(self):
+        async def run():
+            monitor = SoakMonitor(limits={"rss": 1024}, interval=0.01, warmup_games=1)
+            monitor.start()
+            task = asyncio.create_task(monitor.run())
+            leak = []
+            for _ in range(3):
+                await asyncio.sleep(0.03)
+                leak.append(bytearray(2**20))
+                monitor.game_finished()
+            task.cancel()
+            monitor.stop()
+            return monitor
+
+        monitor = asyncio.run(run())
+        assert len(monitor.samples) > 4
+        last = monitor.samples[-1]
+        assert last.tasks >= 1
+        assert last.threads >= 1
+        assert last.traced > 2 * 2**20
+        assert monitor.top_allocators()
+        assert "Result:          ok" in monitor.report()
+
+    def test_process_counters(self):
+        assert current_rss() > 0
+        assert open_fds() > 0
@@ -0,0 +1,153 @@
+from pathlib import Path
+
+import pytest
+
+from cv_tools.frame_generator import captured_frames
+from cv_tools.synthetic import (
+    Phase,
+    Player,
+    SyntheticRenderer,
+    Timeline,
+    is_synthetic,
+    parse_spec,
+    standard_game,
+    timeline_from_spec,
+)
+from game_objects.frame_classifier import FrameClassifier
+from game_objects.game_state import GameState, GameStateMachine
+
+
+@pytest.fixture
+def classify(refs):
+    classifier = FrameClassifier(refs)
+    renderer = SyntheticRenderer(seed=1)
+
+    def _classify(phase: Phase, t: float = 0.0):
+        return classifier.classify(renderer.render(phase, phase.p1, phase.p2, t))
+
+    return _classify
+
+
+class TestSyntheticRenderer:
+    """The rendered screens are classified like the real ones."""
+
+    def test_black(self, classify):
+        assert classify(Phase("black", 1.0)).is_tetris is False
+
+    def test_menu(self, classify):
+        info = classify(Phase("menu", 1.0))
+        assert info.is_tetris is True
+        assert info.in_menu is True
+        assert info.in_game is False
+
+    def test_game_scores(self, classify):
+        p1 = Player(score=12283, lines=34, level=3)
+        p2 = Player(score=2680, lines=12, level=1)
+        info = classify(Phase("game", 1.0, p1, p2), t=2.5)
+        assert info.in_game is True
+        assert info.p1_score == 12283
+        assert info.p2_score == 2680
+        assert info.p1_game_over is False
+        assert info.p2_game_over is False
+
+    def test_game_start(self, classify):
+        info = classify(Phase("game", 1.0))
+        assert info.in_game is True
+        assert info.scores_are_zero is True
+
+    def test_pause(self, classify):
+        assert classify(Phase("pause", 1.0, Player(100), Player(200))).is_paused is True
+
+    def test_bonus(self, classify):
+        for side in (1, 2):
+            phase = Phase("bonus", 1.0, Player(100), Player(200), bonus_player=side)
+            assert classify(phase).is_bonus is True
+
+    def test_game_over(self, classify):
+        over = Player(score=3320, lines=24, level=2, game_over=True)
+        info = classify(Phase("game", 1.0, over, Player(2380, 18, 1)))
+        assert info.p1_game_over is True
+        assert info.p2_game_over is False
+        info = classify(Phase("game", 1.0, over, over))
+        assert info.both_game_over is True
+
+    def test_frames_change(self):
+        renderer = SyntheticRenderer()
+        phase = Phase("game", 1.0)
+        first = renderer.render(phase, phase.p1, phase.p2, 0.0)
+        second = renderer.render(phase, phase.p1, phase.p2, 0.5)
+        assert (first != second).any()
+
+
+class TestTimeline:
+    """Tests for the scripted timeline."""
+
+    def test_length(self):
+        timeline = Timeline([Phase("menu", 2.0), Phase("game", 1.5)], fps=60)
+        assert timeline.duration == 3.5
+        assert len(timeline) == 210
+
+    def test_scores_are_interpolated(self):
+        end = Player(score=1000, lines=10, level=1)
+        timeline = Timeline([Phase("game", 1.0), Phase("game", 2.0, end, end)])
+        phase, p1, _ = timeline.state_at(2.0)
+        assert phase.screen == "game"
+        assert p1.score == 500
+        assert p1.lines == 5
+        assert timeline.state_at(10.0)[1] == end
+
+    def test_standard_game_ends_with_both_game_over(self):
+        phases = standard_game(30.0)
+        assert phases[0].screen == "menu"
+        assert any(phase.screen == "pause" for phase in phases)
+        assert any(phase.screen == "bonus" for phase in phases)
+        assert phases[-1].p1.game_over and phases[-1].p2.game_over
+        assert sum(phase.seconds for phase in phases) == pytest.approx(30.0)
+
+
+class TestSpec:
+    """Tests for "synthetic:" source paths."""
+
+    def test_parse(self):
+        options = parse_spec("synthetic:games=3,fps=60,seed=7")
+        assert options == {"games": 3, "seconds": 60.0, "fps": 60.0, "seed": 7}
+        assert parse_spec("synthetic:")["games"] == 1
+
+    def test_unknown_option(self):
+        with pytest.raises(ValueError):
+            parse_spec("synthetic:speed=2")
+
+    def test_is_synthetic(self):
+        assert is_synthetic(Path("synthetic:games=2"))
+        assert not is_synthetic(Path("gameplay_example_new.mp4"))
+
+    def test_timeline_is_reproducible(self):
+        first, seed = timeline_from_spec("synthetic:games=2,seconds=20,seed=3")
+        second, _ = timeline_from_spec("synthetic:games=2,seconds=20,seed=3")
+        assert seed == 3
+        assert first.phases == second.phases
+        assert len(first.phases) == 1 + 2 * len(standard_game())
+
+
+class TestSyntheticSource:
+    """Synthetic sources through the frame generator."""
+
+    def test_timestamps_and_final_black_frame(self):
+        frames = list(captured_frames(Path("synthetic:seconds=12,fps=10")))
+        timeline, _ = timeline_from_spec("synthetic:seconds=12,fps=10")
+        assert len(frames) == len(timeline) + 1
+        assert frames[1].device_time == pytest.approx(0.1)
+        assert frames[-1].device_time is None
+        assert not frames[-1].image.any()
+
+    def test_drives_a_game_to_game_over(self, refs):
+        classifier = FrameClassifier(refs)
+        state_machine = GameStateMachine()
+        states = []
+        source = Path("synthetic:seconds=12,fps=4")
+        for captured in captured_frames(source):
+            _, state = state_machine.update(classifier.classify(captured.image))
+            if not states or states[-1] != state:
+                states.append(state)
+        assert GameState.GAME in states
+        assert GameState.GAME_OVER in states
@@ -0,0 +1,127 @@
+import logging
+from dataclasses import dataclass, asdict
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GapStats:
+    """Frames lost by the capture and stalls of the game loop.
+
+    Attributes:
+        capture_gaps: Times the device timestamps jumped by more than a
+            frame interval
+        dropped_frames: Frames missing in those jumps (the card, driver or
+            a full capture buffer dropped them)
+        loop_stalls: Iterations of the game loop that took longer than a
+            frame interval, so frames piled up in the capture buffer
+        longest_stall: Longest loop iteration in seconds
+    """
+
+    capture_gaps: int = 0
+    dropped_frames: int = 0
+    loop_stalls: int = 0
+    longest_stall: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"dropped {self.dropped_frames} frame(s) in {self.capture_gaps} gap(s), "
+            f"{self.loop_stalls} loop stall(s), longest {self.longest_stall * 1000:.0f}ms"
+        )
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class GapDetector:
+    """Detects capture gaps and loop stalls from frame timestamps.
+
+    Capture gaps are found in the backend timestamps of consecutive
+    frames: a frame arriving `tolerance` frame intervals or more after the
+    previous one means frames were dropped before they reached us. Loop
+    stalls are found in the time between two reads of the game loop; they
+    only mean something for live sources, so they are skipped for files.
+
+    The frame interval is either given or estimated from the first
+    `warmup` timestamp deltas (their 10th percentile, so that gaps in the
+    warm-up don't inflate it). Counts are kept in total and for the
+    current game (reset with start_game()).
+    """
+
+    def __init__(
+        self,
+        interval: float | None = None,
+        tolerance: float = 1.5,
+        live: bool = True,
+        warmup: int = 30,
+    ):
+        """Initialize the detector.
+
+        Args:
+            interval: Expected seconds between frames, None to estimate it
+            tolerance: Multiple of the interval that counts as a gap
+            live: Whether the source is real time (enables stall detection)
+            warmup: Number of deltas the interval is estimated from
+        """
+        self.interval = interval
+        self.tolerance = tolerance
+        self.live = live
+        self.warmup = warmup
+        self.total = GapStats()
+        self.game = GapStats()
+        self._deltas: list[float] = []
+        self._last_device_time: float | None = None
+        self._last_loop_time: float | None = None
+
+    def start_game(self) -> None:
+        self.game = GapStats()
+
+    def new_source(self) -> None:
+        """Forget the last frame when the capture is reopened.
+
+        The time between the last frame of the previous capture and the
+        first of the new one is neither a gap nor a stall. The interval
+        and the counts are kept.
+        """
+        self._last_device_time = None
+        self._last_loop_time = None
+
+    def update(self, device_time: float | None, loop_time: float) -> int:
+        """Account for one frame.
+
+        Args:
+            device_time: Backend timestamp of the frame, None if unknown
+            loop_time: Monotonic time the game loop got the frame
+
+        Returns:
+            Number of frames dropped right before this one
+        """
+        dropped = 0
+        if device_time is not None and self._last_device_time is not None:
+            delta = device_time - self._last_device_time
+            if self.interval is None:
+                self._estimate(delta)
+            elif delta >= self.interval * self.tolerance:
+                dropped = max(1, round(delta / self.interval) - 1)
+                for stats in (self.total, self.game):
+                    stats.capture_gaps += 1
+                    stats.dropped_frames += dropped
+        self._last_device_time = device_time
+
+        if self.live and self.interval is not None and self._last_loop_time is not None:
+            elapsed = loop_time - self._last_loop_time
+            if elapsed >= self.interval * self.tolerance:
+                for stats in (self.total, self.game):
+                    stats.loop_stalls += 1
+                    stats.longest_stall = max(stats.longest_stall, elapsed)
+        self._last_loop_time = loop_time
+        return dropped
+
+    def _estimate(self, delta: float) -> None:
+        if delta > 0:
+            self._deltas.append(delta)
+        if len(self._deltas) >= self.warmup:
+            self._deltas.sort()
+            self.interval = self._deltas[len(self._deltas) // 10]
+            self._deltas = []
+            logger.info(f"Capture interval: {self.interval * 1000:.1f}ms")
@@ -0,0 +1,315 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+from utils.journal import GameJournal
+from utils.retention import path_size
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    name TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    started_at TEXT,
+    ended_at TEXT,
+    status TEXT NOT NULL DEFAULT 'recording',
+    valid INTEGER NOT NULL DEFAULT 0,
+    p1_score INTEGER,
+    p2_score INTEGER,
+    frame_count INTEGER NOT NULL DEFAULT 0,
+    real_duration REAL,
+    pause_duration REAL NOT NULL DEFAULT 0,
+    pause_count INTEGER NOT NULL DEFAULT 0,
+    frames_bytes INTEGER NOT NULL DEFAULT 0,
+    frames_present INTEGER NOT NULL DEFAULT 1,
+    video TEXT,
+    video_bytes INTEGER,
+    thumbnail TEXT,
+    preview TEXT,
+    archive TEXT,
+    encode_seconds REAL,
+    post_id INTEGER,
+    upload_status TEXT,
+    timing TEXT,
+    gaps TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_started ON games (started_at);
+CREATE INDEX IF NOT EXISTS games_status ON games (status);
+CREATE INDEX IF NOT EXISTS games_frames ON games (frames_present, name);
+CREATE INDEX IF NOT EXISTS games_post ON games (post_id);
+"""
+
+
+@dataclass
+class CatalogEntry:
+    """One recorded game and its artifacts.
+
+    `status` follows the game's journal (recording, recorded, archived,
+    processed, discarded, failed); `upload_status` is the status of its
+    latest outbox post (pending, sent, failed), None if never posted.
+    """
+
+    name: str
+    folder: Path
+    started_at: str | None = None
+    ended_at: str | None = None
+    status: str = "recording"
+    valid: bool = False
+    p1_score: int | None = None
+    p2_score: int | None = None
+    frame_count: int = 0
+    real_duration: float | None = None
+    pause_duration: float = 0.0
+    pause_count: int = 0
+    frames_bytes: int = 0
+    frames_present: bool = True
+    video: Path | None = None
+    video_bytes: int | None = None
+    thumbnail: Path | None = None
+    preview: Path | None = None
+    archive: Path | None = None
+    encode_seconds: float | None = None
+    post_id: int | None = None
+    upload_status: str | None = None
+    # Classification latency percentiles per stage (CumulativeTimingStats.summary)
+    timing: dict | None = None
+    # Dropped capture frames and loop stalls (GapStats.as_dict)
+    gaps: dict | None = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "CatalogEntry":
+        values = {}
+        for f in fields(cls):
+            value = row[f.name]
+            if value is not None and f.name in _PATH_COLUMNS:
+                value = Path(value)
+            elif value is not None and f.name in _JSON_COLUMNS:
+                value = json.loads(value)
+            elif f.name in ("valid", "frames_present"):
+                value = bool(value)
+            values[f.name] = value
+        return cls(**values)
+
+
+_COLUMNS = tuple(f.name for f in fields(CatalogEntry))
+_PATH_COLUMNS = ("folder", "video", "thumbnail", "preview", "archive")
+_JSON_COLUMNS = ("timing", "gaps")
+
+
+class GameCatalog:
+    """SQLite index of every recorded game, one row per game folder.
+
+    The game loop adds a row when a game starts and fills in scores and
+    durations at game over; processing adds the encoded files, and the
+    outbox the upload status. Retention is seeded from the catalog
+    instead of listing and measuring directories. Folders recorded before
+    the catalog existed are indexed from their journals by sync().
+    """
+
+    def __init__(self, path: Path | str):
+        """Open (or create) the catalog database.
+
+        Args:
+            path: SQLite database file, or ":memory:"
+        """
+        self.path = path
+        # Retention removes folders from worker threads
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def add(self, folder: Path, **values) -> None:
+        """Add a game, or update it if it is already indexed."""
+        values = {"folder": str(folder)} | _to_db(values)
+        self._upsert(folder.name, values)
+
+    def update(self, name: str, **values) -> None:
+        """Update fields of an indexed game."""
+        if not values:
+            return
+        values = _to_db(values) | {"updated_at": time.time()}
+        columns = ", ".join(f"{column} = ?" for column in values)
+        with self._lock:
+            self._db.execute(
+                f"UPDATE games SET {columns} WHERE name = ?", (*values.values(), name)
+            )
+
+    def update_post(self, post_id: int, upload_status: str) -> None:
+        """Record the upload status of the game that owns an outbox post."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE games SET upload_status = ?, updated_at = ? WHERE post_id = ?",
+                (upload_status, time.time(), post_id),
+            )
+
+    def mark_removed(self, folder: Path) -> None:
+        """Note that a game's frames were deleted from disk."""
+        self.update(folder.name, frames_present=False, frames_bytes=0)
+
+    def get(self, name: str) -> CatalogEntry | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM games WHERE name = ?", (name,))
+            row = row.fetchone()
+        return CatalogEntry.from_row(row) if row else None
+
+    def games(
+        self,
+        status: str | None = None,
+        valid: bool | None = None,
+        with_frames: bool | None = None,
+        since: str | None = None,
+        limit: int | None = None,
+        newest_first: bool = False,
+    ) -> list[CatalogEntry]:
+        """Indexed games matching all given filters, oldest first.
+
+        Args:
+            status: Journal status of the game
+            valid: Only valid (or only invalid) games
+            with_frames: Only games whose frames are (or aren't) on disk
+            since: Only games started at or after this ISO timestamp
+            limit: Maximum number of games returned
+            newest_first: Return the most recent games first
+        """
+        where, params = self._filters(status, valid, with_frames, since)
+        order = "DESC" if newest_first else "ASC"
+        query = f"SELECT * FROM games{where} ORDER BY name {order}"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [CatalogEntry.from_row(row) for row in rows]
+
+    def count(
+        self,
+        status: str | None = None,
+        valid: bool | None = None,
+        with_frames: bool | None = None,
+        since: str | None = None,
+    ) -> int:
+        where, params = self._filters(status, valid, with_frames, since)
+        with self._lock:
+            return self._db.execute(
+                f"SELECT COUNT(*) FROM games{where}", params
+            ).fetchone()[0]
+
+    def total_bytes(self) -> tuple[int, int]:
+        """Bytes of frames still on disk and of encoded videos."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COALESCE(SUM(frames_bytes), 0), COALESCE(SUM(video_bytes), 0) "
+                "FROM games"
+            ).fetchone()
+        return row[0], row[1]
+
+    def sync(self, games_path: Path) -> int:
+        """Reconcile the catalog with the game folders on disk.
+
+        Folders missing from the catalog (recorded before it existed) are
+        indexed from their journals, and games whose folder is gone are
+        marked as removed. Only one directory listing is needed.
+
+        Returns:
+            Number of newly indexed games
+        """
+        on_disk = {}
+        if games_path.exists():
+            on_disk = {
+                folder.name: folder
+                for folder in games_path.iterdir()
+                if folder.is_dir() and folder.name.startswith("game_")
+            }
+        with self._lock:
+            rows = self._db.execute("SELECT name, frames_present FROM games").fetchall()
+        known = {row["name"]: bool(row["frames_present"]) for row in rows}
+        for name, present in known.items():
+            if present and name not in on_disk:
+                self.update(name, frames_present=False, frames_bytes=0)
+        added = 0
+        for name in sorted(on_disk.keys() - known.keys()):
+            self.add(on_disk[name], **_journal_values(on_disk[name]))
+            added += 1
+        if added:
+            logger.info(f"Catalog: indexed {added} game folder(s) found on disk")
+        return added
+
+    def _upsert(self, name: str, values: dict) -> None:
+        values = {"name": name} | values | {"updated_at": time.time()}
+        columns = ", ".join(values)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in values if c != "name")
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO games ({columns}) VALUES ({', '.join('?' * len(values))}) "
+                f"ON CONFLICT (name) DO UPDATE SET {updates}",
+                tuple(values.values()),
+            )
+
+    @staticmethod
+    def _filters(status, valid, with_frames, since) -> tuple[str, list]:
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if valid is not None:
+            clauses.append("valid = ?")
+            params.append(int(valid))
+        if with_frames is not None:
+            clauses.append("frames_present = ?")
+            params.append(int(with_frames))
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _to_db(values: dict) -> dict:
+    unknown = values.keys() - set(_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown catalog fields: {', '.join(sorted(unknown))}")
+    converted = {}
+    for name, value in values.items():
+        if isinstance(value, Path):
+            value = str(value)
+        elif name in _JSON_COLUMNS and value is not None:
+            value = json.dumps(value)
+        converted[name] = value
+    return converted
+
+
+def _journal_values(folder: Path) -> dict:
+    """Catalog fields of a game folder recorded before the catalog."""
+    values = {"frames_bytes": path_size(folder)}
+    journal = GameJournal.load(folder)
+    if journal is None:
+        return values
+    return values | {
+        "started_at": journal.started_at,
+        "status": journal.status,
+        "valid": journal.valid,
+        "p1_score": (
+            journal.final_p1_score
+            if journal.final_p1_score is not None
+            else journal.p1_score
+        ),
+        "p2_score": (
+            journal.final_p2_score
+            if journal.final_p2_score is not None
+            else journal.p2_score
+        ),
+        "frame_count": journal.frame_count,
+        "real_duration": journal.real_duration,
+        "pause_duration": journal.pause_duration,
+        "pause_count": journal.pause_count,
+        "post_id": journal.post_id,
+    }
@@ -0,0 +1,73 @@
+import time
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+
+
+class RealClock:
+    """Wall clock time, for live captures.
+
+    The game loop calls tick() for every frame; a real clock ignores the
+    frame timestamps and reads the system clocks.
+    """
+
+    def tick(self, device_time: float | None) -> None:
+        pass
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def now(self) -> datetime:
+        return datetime.now(UTC)
+
+
+class MediaClock:
+    """Time of the frames of a replayed file or synthetic source.
+
+    The clock starts at the wall time it was created and advances to the
+    timestamp of every frame (relative to the first one), so durations
+    measured on a replay are the ones of the original capture, however
+    fast the frames are processed. Frames without a timestamp advance it
+    by the last frame interval, or 1/fps before one is known.
+    """
+
+    def __init__(self, fps: float = 30.0):
+        self.interval = 1 / fps
+        self._start_monotonic = time.monotonic()
+        self._start = datetime.now(UTC)
+        self._elapsed = 0.0
+        self._first_device_time: float | None = None
+        self._last_device_time: float | None = None
+        self._ticks = 0
+
+    def tick(self, device_time: float | None) -> None:
+        self._ticks += 1
+        if device_time is None:
+            if self._ticks > 1:
+                self._elapsed += self.interval
+            return
+        if self._first_device_time is None:
+            # Align the first timestamp with the time already elapsed
+            self._first_device_time = device_time - self._elapsed
+        elif device_time > self._last_device_time:
+            self.interval = device_time - self._last_device_time
+        self._last_device_time = device_time
+        # Time never runs backwards, even if the timestamps do
+        self._elapsed = max(self._elapsed, device_time - self._first_device_time)
+
+    @property
+    def elapsed(self) -> float:
+        """Media seconds since the first frame."""
+        return self._elapsed
+
+    def monotonic(self) -> float:
+        return self._start_monotonic + self._elapsed
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=self._elapsed)
+
+
+def create_clock(source: Path | str) -> RealClock | MediaClock:
+    """Real clock for capture devices, media clock for everything else."""
+    if str(source).startswith("/dev/"):
+        return RealClock()
+    return MediaClock()
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class IdleTracker:
+    """Tracks how long no game has been on screen.
+
+    The game loop reports every classified state; the time since the
+    last busy state is the idle time.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._busy = True
+        self._idle_since = clock()
+
+    def update(self, busy: bool) -> None:
+        if busy:
+            self._busy = True
+        elif self._busy:
+            self._busy = False
+            self._idle_since = self.clock()
+
+    @property
+    def busy(self) -> bool:
+        """True while a game is on screen."""
+        return self._busy
+
+    @property
+    def idle_for(self) -> float:
+        """Seconds since the last busy state, 0 while busy."""
+        return 0.0 if self._busy else self.clock() - self._idle_since
+
+
+def load_per_core() -> float:
+    """One minute load average divided by the number of cores."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return 0.0
+
+
+class DeferredScheduler:
+    """Holds back expensive jobs until the recorder is idle.
+
+    Jobs are released in FIFO order, one at a time, never while a game is
+    on screen: once no game was seen for `idle_seconds`, or earlier if the
+    system load per core is below `max_load`. Releasing a job hands it to
+    `release` (e.g. submits it to the video queue).
+    """
+
+    def __init__(
+        self,
+        release: Callable[[Path], bool],
+        tracker: IdleTracker,
+        idle_seconds: float = 120.0,
+        max_load: float = 0.3,
+        poll_interval: float = 5.0,
+        load: Callable[[], float] = load_per_core,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            release: Called with a deferred folder when it may run;
+                returns False if the job could not be started yet
+            tracker: Idle time of the game loop
+            idle_seconds: Idle time after which jobs are released
+            max_load: Load per core below which jobs are released before
+                `idle_seconds`
+            poll_interval: Seconds between checks
+            load: Returns the current load per core
+        """
+        self.release = release
+        self.tracker = tracker
+        self.idle_seconds = idle_seconds
+        self.max_load = max_load
+        self.poll_interval = poll_interval
+        self.load = load
+        self._pending: deque[Path] = deque()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, folder: Path) -> None:
+        if folder not in self._pending:
+            self._pending.append(folder)
+
+    def can_run(self) -> bool:
+        return not self.tracker.busy and (
+            self.tracker.idle_for >= self.idle_seconds or self.load() < self.max_load
+        )
+
+    def release_due(self, force: bool = False) -> int:
+        """Release the next job if the recorder is idle.
+
+        Only one job is released per check, so a game starting in the
+        meantime stops further releases.
+
+        Args:
+            force: Release the next job even if the recorder is busy
+
+        Returns:
+            Number of released jobs
+        """
+        if not self._pending or not (force or self.can_run()):
+            return 0
+        folder = self._pending[0]
+        if not self.release(folder):
+            return 0
+        self._pending.popleft()
+        logger.info(
+            f"Releasing deferred encode of {folder.name} "
+            f"(idle {self.tracker.idle_for:.0f}s, {len(self)} left)"
+        )
+        return 1
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self.release_due()
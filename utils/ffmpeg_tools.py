@@ -1,35 +1,635 @@
 import logging
+import os
+import re
+import shutil
+import statistics
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
+import cv2
+
 logger = logging.getLogger(__name__)
 
+FrameTimestamps = list[tuple[str, float]]
+
+# Output settings shared by the single-pass and chunked encodes, so that
+# chunks can be joined without re-encoding
+ENCODE_ARGS = ["-c:v libx264", "-pix_fmt yuv420p"]
+
+# Share of a size budget left for the video stream after container overhead
+_SIZE_BUDGET_MARGIN = 0.95
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """An extra output produced from the same decode as the main video.
+
+    Attributes:
+        path: Output file path
+        args: Output options (codec, quality)
+        filters: Filter chain applied to this output only, e.g. scaling
+    """
+
+    path: Path
+    args: tuple[str, ...]
+    filters: str = ""
+
+
+def archive_rendition(path: Path, crf: int = 14) -> Rendition:
+    """High quality copy for keeping, without chroma subsampling."""
+    return Rendition(path, ("-c:v libx264", f"-crf {crf}", "-pix_fmt yuv444p"))
+
+
+def thumbnail_rendition(
+    path: Path, width: int = 320, min_brightness: int = 24
+) -> Rendition:
+    """Poster image from the end of the video (the game over screen).
+
+    The image is overwritten once per second of video, so the file left
+    at the end shows the last frame that isn't (almost) black - the
+    console fades out after the game over screen.
+    """
+    filters = (
+        "fps=1,signalstats,"
+        f"metadata=select:key=lavfi.signalstats.YAVG:value={min_brightness}"
+        f":function=greater,scale={width}:-2"
+    )
+    return Rendition(path, ("-update 1", "-q:v 3"), filters)
+
+
+def preview_rendition(
+    path: Path, duration: float, seconds: float = 10.0, width: int = 320, fps: int = 10
+) -> Rendition:
+    """Short sped-up preview of the whole game (.webm or .gif)."""
+    speed = max(1.0, duration / seconds)
+    filters = f"setpts=PTS/{speed:.3f},fps={fps},scale={width}:-2"
+    if path.suffix == ".gif":
+        return Rendition(path, ("-loop 0",), filters)
+    return Rendition(path, ("-c:v libvpx-vp9", "-b:v 0", "-crf 40"), filters)
+
+
+@dataclass(frozen=True)
+class ProcessLimits:
+    """How ffmpeg shares the machine with the live capture.
+
+    Attributes:
+        nice: Niceness added to ffmpeg processes (0-19)
+        ionice_class: IO scheduling class (1 realtime, 2 best-effort,
+            3 idle), None to keep the default
+        ionice_level: Priority within the best-effort class (0-7)
+        threads: Threads per encoder, filter graph and decoder, 0 for
+            ffmpeg's default (about one per core)
+        cpus: Cores ffmpeg is pinned to, empty for all
+    """
+
+    nice: int = 0
+    ionice_class: int | None = None
+    ionice_level: int | None = None
+    threads: int = 0
+    cpus: tuple[int, ...] = ()
+
+    def command_prefix(self) -> list[str]:
+        """Wrapper commands applying priority and affinity to a command."""
+        prefix = []
+        if self.nice and shutil.which("nice"):
+            prefix += ["nice", f"-n {self.nice}"]
+        if self.ionice_class is not None and shutil.which("ionice"):
+            prefix += ["ionice", f"-c {self.ionice_class}"]
+            if self.ionice_level is not None and self.ionice_class == 2:
+                prefix.append(f"-n {self.ionice_level}")
+        if self.cpus and shutil.which("taskset"):
+            prefix += ["taskset", f"-c {','.join(map(str, self.cpus))}"]
+        return prefix
+
+    def thread_args(self) -> list[str]:
+        """Output options capping the encoder threads."""
+        return [f"-threads {self.threads}"] if self.threads else []
+
+    def global_args(self) -> list[str]:
+        """Options capping filter graph and decoder threads."""
+        if not self.threads:
+            return []
+        return [
+            f"-filter_threads {self.threads}",
+            f"-filter_complex_threads {self.threads}",
+            f"-threads {self.threads}",
+        ]
+
+
+_process_limits = ProcessLimits()
+
+
+def set_process_limits(limits: ProcessLimits) -> None:
+    """Apply priority, thread and affinity limits to all further ffmpeg runs."""
+    global _process_limits
+    _process_limits = limits
+
+
+def get_process_limits() -> ProcessLimits:
+    return _process_limits
+
 
 def ffmpeg_cmd(args: list[str]):
+    limits = _process_limits
+    # exec: the shell is replaced by ffmpeg (or its wrappers, which exec it
+    # too), so killing the process kills the encode. Options before the
+    # first input apply to its decoder.
+    command = limits.command_prefix() + ["ffmpeg"] + limits.global_args() + args
     return subprocess.Popen(
-        " ".join(["ffmpeg"] + args),
+        " ".join(["exec"] + command),
         shell=True,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
     )
 
 
-def create_video(
-    filename: Path, frames_path: Path = Path("frames/*.png"), framerate=10
+def read_timestamps(path: Path) -> tuple[FrameTimestamps, float | None]:
+    """Read a game's timestamps.txt index.
+
+    Returns:
+        Tuple of ([(frame file name, capture timestamp), ...], end timestamp).
+        The end timestamp is None if recording did not finish cleanly.
+    """
+    frames = []
+    end = None
+    for line in path.read_text().splitlines():
+        parts = line.split("\t")
+        if parts[0] == "end":
+            end = float(parts[1])
+        elif len(parts) >= 2:
+            frames.append((parts[0], float(parts[1])))
+    return frames, end
+
+
+def frame_durations(
+    frames: FrameTimestamps, end: float | None = None, default: float = 1 / 25
+) -> list[float]:
+    """Calculate how long each frame is shown from capture timestamps.
+
+    The last frame lasts until `end`, or the median frame interval when
+    the end of recording is unknown.
+    """
+    durations = [b[1] - a[1] for a, b in zip(frames, frames[1:])]
+    if not frames:
+        return durations
+    if end is not None and end > frames[-1][1]:
+        last = end - frames[-1][1]
+    elif durations:
+        last = statistics.median(durations)
+    else:
+        last = default
+    durations.append(last)
+    return durations
+
+
+def write_concat_file(
+    path: Path, frames: FrameTimestamps, end: float | None = None
+) -> float:
+    """Write an ffconcat list with per-frame durations.
+
+    Frame file names are relative to the list's directory.
+
+    Returns:
+        Total duration of the listed frames in seconds
+    """
+    durations = frame_durations(frames, end)
+    return _write_concat(path, [name for name, _ in frames], durations)
+
+
+def _write_concat(
+    path: Path, names: list[str], durations: list[float], repeat_last: bool = True
+) -> float:
+    lines = ["ffconcat version 1.0"]
+    for name, duration in zip(names, durations):
+        lines.append(f"file '{name}'")
+        lines.append(f"duration {duration:.6f}")
+    if names and repeat_last:
+        # The concat demuxer ignores the duration of the last entry
+        # unless the file is listed once more
+        lines.append(f"file '{names[-1]}'")
+    path.write_text("\n".join(lines) + "\n")
+    return sum(durations)
+
+
+def choose_chunk_count(
+    duration: float,
+    cores: int | None = None,
+    min_chunk_seconds: float = 120.0,
+) -> int:
+    """Pick how many chunks to encode a game in.
+
+    One core is left for the live capture, and every chunk covers at
+    least `min_chunk_seconds`, so short games are still encoded in one
+    piece.
+    """
+    cores = cores or os.cpu_count() or 1
+    by_length = int(duration // min_chunk_seconds) if min_chunk_seconds > 0 else cores
+    return max(1, min(cores - 1, by_length))
+
+
+def split_range(count: int, chunks: int) -> list[tuple[int, int]]:
+    """Split `count` items into at most `chunks` contiguous, even ranges."""
+    chunks = max(1, min(chunks, count))
+    bounds = [count * i // chunks for i in range(chunks + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def target_bitrate(duration: float, max_bytes: int, margin: float = _SIZE_BUDGET_MARGIN) -> int:
+    """Video bitrate in kbit/s that keeps `duration` seconds within `max_bytes`."""
+    return max(1, int(max_bytes * 8 * margin / max(duration, 0.1) / 1000))
+
+
+def size_budget_args(duration: float, max_bytes: int, crf: int = 23) -> list[str]:
+    """Capped CRF encode options for a size budget.
+
+    Quality stays CRF-driven for short games; the VBV cap only kicks in
+    when the game is long enough that CRF alone would exceed the budget.
+    """
+    kbps = target_bitrate(duration, max_bytes)
+    return [f"-crf {crf}", f"-maxrate {kbps}k", f"-bufsize {2 * kbps}k"]
+
+
+def fit_to_size(path: Path, max_bytes: int, duration: float, attempts: int = 2) -> int:
+    """Make sure a video fits a size budget, re-encoding it if needed.
+
+    The VBV cap of a capped CRF encode isn't exact, so a video that
+    still ends up over budget is re-encoded from itself with a two-pass
+    average bitrate, lowered further on each attempt.
+
+    Returns:
+        Final size in bytes
+
+    Raises:
+        RuntimeError: If the video still doesn't fit after all attempts
+    """
+    size = path.stat().st_size
+    margin = _SIZE_BUDGET_MARGIN
+    for attempt in range(attempts):
+        if size <= max_bytes:
+            return size
+        if attempt:
+            # Two-pass usually lands on target; undershoot if it didn't
+            margin *= 0.9 * max_bytes / size
+        kbps = target_bitrate(duration, max_bytes, margin)
+        logger.info(
+            f"{path.name} is {size / 1e6:.1f} MB, over the {max_bytes / 1e6:.1f} MB "
+            f"budget; re-encoding at {kbps} kbit/s"
+        )
+        tmp_path = path.with_suffix(".fit" + path.suffix)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            passlog = Path(tmpdir) / "pass"
+            common = [f"-i '{path}'", "-fps_mode passthrough"] + ENCODE_ARGS
+            common += _process_limits.thread_args()
+            common += [f"-b:v {kbps}k", f"-passlogfile '{passlog}'"]
+            proc = ffmpeg_cmd(["-y"] + common + ["-pass 1", "-an", "-f null", "/dev/null"])
+            _check_result(proc, *proc.communicate())
+            proc = ffmpeg_cmd(["-y"] + common + ["-pass 2", f"'{tmp_path}'"])
+            _check_result(proc, *proc.communicate())
+        tmp_path.replace(path)
+        size = path.stat().st_size
+    if size > max_bytes:
+        raise RuntimeError(
+            f"{path.name} is {size / 1e6:.1f} MB, over the {max_bytes / 1e6:.1f} MB budget"
+        )
+    return size
+
+
+def remux_frames(timestamps: Path, archive: Path) -> float:
+    """Store timestamped frames in a video container without re-encoding.
+
+    The PNG frames are copied as-is into a Matroska file (PNG-in-MKV) with
+    their capture timing, which costs hardly any CPU. The archive can be
+    encoded properly later with create_video(source=...).
+
+    Returns:
+        Duration of the archived frames in seconds
+    """
+    frames, end = read_timestamps(timestamps)
+    concat_path = timestamps.parent / "frames.ffconcat"
+    duration = write_concat_file(concat_path, frames, end)
+    proc = ffmpeg_cmd(
+        ["-f concat", "-safe 0", f"-i '{concat_path}'", "-c copy", "-y", f"'{archive}'"]
+    )
+    _check_result(proc, *proc.communicate())
+    return duration
+
+
+def create_quick_preview(
+    timestamps: Path, filename: Path, height: int = 360, fps: float = 5.0
 ):
+    """Encode a cheap low resolution preview of timestamped frames.
+
+    Only about `fps` frames per second are decoded, each shown until the
+    next picked frame, and they are encoded with the fastest x264 preset.
+    """
+    frames, end = read_timestamps(timestamps)
+    durations = frame_durations(frames, end)
+    names = []
+    picked_durations = []
+    for (name, _), duration in zip(frames, durations):
+        if picked_durations and picked_durations[-1] < 1 / fps:
+            picked_durations[-1] += duration
+        else:
+            names.append(name)
+            picked_durations.append(duration)
+    concat_path = timestamps.parent / "preview.ffconcat"
+    _write_concat(concat_path, names, picked_durations)
     proc = ffmpeg_cmd(
         [
+            "-f concat",
+            "-safe 0",
+            f"-i '{concat_path}'",
+            "-fps_mode vfr",
+            f"-vf scale=-2:{height}",
+            "-c:v libx264",
+            "-preset ultrafast",
+            "-crf 30",
+            "-pix_fmt yuv420p",
+        ]
+        + _process_limits.thread_args()
+        + [
+            "-y",
+            f"'{filename}'",
+        ]
+    )
+    _check_result(proc, *proc.communicate())
+
+
+def timestamps_duration(timestamps: Path) -> float:
+    """Duration of the frames indexed in a timestamps.txt, in seconds."""
+    return sum(frame_durations(*read_timestamps(timestamps)))
+
+
+def video_duration(path: Path) -> float | None:
+    """Duration of the first video stream, None if it has no frames.
+
+    Measured from the packet timestamps up to the end of the last shown
+    frame. The container header can't be trusted: an MP4 header ends at
+    the last decode timestamp, which can be seconds before the last frame
+    when a frame is held near the end of a VFR video. A killed encode
+    leaves no readable packets (MP4) or only those written so far.
+    """
+    # framecrc lists every packet with its timestamps; -c copy skips decoding
+    proc = ffmpeg_cmd(
+        ["-hide_banner", f"-i '{path}'", "-map 0:v:0", "-c copy", "-f framecrc", "-"]
+    )
+    stdout, _ = proc.communicate()
+    time_base = None
+    start = end = None
+    for line in stdout.decode(errors="replace").splitlines():
+        if line.startswith("#tb 0:"):
+            num, den = line.split(":", 1)[1].split("/")
+            time_base = int(num) / int(den)
+        elif line.startswith("0,"):
+            # stream, dts, pts, duration, size, crc
+            fields = line.split(",")
+            pts, duration = int(fields[2]), int(fields[3])
+            start = pts if start is None else min(start, pts)
+            end = pts + duration if end is None else max(end, pts + duration)
+    if time_base is None or start is None:
+        return None
+    return (end - start) * time_base
+
+
+def is_valid_video(
+    path: Path, expected_duration: float | None = None, tolerance: float = 0.05
+) -> bool:
+    """Check that an encode produced a complete output file.
+
+    The file must not be empty and, when `expected_duration` is given,
+    its duration must be within `tolerance` of it (and at most half a
+    second off for short videos), so that truncated encodes or joins
+    missing a chunk are caught before their frames are deleted.
+    """
+    if not path.exists() or path.stat().st_size == 0:
+        return False
+    if expected_duration is None:
+        return True
+    duration = video_duration(path)
+    if duration is None:
+        logger.warning(f"{path.name} has no duration, the encode is incomplete")
+        return False
+    if abs(duration - expected_duration) > max(expected_duration * tolerance, 0.5):
+        logger.warning(
+            f"{path.name} lasts {duration:.2f}s instead of {expected_duration:.2f}s"
+        )
+        return False
+    return True
+
+
+def video_dimensions(path: Path) -> tuple[int, int] | None:
+    """Width and height of a video, or None if it can't be opened."""
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if not cap.isOpened():
+            return None
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()
+    return (width, height) if width and height else None
+
+
+def _output_args(
+    filename: Path | None,
+    renditions: list[Rendition],
+    vfr: bool,
+    video_args: list[str] = ENCODE_ARGS,
+) -> list[str]:
+    """Output options for the main video and extra renditions.
+
+    With renditions, the decoded frames are split once in a filter graph
+    and fed to every output, so the input is decoded a single time.
+    """
+    mode = ["-fps_mode vfr"] if vfr else []
+    threads = _process_limits.thread_args()
+    if not renditions:
+        return mode + video_args + threads + ["-y", str(filename)]
+
+    outputs = [(None, video_args, filename)] if filename is not None else []
+    outputs += [(r.filters, list(r.args), r.path) for r in renditions]
+    graph = [f"[0:v]split={len(outputs)}" + "".join(f"[s{i}]" for i in range(len(outputs)))]
+    args = ["-y"]
+    for i, (filters, output_args, path) in enumerate(outputs):
+        label = f"s{i}"
+        if filters:
+            graph.append(f"[s{i}]{filters}[o{i}]")
+            label = f"o{i}"
+        args += [f"-map '[{label}]'"] + mode + output_args + threads + [f"'{path}'"]
+    return ["-filter_complex", f"'{';'.join(graph)}'"] + args
+
+
+def create_renditions(source: Path, renditions: list[Rendition]):
+    """Produce extra renditions from an encoded video in one decode."""
+    if not renditions:
+        return
+    proc = ffmpeg_cmd([f"-i '{source}'"] + _output_args(None, renditions, vfr=True))
+    _check_result(proc, *proc.communicate())
+
+
+def create_video(
+    filename: Path,
+    frames_path: Path = Path("frames/*.png"),
+    framerate=10,
+    timestamps: Path | None = None,
+    chunks: int = 1,
+    renditions: list[Rendition] | None = None,
+    max_bytes: int | None = None,
+    source: Path | None = None,
+):
+    """Encode frames into an H.264 video.
+
+    Args:
+        filename: Output video path
+        frames_path: Glob pattern of frames, used with a constant framerate
+        framerate: Constant input framerate
+        timestamps: Optional timestamps.txt index; when given, frames are
+            read through the concat demuxer with their real durations and
+            encoded as variable frame rate video
+        chunks: Number of parallel chunks for timestamped frames, or 0 to
+            pick it from the core count and game length
+        renditions: Extra outputs, encoded from the same decode of the
+            frames (or, when chunked, of the joined video)
+        max_bytes: Optional size budget of the video; the bitrate is
+            capped so that the whole game fits (see size_budget_args)
+        source: Video to read the frames from instead, e.g. an archive
+            written by remux_frames; `timestamps` then only provides the
+            duration
+
+    Returns:
+        Duration of the encoded frames in seconds
+    """
+    renditions = renditions or []
+    if timestamps is not None:
+        frames, end = read_timestamps(timestamps)
+        duration = sum(frame_durations(frames, end))
+    else:
+        frames = sorted(frames_path.parent.glob(frames_path.name))
+        duration = len(frames) / framerate
+    video_args = ENCODE_ARGS
+    if max_bytes:
+        video_args = ENCODE_ARGS + size_budget_args(duration, max_bytes)
+
+    if timestamps is not None and chunks != 1 and source is None:
+        if chunks == 0:
+            # Pinned encodes get all of their cores, the capture runs elsewhere
+            cpus = _process_limits.cpus
+            chunks = choose_chunk_count(duration, len(cpus) + 1 if cpus else None)
+        if chunks > 1 and len(frames) > 1:
+            create_video_chunked(filename, timestamps, chunks, video_args)
+            # Decoding the joined video is far cheaper than the frames
+            create_renditions(filename, renditions)
+            return duration
+
+    if source is not None:
+        input_args = [f"-i '{source}'"]
+    elif timestamps is not None:
+        concat_path = timestamps.parent / "frames.ffconcat"
+        write_concat_file(concat_path, frames, end)
+        input_args = [
+            "-f concat",
+            "-safe 0",
+            f"-i '{concat_path}'",
+        ]
+    else:
+        input_args = [
             f"-framerate {framerate}",
             "-pattern_type glob",
             f"-i '{frames_path}'",
-            "-c:v libx264",
-            "-pix_fmt yuv420p",
-            "-y",  # Overwrite output file if exists
-            str(filename),
         ]
+    # -y: Overwrite output files if exist
+    proc = ffmpeg_cmd(
+        input_args
+        + _output_args(
+            filename,
+            renditions,
+            timestamps is not None or source is not None,
+            video_args,
+        )
     )
-    stdout, stderr = proc.communicate()
+    _check_result(proc, *proc.communicate())
+    return duration
+
+
+def create_video_chunked(
+    filename: Path,
+    timestamps: Path,
+    chunks: int,
+    video_args: list[str] = ENCODE_ARGS,
+):
+    """Encode timestamped frames in parallel chunks and join them.
+
+    The frame list is split into contiguous chunks that are encoded by
+    separate ffmpeg processes with the same settings as create_video.
+    Every chunk starts with a keyframe, so the chunks are joined with the
+    concat demuxer without re-encoding. Each chunk keeps the real
+    durations of its frames, so timing matches the single-pass encode.
+    """
+    folder = timestamps.parent
+    frames, end = read_timestamps(timestamps)
+    names = [name for name, _ in frames]
+    durations = frame_durations(frames, end)
+    ranges = split_range(len(frames), chunks)
+    logger.info(f"Encoding {len(frames)} frames in {len(ranges)} chunks")
+
+    chunk_paths = []
+    chunk_durations = []
+    procs = []
+    try:
+        for i, (start, stop) in enumerate(ranges):
+            concat_path = folder / f"chunk_{i:03d}.ffconcat"
+            chunk_path = folder / f"chunk_{i:03d}.mp4"
+            # Only the final chunk repeats its last frame to keep its
+            # duration; the others end where the list below starts the next
+            chunk_durations.append(
+                _write_concat(
+                    concat_path,
+                    names[start:stop],
+                    durations[start:stop],
+                    repeat_last=stop == len(frames),
+                )
+            )
+            chunk_paths.append(chunk_path)
+            procs.append(
+                ffmpeg_cmd(
+                    [
+                        "-f concat",
+                        "-safe 0",
+                        f"-i '{concat_path}'",
+                        "-fps_mode vfr",
+                    ]
+                    + video_args
+                    + _process_limits.thread_args()
+                    + ["-y", f"'{chunk_path}'"]
+                )
+            )
+        # Drain all pipes concurrently so no process blocks on a full pipe
+        with ThreadPoolExecutor(len(procs)) as pool:
+            results = list(pool.map(lambda p: p.communicate(), procs))
+        for proc, (stdout, stderr) in zip(procs, results):
+            _check_result(proc, stdout, stderr)
+
+        list_path = folder / "chunks.ffconcat"
+        _write_concat(
+            list_path, [p.name for p in chunk_paths], chunk_durations, repeat_last=False
+        )
+        proc = ffmpeg_cmd(
+            ["-f concat", "-safe 0", f"-i '{list_path}'", "-c copy", "-y", str(filename)]
+        )
+        _check_result(proc, *proc.communicate())
+    finally:
+        for proc in procs:
+            if proc.returncode is None:
+                proc.kill()
+                proc.wait()
+        for path in folder.glob("chunk*"):
+            path.unlink(missing_ok=True)
+
 
+def _check_result(proc, stdout: bytes, stderr: bytes):
     if proc.returncode != 0:
         logger.error(f"ffmpeg failed with return code {proc.returncode}")
         logger.error(f"ffmpeg stderr: {stderr.decode()}")
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    folder: Path
+    enqueued_at: float  # wall clock, so waits survive a restart
+
+
+@dataclass
+class QueueStats:
+    submitted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    run_total: float = 0.0
+    run_max: float = 0.0
+
+    @property
+    def started(self) -> int:
+        return self.completed + self.failed
+
+    @property
+    def wait_avg(self) -> float:
+        return self.wait_total / self.started if self.started else 0.0
+
+    @property
+    def run_avg(self) -> float:
+        return self.run_total / self.started if self.started else 0.0
+
+
+class JobQueue:
+    """Bounded FIFO queue of game folders processed by a fixed worker pool.
+
+    Game over only submits a job; at most `workers` jobs run at once, so
+    back-to-back games can't start several encodes that starve the live
+    capture. The queue holds at most `max_size` waiting jobs. The game
+    loop uses submit_nowait() and never waits for room - a rejected game
+    keeps its journal and is picked up on the next start - while recovery
+    uses submit(), which waits for room.
+
+    Waiting and running jobs are persisted to `state_path` so their order
+    and enqueue times survive a restart.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Path], Awaitable[None]],
+        workers: int = 1,
+        max_size: int = 16,
+        state_path: Path | None = None,
+        name: str = "video",
+    ):
+        """Initialize the queue.
+
+        Args:
+            handler: Coroutine function processing one game folder
+            workers: Number of jobs processed concurrently
+            max_size: Maximum number of waiting jobs
+            state_path: JSON file to persist pending jobs to
+            name: Name used in log messages
+        """
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_size = max_size
+        self.state_path = state_path
+        self.name = name
+        self.stats = QueueStats()
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_size)
+        self._waiting: dict[Path, Job] = {}
+        self._running: dict[Path, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return len(self._waiting)
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    @property
+    def full(self) -> bool:
+        return self._queue.full()
+
+    def is_queued(self, folder: Path) -> bool:
+        """Whether a folder is waiting or being processed."""
+        return folder in self._waiting or folder in self._running
+
+    def submit_nowait(self, folder: Path, enqueued_at: float | None = None) -> bool:
+        """Queue a job without waiting.
+
+        Returns:
+            False if the queue is full or the folder is already queued
+        """
+        if self.is_queued(folder):
+            return False
+        job = Job(folder, enqueued_at if enqueued_at is not None else time.time())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats.rejected += 1
+            logger.warning(f"{self.name} queue full, not queueing {folder.name}")
+            return False
+        self._add(job)
+        return True
+
+    async def submit(self, folder: Path, enqueued_at: float | None = None) -> bool:
+        """Queue a job, waiting for room if the queue is full."""
+        if self.is_queued(folder):
+            return False
+        job = Job(folder, enqueued_at if enqueued_at is not None else time.time())
+        await self._queue.put(job)
+        self._add(job)
+        return True
+
+    def start(self) -> None:
+        """Start the worker tasks."""
+        for i in range(self.workers - len(self._tasks)):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def join(self) -> None:
+        """Wait until every queued job was processed."""
+        await self._queue.join()
+
+    async def stop(self) -> None:
+        """Cancel the workers. Pending jobs stay persisted."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def load_pending(self) -> list[Job]:
+        """Read jobs persisted by a previous run, in queue order."""
+        if self.state_path is None:
+            return []
+        try:
+            entries = json.loads(self.state_path.read_text())
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read {self.name} queue state: {e}")
+            return []
+        return [Job(Path(e["folder"]), e["enqueued_at"]) for e in entries]
+
+    def _add(self, job: Job) -> None:
+        self._waiting[job.folder] = job
+        self.stats.submitted += 1
+        self._save()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            del self._waiting[job.folder]
+            self._running[job.folder] = job
+            wait = max(0.0, time.time() - job.enqueued_at)
+            self.stats.wait_total += wait
+            self.stats.wait_max = max(self.stats.wait_max, wait)
+            logger.info(
+                f"{self.name} job {job.folder.name} started after {wait:.1f}s "
+                f"(waiting: {self.depth}, running: {self.running})"
+            )
+            start = time.monotonic()
+            try:
+                await self.handler(job.folder)
+                self.stats.completed += 1
+            except Exception as e:
+                self.stats.failed += 1
+                logger.error(f"{self.name} job {job.folder.name} failed: {e}")
+            finally:
+                run = time.monotonic() - start
+                self.stats.run_total += run
+                self.stats.run_max = max(self.stats.run_max, run)
+                del self._running[job.folder]
+                self._save()
+                self._queue.task_done()
+
+    def _save(self) -> None:
+        if self.state_path is None:
+            return
+        jobs = list(self._running.values()) + list(self._waiting.values())
+        entries = [
+            {"folder": str(j.folder), "enqueued_at": j.enqueued_at} for j in jobs
+        ]
+        tmp_path = self.state_path.with_suffix(".tmp")
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(entries, indent=2))
+            tmp_path.replace(self.state_path)
+        except OSError as e:
+            logger.warning(f"Could not write {self.name} queue state: {e}")
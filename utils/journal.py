@@ -0,0 +1,125 @@
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILE = "journal.json"
+
+# recording: frames are being written (or the process died while they were)
+# recorded: game over was reached, video not processed yet
+# archived: frames were remuxed and a preview posted, final encode deferred
+# processed: video was compiled (and posted)
+# discarded: not a valid game, nothing to post
+# failed: processing failed too many times
+JournalStatus = Literal[
+    "recording", "recorded", "archived", "processed", "discarded", "failed"
+]
+
+_PERSISTED_FIELDS = (
+    "started_at",
+    "status",
+    "valid",
+    "frame_count",
+    "p1_score",
+    "p2_score",
+    "final_p1_score",
+    "final_p2_score",
+    "pause_duration",
+    "pause_count",
+    "real_duration",
+    "attempts",
+    "post_id",
+    "interrupted",
+)
+
+
+@dataclass
+class GameJournal:
+    """Small per-game state file that survives a crash of the recorder.
+
+    The journal is written as journal.json into the game folder when a
+    game starts, flushed at most every `flush_interval` seconds while
+    recording, and immediately on status changes. On startup, games whose
+    journal is not processed/discarded/failed are picked up again and
+    compiled in the background.
+    """
+
+    folder: Path
+    started_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+    status: JournalStatus = "recording"
+    valid: bool = False
+    frame_count: int = 0
+    p1_score: int | None = None
+    p2_score: int | None = None
+    final_p1_score: int | None = None
+    final_p2_score: int | None = None
+    pause_duration: float = 0.0
+    pause_count: int = 0
+    real_duration: float | None = None
+    attempts: int = 0
+    post_id: int | None = None  # Outbox post of the preview, edited later
+    interrupted: bool = False  # Recording stopped by a crash, scores not final
+    flush_interval: float = 5.0
+    _last_flush: float = field(default=0.0, repr=False)
+
+    @property
+    def path(self) -> Path:
+        return self.folder / JOURNAL_FILE
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("processed", "discarded", "failed")
+
+    def update(self, **fields) -> None:
+        """Update fields, flushing if the flush interval has passed."""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def mark(self, status: JournalStatus, **fields) -> None:
+        """Change status (and optionally other fields) and flush immediately."""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.status = status
+        self.flush()
+
+    def flush(self) -> None:
+        """Atomically write the journal to disk."""
+        data = {name: getattr(self, name) for name in _PERSISTED_FIELDS}
+        tmp_path = self.folder / f"{JOURNAL_FILE}.tmp"
+        try:
+            tmp_path.write_text(json.dumps(data, indent=2))
+            tmp_path.replace(self.path)
+        except OSError as e:
+            logger.warning(f"Could not write journal for {self.folder.name}: {e}")
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def load(cls, folder: Path) -> "GameJournal | None":
+        """Load a game's journal, or None if missing or unreadable."""
+        try:
+            data = json.loads((folder / JOURNAL_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+        fields = {name: data[name] for name in _PERSISTED_FIELDS if name in data}
+        return cls(folder=folder, **fields)
+
+
+def find_unfinished_games(games_path: Path) -> list[GameJournal]:
+    """Find games left unprocessed by a previous run, oldest first."""
+    if not games_path.exists():
+        return []
+    journals = []
+    for folder in sorted(games_path.iterdir(), key=lambda x: x.name):
+        if not folder.is_dir() or not folder.name.startswith("game_"):
+            continue
+        journal = GameJournal.load(folder)
+        if journal is not None and not journal.is_finished:
+            journals.append(journal)
+    return journals
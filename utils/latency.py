@@ -0,0 +1,121 @@
+import math
+from array import array
+
+
+class LatencyHistogram:
+    """Fixed-memory histogram of durations with log-spaced buckets.
+
+    Buckets grow by a constant factor (2 ** (1 / buckets_per_octave)), so
+    every quantile is known within that relative error (about 19% with
+    the default 4 buckets per octave) over the whole range, from
+    microseconds to seconds. Recording only increments a preallocated
+    counter; histograms with the same layout can be merged, e.g. the
+    per-interval histograms of a game, or those of several workers.
+    """
+
+    def __init__(
+        self,
+        min_value: float = 1e-5,
+        max_value: float = 10.0,
+        buckets_per_octave: int = 4,
+    ):
+        """Initialize an empty histogram.
+
+        Args:
+            min_value: Upper bound of the first bucket in seconds
+            max_value: Values above this go to the overflow bucket
+            buckets_per_octave: Buckets per doubling of the value
+        """
+        self.min_value = min_value
+        self.buckets_per_octave = buckets_per_octave
+        octaves = math.log2(max_value / min_value)
+        # Bucket 0 holds values <= min_value, the last one overflows
+        self._size = int(math.ceil(octaves * buckets_per_octave)) + 2
+        self.counts = array("Q", bytes(8 * self._size))
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @property
+    def layout(self) -> tuple[float, int, int]:
+        return (self.min_value, self.buckets_per_octave, self._size)
+
+    def record(self, value: float) -> None:
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = 1 + int(math.log2(value / self.min_value) * self.buckets_per_octave)
+            if index >= self._size:
+                index = self._size - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def upper_bound(self, index: int) -> float:
+        """Largest value counted in a bucket."""
+        return self.min_value * 2 ** (index / self.buckets_per_octave)
+
+    def quantile(self, q: float) -> float:
+        """Value below which a share `q` of the recorded values lie.
+
+        Returns the upper bound of the bucket holding the quantile,
+        capped at the largest recorded value (which is also returned for
+        the overflow bucket); 0 if nothing was recorded.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index == self._size - 1:
+                    return self.max  # Overflow bucket has no upper bound
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add the values recorded by another histogram with the same layout."""
+        if other.layout != self.layout:
+            raise ValueError("Cannot merge histograms with different buckets")
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def reset(self) -> None:
+        for index in range(self._size):
+            self.counts[index] = 0
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def summary(self) -> dict[str, float]:
+        """p50/p90/p99/max and mean in seconds, plus the count."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+    def __str__(self) -> str:
+        if not self.count:
+            return "-"
+        return (
+            f"p50={self.quantile(0.5) * 1000:.1f} "
+            f"p90={self.quantile(0.9) * 1000:.1f} "
+            f"p99={self.quantile(0.99) * 1000:.1f} "
+            f"max={self.max * 1000:.1f}ms"
+        )
@@ -0,0 +1,415 @@
+import bisect
+import logging
+import resource
+import time
+from typing import Callable, Iterable
+
+from aiohttp import web
+
+from utils.profiler import FrameProfiler
+
+logger = logging.getLogger(__name__)
+
+# Bucket bounds in seconds
+STAGE_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+JOB_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+STAGES = ("strip", "pause", "two_player", "game_over", "score", "total")
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds.
+
+    observe() only increments a counter, so it can be called for every
+    classified frame.
+    """
+
+    def __init__(self, bounds: Iterable[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str = "") -> list[str]:
+        """Exposition lines (_bucket, _sum, _count) for this histogram."""
+        prefix = f"{labels}," if labels else ""
+        lines = []
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {total}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class RateMeter:
+    """Counts events and their rate over the last full window."""
+
+    def __init__(
+        self, window: float = 5.0, clock: Callable[[], float] = time.monotonic
+    ):
+        self.window = window
+        self.clock = clock
+        self.total = 0
+        self.rate = 0.0
+        self._window_start = clock()
+        self._window_count = 0
+
+    def tick(self, n: int = 1) -> None:
+        self.total += n
+        self._window_count += n
+        now = self.clock()
+        elapsed = now - self._window_start
+        if elapsed >= self.window:
+            self.rate = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+
+
+class RecorderMetrics:
+    """Runtime metrics of the recorder in Prometheus text format.
+
+    The game loop only bumps counters and histograms; queue depths,
+    outbox and disk usage are read from the bound components when the
+    endpoint is scraped, so metrics cost nothing between scrapes.
+    """
+
+    def __init__(self):
+        self.captured = RateMeter()
+        self.classified = RateMeter()
+        self.frames_recorded = 0
+        # Frames of a game that were not written, e.g. while the disk was full
+        self.frames_dropped = 0
+        self.bytes_recorded = 0
+        # Frames lost before reaching the loop (see GapDetector)
+        self.capture_dropped = 0
+        self.loop_stalls = 0
+        self.state = "NOT_TETRIS"
+        self.states: tuple[str, ...] = ("NOT_TETRIS", "MENU", "GAME", "GAME_OVER")
+        self.games = {"recorded": 0, "discarded": 0}
+        self.stage_seconds = {stage: Histogram(STAGE_BUCKETS) for stage in STAGES}
+        self.record_seconds = Histogram(STAGE_BUCKETS)
+        self.encode_seconds = Histogram(JOB_BUCKETS)
+        self.upload_seconds = Histogram(JOB_BUCKETS)
+        self.video_queue = None
+        self.outbox = None
+        self.retention = None
+
+    def bind(self, video_queue=None, outbox=None, retention=None) -> None:
+        """Components whose state is exported on scrape."""
+        if video_queue is not None:
+            self.video_queue = video_queue
+        if outbox is not None:
+            self.outbox = outbox
+        if retention is not None:
+            self.retention = retention
+
+    def observe_timing(self, timing) -> None:
+        """Add one classification's TimingStats (skipped stages are 0)."""
+        self.classified.tick()
+        stages = self.stage_seconds
+        stages["strip"].observe(timing.strip_time)
+        if timing.is_paused_time:
+            stages["pause"].observe(timing.is_paused_time)
+        if timing.is_two_player_time:
+            stages["two_player"].observe(timing.is_two_player_time)
+        if timing.game_over_time:
+            stages["game_over"].observe(timing.game_over_time)
+        if timing.score_detect_time:
+            stages["score"].observe(timing.score_detect_time)
+        stages["total"].observe(timing.total_time)
+
+    def render(self) -> str:
+        out = []
+
+        def metric(name: str, kind: str, help_text: str, lines: list[str]):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+
+        metric(
+            "tetris_frames_captured_total",
+            "counter",
+            "Frames read from the capture source",
+            [f"tetris_frames_captured_total {self.captured.total}"],
+        )
+        metric(
+            "tetris_capture_fps",
+            "gauge",
+            "Capture rate over the last window",
+            [f"tetris_capture_fps {self.captured.rate:.2f}"],
+        )
+        metric(
+            "tetris_frames_classified_total",
+            "counter",
+            "Frames classified",
+            [f"tetris_frames_classified_total {self.classified.total}"],
+        )
+        metric(
+            "tetris_classified_fps",
+            "gauge",
+            "Classification rate over the last window",
+            [f"tetris_classified_fps {self.classified.rate:.2f}"],
+        )
+        metric(
+            "tetris_frames_recorded_total",
+            "counter",
+            "Frames written to game folders",
+            [f"tetris_frames_recorded_total {self.frames_recorded}"],
+        )
+        metric(
+            "tetris_frames_dropped_total",
+            "counter",
+            "Game frames that were not recorded",
+            [f"tetris_frames_dropped_total {self.frames_dropped}"],
+        )
+        metric(
+            "tetris_recorded_bytes_total",
+            "counter",
+            "Bytes of frames written to game folders",
+            [f"tetris_recorded_bytes_total {self.bytes_recorded}"],
+        )
+        metric(
+            "tetris_capture_dropped_frames_total",
+            "counter",
+            "Frames missing from the capture according to device timestamps",
+            [f"tetris_capture_dropped_frames_total {self.capture_dropped}"],
+        )
+        metric(
+            "tetris_loop_stalls_total",
+            "counter",
+            "Game loop iterations longer than a frame interval",
+            [f"tetris_loop_stalls_total {self.loop_stalls}"],
+        )
+        metric(
+            "tetris_game_state",
+            "gauge",
+            "Current state of the game state machine",
+            [
+                f'tetris_game_state{{state="{s}"}} {int(s == self.state)}'
+                for s in self.states
+            ],
+        )
+        metric(
+            "tetris_games_total",
+            "counter",
+            "Finished games by outcome",
+            [f'tetris_games_total{{outcome="{k}"}} {v}' for k, v in self.games.items()],
+        )
+        lines = []
+        for stage, histogram in self.stage_seconds.items():
+            lines += histogram.samples(
+                "tetris_classify_stage_seconds", f'stage="{stage}"'
+            )
+        metric(
+            "tetris_classify_stage_seconds",
+            "histogram",
+            "Time spent per classification stage",
+            lines,
+        )
+        metric(
+            "tetris_record_seconds",
+            "histogram",
+            "Time spent writing a game frame",
+            self.record_seconds.samples("tetris_record_seconds"),
+        )
+        metric(
+            "tetris_encode_seconds",
+            "histogram",
+            "Duration of video encodes",
+            self.encode_seconds.samples("tetris_encode_seconds"),
+        )
+        metric(
+            "tetris_upload_seconds",
+            "histogram",
+            "Duration of Telegram uploads",
+            self.upload_seconds.samples("tetris_upload_seconds"),
+        )
+        if self.video_queue is not None:
+            self._render_queue(metric)
+        if self.outbox is not None:
+            metric(
+                "tetris_outbox_posts",
+                "gauge",
+                "Outbox posts by status",
+                [
+                    f'tetris_outbox_posts{{status="{s}"}} {self.outbox.count(s)}'
+                    for s in ("pending", "sending", "sent", "failed")
+                ],
+            )
+        if self.retention is not None:
+            self._render_disk(metric)
+        return "\n".join(out) + "\n"
+
+    def _render_queue(self, metric) -> None:
+        queue = self.video_queue
+        stats = queue.stats
+        metric(
+            "tetris_video_queue_waiting",
+            "gauge",
+            "Games waiting for an encode worker",
+            [f"tetris_video_queue_waiting {queue.depth}"],
+        )
+        metric(
+            "tetris_video_queue_running",
+            "gauge",
+            "Games being processed",
+            [f"tetris_video_queue_running {queue.running}"],
+        )
+        metric(
+            "tetris_video_jobs_total",
+            "counter",
+            "Processing jobs by result",
+            [
+                f'tetris_video_jobs_total{{result="completed"}} {stats.completed}',
+                f'tetris_video_jobs_total{{result="failed"}} {stats.failed}',
+                f'tetris_video_jobs_total{{result="rejected"}} {stats.rejected}',
+            ],
+        )
+        metric(
+            "tetris_video_queue_wait_seconds_max",
+            "gauge",
+            "Longest wait for a worker",
+            [f"tetris_video_queue_wait_seconds_max {stats.wait_max:.3f}"],
+        )
+
+    def _render_disk(self, metric) -> None:
+        retention = self.retention
+        metric(
+            "tetris_storage_bytes",
+            "gauge",
+            "Bytes used per retention category",
+            [
+                f'tetris_storage_bytes{{category="{c}"}} {retention.size(c)}'
+                for c in retention.budgets
+            ],
+        )
+        metric(
+            "tetris_storage_budget_bytes",
+            "gauge",
+            "Byte budget per retention category",
+            [
+                f'tetris_storage_budget_bytes{{category="{c}"}} {b}'
+                for c, b in retention.budgets.items()
+            ],
+        )
+        try:
+            free = retention.disk_free()
+        except OSError:
+            free = 0
+        metric(
+            "tetris_disk_free_bytes",
+            "gauge",
+            "Free space on the recording disk",
+            [f"tetris_disk_free_bytes {free}"],
+        )
+        metric(
+            "tetris_disk_emergency",
+            "gauge",
+            "1 while recording is stopped for disk space",
+            [f"tetris_disk_emergency {int(retention.emergency)}"],
+        )
+
+
+# Shared by the game loop, the processing jobs and the endpoint
+metrics = RecorderMetrics()
+
+
+def peak_rss() -> int:
+    """Peak resident memory of this process in bytes."""
+    # ru_maxrss is in kilobytes on Linux. The RUSAGE_CHILDREN figure is
+    # left out: it includes the memory children inherit at fork, so it
+    # says nothing about the encoders themselves.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def benchmark_report(
+    registry: RecorderMetrics, replay_seconds: float, output_bytes: int = 0
+) -> str:
+    """Summary of a benchmark replay (see main.py --benchmark).
+
+    Args:
+        registry: Metrics collected during the replay
+        replay_seconds: Wall time of the game loop, without the wait for
+            the encodes
+        output_bytes: Size of the encoded videos
+    """
+    frames = registry.captured.total
+    fps = frames / replay_seconds if replay_seconds > 0 else 0.0
+    lines = [
+        f"Frames:          {frames} in {replay_seconds:.1f}s, {fps:.1f} fps sustained",
+        f"Classifications: {registry.classified.total}",
+        f"Recorded:        {registry.frames_recorded} frames, "
+        f"{registry.bytes_recorded / 1e6:.1f} MB",
+        f"Videos:          {output_bytes / 1e6:.1f} MB",
+        f"Encode:          {registry.encode_seconds.sum:.1f}s "
+        f"in {registry.encode_seconds.count} job(s)",
+    ]
+    lines.append(f"Peak RSS:        {peak_rss() / 2**20:.0f} MiB")
+
+    # Where the loop's time went; "other" is decoding and bookkeeping
+    stages = registry.stage_seconds
+    shares = [(name, stages[name].sum) for name in STAGES if name != "total"]
+    shares.append(("record", registry.record_seconds.sum))
+    other = replay_seconds - stages["total"].sum - registry.record_seconds.sum
+    shares.append(("other", max(other, 0.0)))
+    lines.append("Loop time share:")
+    for name, seconds in shares:
+        share = seconds / replay_seconds if replay_seconds > 0 else 0.0
+        lines.append(f"  {name:<12} {seconds:8.2f}s {share:6.1%}")
+    return "\n".join(lines)
+
+
+async def start_metrics_server(
+    registry: RecorderMetrics,
+    host: str = "127.0.0.1",
+    port: int = 9108,
+    profiler: FrameProfiler | None = None,
+) -> web.AppRunner:
+    """Serve /metrics from the running event loop.
+
+    With a profiler, POST /profile?frames=N profiles the next N frames
+    of the game loop (see FrameProfiler).
+
+    Returns:
+        Runner to clean up the server with
+    """
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(
+            text=registry.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def profile(request: web.Request) -> web.Response:
+        try:
+            frames = int(request.query["frames"]) if "frames" in request.query else None
+        except ValueError:
+            return web.Response(status=400, text="frames must be a number\n")
+        if frames is not None and frames <= 0:
+            return web.Response(status=400, text="frames must be positive\n")
+        if not profiler.request(frames):
+            return web.Response(status=409, text="A profile is already running\n")
+        return web.Response(
+            status=202,
+            text=f"Profiling the next {frames or profiler.frames} frames "
+            f"into {profiler.output_dir}\n",
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    if profiler is not None:
+        app.router.add_post("/profile", profile)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
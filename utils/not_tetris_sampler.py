@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from cv_tools.debug import save_image
+from cv_tools.frame_diff import dhash, hamming_distance
+from utils.dirs import clean_dir
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+
+
+@dataclass
+class Sample:
+    hash: int
+    color: tuple[float, float, float]
+    size: int
+
+
+class NotTetrisSampler:
+    """Keeps a small, diverse archive of frames that were not tetris.
+
+    Most NOT_TETRIS frames are the same black or no-signal image, so
+    saving all of them only costs I/O. Each offered frame is reduced to a
+    perceptual hash plus its mean color and compared against an in-memory
+    index of the kept samples; it is saved only if nothing similar is kept
+    yet. The archive is capped by count and bytes, evicting the oldest
+    samples first.
+
+    The index is persisted as index.json next to the samples and loaded
+    once, so the directory is never listed while running.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        max_count: int = 1000,
+        max_bytes: int = 200 * 1024 * 1024,
+        min_distance: int = 6,
+        color_tolerance: float = 24.0,
+    ):
+        """Initialize the sampler and load its index.
+
+        Args:
+            folder: Directory to store samples in
+            max_count: Maximum number of kept samples
+            max_bytes: Maximum total size of kept samples
+            min_distance: Minimum hash hamming distance for a frame to be novel
+            color_tolerance: Mean color difference that also makes a frame novel
+        """
+        self.folder = folder
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.min_distance = min_distance
+        self.color_tolerance = color_tolerance
+        self.offered = 0
+        self._samples: OrderedDict[str, Sample] = OrderedDict()
+        self._nbytes = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def is_novel(self, image_hash: int, color: np.ndarray) -> bool:
+        for sample in self._samples.values():
+            if (
+                hamming_distance(image_hash, sample.hash) < self.min_distance
+                and np.abs(color - sample.color).max() <= self.color_tolerance
+            ):
+                return False
+        return True
+
+    def offer(self, image: np.ndarray) -> Path | None:
+        """Save a frame if it differs from every kept sample.
+
+        Returns:
+            Path of the saved sample, or None if the frame was not novel
+        """
+        self.offered += 1
+        small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+        image_hash = dhash(small)
+        color = small.reshape(-1, small.shape[-1]).mean(axis=0)
+        if not self.is_novel(image_hash, color):
+            return None
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns() // 1000:016d}.png"
+        path = self.folder / name
+        save_image(path, image)
+        size = path.stat().st_size
+        self._samples[name] = Sample(image_hash, tuple(float(c) for c in color), size)
+        self._nbytes += size
+        self._evict()
+        self._save()
+        return path
+
+    def _evict(self) -> None:
+        while self._samples and (
+            len(self._samples) > self.max_count or self._nbytes > self.max_bytes
+        ):
+            name, sample = self._samples.popitem(last=False)
+            self._nbytes -= sample.size
+            (self.folder / name).unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        index_path = self.folder / INDEX_FILE
+        if not index_path.exists():
+            # Frames saved before sampling existed have no index entry
+            # and would never be evicted; drop them once
+            clean_dir(self.folder)
+            return
+        try:
+            entries = json.loads(index_path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read not-tetris sample index: {e}")
+            return
+        for entry in entries:
+            sample = Sample(int(entry["hash"]), tuple(entry["color"]), entry["size"])
+            self._samples[entry["name"]] = sample
+            self._nbytes += sample.size
+        self._evict()
+
+    def _save(self) -> None:
+        entries = [
+            {"name": name, "hash": s.hash, "color": list(s.color), "size": s.size}
+            for name, s in self._samples.items()
+        ]
+        tmp_path = self.folder / f"{INDEX_FILE}.tmp"
+        tmp_path.write_text(json.dumps(entries))
+        tmp_path.replace(self.folder / INDEX_FILE)
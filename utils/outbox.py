@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramEntityTooLarge,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+logger = logging.getLogger(__name__)
+
+# Errors that won't go away by retrying the same post
+PERMANENT_ERRORS = (
+    TelegramBadRequest,
+    TelegramEntityTooLarge,
+    TelegramForbiddenError,
+    FileNotFoundError,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video TEXT NOT NULL,
+    caption TEXT NOT NULL,
+    thumbnail TEXT,
+    width INTEGER,
+    height INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    message_id INTEGER,
+    edit_of INTEGER REFERENCES posts (id)
+);
+CREATE INDEX IF NOT EXISTS posts_due ON posts (status, next_attempt);
+"""
+
+
+@dataclass
+class Post:
+    id: int
+    video: Path
+    caption: str
+    thumbnail: Path | None = None
+    width: int | None = None
+    height: int | None = None
+    attempts: int = 0
+    # Message to replace instead of sending a new one
+    edit_message_id: int | None = None
+
+    @property
+    def dimensions(self) -> tuple[int, int] | None:
+        return (self.width, self.height) if self.width and self.height else None
+
+
+class Outbox:
+    """Persistent queue of Telegram posts waiting to be sent.
+
+    Posts are stored in SQLite, so a post that can't be sent because of
+    a network problem or a Telegram outage survives a restart and is
+    retried later. Statuses: pending (waiting or retrying), sending,
+    sent and failed (gave up).
+
+    A post can replace the message of an earlier post (e.g. a preview
+    with the final video). It waits until the earlier post was sent, and
+    is sent as a new message if the earlier one failed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_attempts: int = 10,
+        base_delay: float = 5.0,
+        max_delay: float = 3600.0,
+    ):
+        """Open (or create) the outbox database.
+
+        Args:
+            path: SQLite database file
+            max_attempts: Give up on a post after this many failed sends
+            base_delay: Delay before the first retry in seconds, doubled
+                on every further attempt
+            max_delay: Upper bound for the retry delay
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.executescript(_SCHEMA)
+        # Posts that were being sent when the process died are sent again
+        self._db.execute("UPDATE posts SET status = 'pending' WHERE status = 'sending'")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def add(
+        self,
+        video: Path,
+        caption: str,
+        thumbnail: Path | None = None,
+        dimensions: tuple[int, int] | None = None,
+        edit_of: int | None = None,
+    ) -> int:
+        """Queue a post.
+
+        Args:
+            edit_of: Id of an earlier post whose message this post replaces
+
+        Returns:
+            Id of the new post
+        """
+        width, height = dimensions or (None, None)
+        cursor = self._db.execute(
+            "INSERT INTO posts "
+            "(video, caption, thumbnail, width, height, created_at, edit_of) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(video),
+                caption,
+                str(thumbnail) if thumbnail is not None else None,
+                width,
+                height,
+                time.time(),
+                edit_of,
+            ),
+        )
+        return cursor.lastrowid
+
+    def next_due(self, now: float | None = None) -> Post | None:
+        """Oldest pending post whose retry time has come.
+
+        Edits are only due once the post they replace was sent or failed.
+        """
+        row = self._db.execute(
+            "SELECT p.id, p.video, p.caption, p.thumbnail, p.width, p.height, "
+            "p.attempts, t.message_id FROM posts p "
+            "LEFT JOIN posts t ON p.edit_of = t.id "
+            "WHERE p.status = 'pending' AND p.next_attempt <= ? "
+            "AND (p.edit_of IS NULL OR t.status IN ('sent', 'failed')) "
+            "ORDER BY p.id LIMIT 1",
+            (now if now is not None else time.time(),),
+        ).fetchone()
+        if row is None:
+            return None
+        id_, video, caption, thumbnail, width, height, attempts, message_id = row
+        return Post(
+            id_,
+            Path(video),
+            caption,
+            Path(thumbnail) if thumbnail else None,
+            width,
+            height,
+            attempts,
+            message_id,
+        )
+
+    def next_attempt_time(self) -> float | None:
+        """When the next pending post becomes due, None if nothing is pending."""
+        row = self._db.execute(
+            "SELECT MIN(next_attempt) FROM posts WHERE status = 'pending'"
+        ).fetchone()
+        return row[0]
+
+    def pending(self) -> list[Path]:
+        """Videos of all posts not sent or given up yet."""
+        rows = self._db.execute(
+            "SELECT video FROM posts WHERE status IN ('pending', 'sending') ORDER BY id"
+        )
+        return [Path(video) for (video,) in rows]
+
+    def count(self, status: str) -> int:
+        return self._db.execute(
+            "SELECT COUNT(*) FROM posts WHERE status = ?", (status,)
+        ).fetchone()[0]
+
+    def status(self, post_id: int) -> str | None:
+        row = self._db.execute("SELECT status FROM posts WHERE id = ?", (post_id,))
+        row = row.fetchone()
+        return row[0] if row else None
+
+    def mark_sending(self, post_id: int) -> None:
+        self._set(post_id, status="sending")
+
+    def mark_sent(self, post_id: int, message_id: int | None = None) -> None:
+        self._set(post_id, status="sent", message_id=message_id, last_error=None)
+
+    def mark_failed(self, post_id: int, error: str) -> None:
+        self._set(post_id, status="failed", last_error=error)
+
+    def retry_later(
+        self, post: Post, error: str, retry_after: float | None = None
+    ) -> float | None:
+        """Count a failed attempt and schedule the next one.
+
+        Uses `retry_after` when the server asked for it, exponential
+        backoff with jitter otherwise. Gives up after max_attempts.
+
+        Returns:
+            Delay until the next attempt, or None if the post failed for good
+        """
+        attempts = post.attempts + 1
+        if attempts >= self.max_attempts:
+            self._set(post.id, status="failed", attempts=attempts, last_error=error)
+            return None
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            delay *= random.uniform(0.8, 1.2)
+        self._set(
+            post.id,
+            status="pending",
+            attempts=attempts,
+            next_attempt=time.time() + delay,
+            last_error=error,
+        )
+        return delay
+
+    def _set(self, post_id: int, **fields) -> None:
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        self._db.execute(
+            f"UPDATE posts SET {columns} WHERE id = ?", (*fields.values(), post_id)
+        )
+
+
+class OutboxSender:
+    """Sends the posts of an Outbox with a limited number of parallel uploads.
+
+    A RetryAfter (flood control) response pauses all sending for the
+    requested time, since Telegram applies it to the whole chat.
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        send: Callable[[Post], Awaitable[int | None]],
+        max_parallel: int = 1,
+        on_done: Callable[[Post, bool], None] | None = None,
+        poll_interval: float = 60.0,
+    ):
+        """Initialize the sender.
+
+        Args:
+            outbox: Outbox to send posts from
+            send: Coroutine function sending (or editing) one post,
+                returning the Telegram message id
+            max_parallel: Maximum number of uploads at the same time
+            on_done: Called with the post and whether it was sent, once it
+                was sent or given up on
+            poll_interval: Longest time to sleep without checking the outbox
+        """
+        self.outbox = outbox
+        self.send = send
+        self.max_parallel = max(1, max_parallel)
+        self.on_done = on_done
+        self.poll_interval = poll_interval
+        self.in_flight = 0
+        self._slots = asyncio.Semaphore(self.max_parallel)
+        self._wake = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._paused_until = 0.0
+        self._tasks: set[asyncio.Task] = set()
+
+    def wake(self) -> None:
+        """Check the outbox now, e.g. after adding a post."""
+        self._wake.set()
+
+    async def run(self) -> None:
+        """Send due posts forever."""
+        while True:
+            await self._slots.acquire()
+            now = time.time()
+            post = self.outbox.next_due(now) if now >= self._paused_until else None
+            if post is None:
+                self._slots.release()
+                if not self.in_flight:
+                    self._idle.set()
+                await self._sleep(now)
+                continue
+            self._idle.clear()
+            self.outbox.mark_sending(post.id)
+            self.in_flight += 1
+            task = asyncio.create_task(self._send(post))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def wait_idle(self) -> None:
+        """Wait until no post is due or being sent."""
+        self._idle.clear()
+        self.wake()
+        await self._idle.wait()
+
+    async def _sleep(self, now: float) -> None:
+        wake_at = self.outbox.next_attempt_time()
+        if wake_at is not None:
+            wake_at = max(wake_at, self._paused_until)
+        timeout = self.poll_interval if wake_at is None else wake_at - now
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(
+                self._wake.wait(), max(0.0, min(timeout, self.poll_interval))
+            )
+        except asyncio.TimeoutError:
+            pass
+
+    async def _send(self, post: Post) -> None:
+        sent = False
+        finished = True
+        try:
+            message_id = await self.send(post)
+            self.outbox.mark_sent(post.id, message_id)
+            sent = True
+            logger.info(f"Sent post {post.id} ({post.video.name})")
+        except TelegramRetryAfter as e:
+            self._paused_until = time.time() + e.retry_after
+            finished = self.outbox.retry_later(post, str(e), e.retry_after) is None
+            logger.warning(f"Flood control, pausing uploads for {e.retry_after}s")
+        except PERMANENT_ERRORS as e:
+            self.outbox.mark_failed(post.id, str(e))
+            logger.error(f"Post {post.id} ({post.video.name}) rejected: {e}")
+        except Exception as e:
+            delay = self.outbox.retry_later(post, str(e))
+            finished = delay is None
+            if finished:
+                logger.error(f"Giving up on post {post.id} ({post.video.name}): {e}")
+            else:
+                logger.warning(
+                    f"Sending post {post.id} failed, retrying in {delay:.0f}s: {e}"
+                )
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            self.wake()
+        if finished and self.on_done is not None:
+            self.on_done(post, sent)
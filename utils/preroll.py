@@ -0,0 +1,200 @@
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Literal
+
+import cv2
+import numpy as np
+
+from cv_tools.debug import save_image
+
+PrerollEncoding = Literal["raw", "png", "jpg"]
+
+
+@dataclass
+class PrerollFrame:
+    """A single frame held in the pre-roll ring.
+
+    Attributes:
+        frame_number: Frame number assigned by the game loop
+        timestamp: Monotonic capture time in seconds
+        data: Raw BGR image, or encoded image bytes when encoding is png/jpg
+        encoding: How `data` is stored
+        sequence: Capture sequence number, None to use the frame number
+    """
+
+    frame_number: int
+    timestamp: float
+    data: np.ndarray
+    encoding: PrerollEncoding = "raw"
+    sequence: int | None = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def image(self) -> np.ndarray:
+        """Return the frame as a BGR image, decoding it if needed."""
+        if self.encoding == "raw":
+            return self.data
+        return cv2.imdecode(self.data, cv2.IMREAD_COLOR)
+
+
+class PrerollBuffer:
+    """Ring buffer holding the most recent frames seen outside of a game.
+
+    Classification runs only on every 10th frame and the state machine
+    needs readable 0-0 scores before switching to GAME, so the first
+    frames of a game are already gone by the time a game folder exists.
+    The game loop pushes every frame here while not recording; when a
+    game starts the buffered frames are flushed into the new game folder.
+
+    The ring is bounded both by frame count and by total bytes, whichever
+    limit is hit first.
+    """
+
+    def __init__(
+        self,
+        max_frames: int,
+        max_bytes: int,
+        encoding: PrerollEncoding = "raw",
+        jpeg_quality: int = 90,
+    ):
+        """Initialize the buffer.
+
+        Args:
+            max_frames: Maximum number of frames to keep
+            max_bytes: Maximum total size of the stored frames in bytes
+            encoding: "raw" keeps frames as-is, "png"/"jpg" compress them in memory
+            jpeg_quality: JPEG quality used when encoding is "jpg"
+        """
+        if encoding not in ("raw", "png", "jpg"):
+            raise ValueError(f"Unknown pre-roll encoding: {encoding}")
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.encoding = encoding
+        self.jpeg_quality = jpeg_quality
+        self._frames: deque[PrerollFrame] = deque()
+        self._nbytes = 0
+        self._boundary: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the buffered frames in bytes."""
+        return self._nbytes
+
+    def push(
+        self,
+        frame_number: int,
+        image: np.ndarray,
+        timestamp: float,
+        sequence: int | None = None,
+    ) -> None:
+        """Add a frame, evicting the oldest ones to stay within the limits."""
+        if self.max_frames <= 0:
+            return
+        frame = PrerollFrame(
+            frame_number, timestamp, self._encode(image), self.encoding, sequence
+        )
+        self._frames.append(frame)
+        self._nbytes += frame.nbytes
+        while self._frames and (
+            len(self._frames) > self.max_frames or self._nbytes > self.max_bytes
+        ):
+            self._nbytes -= self._frames.popleft().nbytes
+
+    def mark_boundary(self, frame_number: int) -> None:
+        """Mark a frame that was classified as not being gameplay.
+
+        Frames up to and including the boundary are never flushed into a
+        game folder, so a game can't start earlier than the last frame we
+        know was still the menu or a black screen.
+        """
+        self._boundary = frame_number
+
+    def candidates(self) -> list[PrerollFrame]:
+        """Return buffered frames after the last non-gameplay boundary."""
+        if self._boundary is None:
+            return list(self._frames)
+        return [f for f in self._frames if f.frame_number > self._boundary]
+
+    def find_start(self, is_game: Callable[[np.ndarray], bool]) -> PrerollFrame | None:
+        """Find the first buffered frame that shows gameplay.
+
+        Args:
+            is_game: Predicate run on decoded frames, oldest first
+
+        Returns:
+            The first matching frame, or None if no candidate matches
+        """
+        for frame in self.candidates():
+            if is_game(frame.image()):
+                return frame
+        return None
+
+    def flush(
+        self,
+        folder: Path,
+        start_frame: int | None = None,
+        transform: Callable[[np.ndarray], np.ndarray] | None = None,
+    ) -> list[PrerollFrame]:
+        """Write buffered frames into a game folder and empty the buffer.
+
+        Args:
+            folder: Game folder to write frames to (as NNNNNN.png)
+            start_frame: First frame number to write; defaults to the first
+                frame after the non-gameplay boundary
+            transform: Optional crop/scale applied before writing
+
+        Returns:
+            List of written frames, oldest first
+        """
+        frames = self.candidates()
+        if start_frame is not None:
+            frames = [f for f in frames if f.frame_number >= start_frame]
+        for frame in frames:
+            path = folder / f"{frame.frame_number:06d}.png"
+            if frame.encoding == "png" and transform is None:
+                # Already PNG encoded - write bytes without re-encoding
+                path.write_bytes(frame.data.tobytes())
+                continue
+            image = frame.image()
+            save_image(path, transform(image) if transform is not None else image)
+        self.clear()
+        return frames
+
+    def take(self) -> "PrerollBuffer":
+        """Move the frames after the boundary into a new buffer and empty this one.
+
+        The returned buffer can be searched and flushed in a worker thread
+        while the game loop goes on.
+        """
+        taken = PrerollBuffer(
+            self.max_frames, self.max_bytes, self.encoding, self.jpeg_quality
+        )
+        for frame in self.candidates():
+            taken._frames.append(frame)
+            taken._nbytes += frame.nbytes
+        self.clear()
+        return taken
+
+    def clear(self) -> None:
+        """Drop all buffered frames and the boundary marker."""
+        self._frames.clear()
+        self._nbytes = 0
+        self._boundary = None
+
+    def _encode(self, image: np.ndarray) -> np.ndarray:
+        if self.encoding == "png":
+            # Fast compression level: this runs on every non-game frame
+            _, data = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            return data
+        if self.encoding == "jpg":
+            _, data = cv2.imencode(
+                ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+            )
+            return data
+        return image
@@ -0,0 +1,150 @@
+import logging
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, UTC
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class FrameProfiler:
+    """Sampling profiler for the next N frames of the game loop.
+
+    request() (e.g. from a SIGUSR1 handler or the metrics endpoint) arms
+    the profiler; the game loop calls tick() once per frame. While
+    profiling, a background thread samples the game loop's stack every
+    `interval` seconds, so the loop itself runs unmodified. After N frames
+    sampling stops and two files are written to `output_dir`:
+
+    - profile_<time>.folded: one line per distinct stack with its sample
+      count, root first ("a;b;c 42"), the input format of flamegraph.pl,
+      speedscope and inferno
+    - profile_<time>.txt: functions with the most samples (self and total)
+
+    Recording is never interrupted; an idle profiler costs one attribute
+    check per frame.
+    """
+
+    def __init__(self, output_dir: Path, frames: int = 600, interval: float = 0.005):
+        """Initialize the profiler.
+
+        Args:
+            output_dir: Folder the profiles are written to
+            frames: Default number of frames to profile
+            interval: Seconds between stack samples
+        """
+        self.output_dir = output_dir
+        self.frames = frames
+        self.interval = interval
+        self.last_profile: Path | None = None
+        self._requested = 0
+        self._remaining = 0
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._samples: Counter[tuple[str, ...]] = Counter()
+
+    @property
+    def active(self) -> bool:
+        return self._remaining > 0
+
+    def request(self, frames: int | None = None) -> bool:
+        """Profile the next `frames` frames, unless a profile is running.
+
+        Safe to call from a signal handler.
+
+        Returns:
+            False if a profile is already running or requested
+
+        Raises:
+            ValueError: If `frames` is not positive
+        """
+        if frames is not None and frames <= 0:
+            raise ValueError(f"frames must be positive, got {frames}")
+        if self.active or self._requested:
+            return False
+        self._requested = frames or self.frames
+        return True
+
+    def tick(self) -> None:
+        """Count one frame of the profiled loop."""
+        if self._remaining:
+            self._remaining -= 1
+            if not self._remaining:
+                self._stop.set()
+        elif self._requested:
+            self._start(threading.get_ident())
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """End a running profile early (e.g. at shutdown) and write it."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._remaining = 0
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _start(self, thread_id: int) -> None:
+        self._remaining = self._requested
+        self._requested = 0
+        self._samples = Counter()
+        self._stop.clear()
+        logger.info(f"Profiling the next {self._remaining} frames")
+        self._thread = threading.Thread(
+            target=self._run, args=(thread_id, self._remaining), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, thread_id: int, frames: int) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = Path(code.co_filename).name
+                stack.append(f"{code.co_name} ({name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self._samples[tuple(reversed(stack))] += 1
+        try:
+            self.last_profile = self.write(self._samples, frames)
+            logger.info(f"Profile written to {self.last_profile}")
+        except OSError as e:
+            logger.error(f"Could not write profile: {e}")
+
+    def write(self, samples: Counter, frames: int) -> Path:
+        """Write the folded stacks and a text report, returns the .folded path."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"profile_{datetime.now(UTC).strftime('%Y_%m_%d_%H_%M_%S')}"
+        folded = self.output_dir / f"{stem}.folded"
+        folded.write_text(
+            "".join(
+                f"{';'.join(stack)} {count}\n" for stack, count in samples.most_common()
+            )
+        )
+        (self.output_dir / f"{stem}.txt").write_text(
+            report(samples, frames, self.interval)
+        )
+        return folded
+
+
+def report(samples: Counter, frames: int, interval: float, top: int = 25) -> str:
+    """Functions with the most samples, by self and by total time."""
+    total = sum(samples.values())
+    own: Counter[str] = Counter()
+    cumulative: Counter[str] = Counter()
+    for stack, count in samples.items():
+        own[stack[-1]] += count
+        for function in set(stack):
+            cumulative[function] += count
+    lines = [
+        f"{total} samples every {interval * 1000:.1f}ms over {frames} frames "
+        f"(~{total * interval:.1f}s)",
+        "",
+    ]
+    for title, counter in (("Self", own), ("Total", cumulative)):
+        lines.append(f"{title}:")
+        for function, count in counter.most_common(top):
+            lines.append(f"{count / total if total else 0:7.1%} {count:7d}  {function}")
+        lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,191 @@
+from pathlib import Path
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from cv_tools.debug import save_image
+from cv_tools.frame_diff import FrameDeduplicator
+from cv_tools.strip_frame import GameRect, crop_game_rect
+
+TIMESTAMPS_FILE = "timestamps.txt"
+
+
+class GameRecorder:
+    """Writes the frames of one game into its folder.
+
+    Every recorded frame is saved as NNNNNN.png and indexed in
+    timestamps.txt together with its monotonic capture timestamp and
+    capture sequence number, one tab-separated line per frame:
+
+        000215.png  1234.567890  215
+
+    When recording finishes an ``end`` line with the timestamp at which
+    the last frame stopped being shown is appended. The video encoder
+    uses these timestamps to produce frame-accurate variable frame rate
+    output instead of assuming constant frame spacing.
+
+    With a deduplicator, frames unchanged since the last written frame are
+    not saved at all. Since each frame is shown until the next indexed
+    timestamp, skipping a duplicate simply extends the previous frame.
+
+    While the pre-roll of a game is written in the background, the index
+    lines of the frames recorded meanwhile are held back (hold() and
+    release()), so that the pre-roll frames added with add_frame() come
+    first in the index.
+
+    Frames can optionally be cropped to the game area and downscaled
+    before they are written. The crop rectangle is the one strip_frame
+    found during classification and is locked for the whole game, so all
+    frames of a video have the same size.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        deduplicator: FrameDeduplicator | None = None,
+        crop: bool = False,
+        output_height: int | None = None,
+        on_write: Callable[[int], None] | None = None,
+    ):
+        """Initialize the recorder.
+
+        Args:
+            folder: Game folder to write frames to
+            deduplicator: Optional filter for unchanged frames
+            crop: Store only the game area set with set_crop_rect
+            output_height: Downscale stored frames to this height
+            on_write: Called with the size in bytes of every written frame
+        """
+        self.folder = folder
+        self.deduplicator = deduplicator
+        self.crop = crop
+        self.output_height = output_height or None
+        self.crop_rect: GameRect | None = None
+        self.on_write = on_write
+        self.bytes_written = 0
+        self.frame_count = 0
+        self.duplicate_count = 0
+        self.first_timestamp: float | None = None
+        self.last_timestamp: float | None = None
+        self.last_seen_timestamp: float | None = None
+        self._index = open(folder / TIMESTAMPS_FILE, "a", buffering=1)
+        self._held: list[str] | None = None
+
+    @property
+    def timestamps_path(self) -> Path:
+        return self.folder / TIMESTAMPS_FILE
+
+    @property
+    def duration(self) -> float:
+        """Time between the first and last recorded frame in seconds."""
+        if self.first_timestamp is None or self.last_timestamp is None:
+            return 0.0
+        return self.last_timestamp - self.first_timestamp
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Fraction of captured frames that were dropped as duplicates."""
+        seen = self.frame_count + self.duplicate_count
+        return self.duplicate_count / seen if seen else 0.0
+
+    @property
+    def transforms(self) -> bool:
+        """True if frames are modified before being written."""
+        return self.crop_rect is not None or self.output_height is not None
+
+    def set_crop_rect(self, rect: GameRect | None) -> None:
+        """Lock the game area to crop to, if cropping is enabled."""
+        if self.crop and self.crop_rect is None and rect is not None:
+            self.crop_rect = rect
+
+    def transform(self, image: np.ndarray) -> np.ndarray:
+        """Apply the configured crop and scale to a raw frame."""
+        if self.crop_rect is not None:
+            image = crop_game_rect(image, self.crop_rect)
+        if self.output_height is not None and image.shape[0] != self.output_height:
+            h, w = image.shape[:2]
+            # Keep the width even for yuv420p encoding
+            width = max(2, round(w * self.output_height / h / 2) * 2)
+            image = cv2.resize(
+                image, (width, self.output_height), interpolation=cv2.INTER_AREA
+            )
+        return image
+
+    def record(
+        self,
+        frame_number: int,
+        image: np.ndarray,
+        timestamp: float,
+        sequence: int | None = None,
+    ) -> bool:
+        """Save a frame and add it to the timestamp index.
+
+        Returns:
+            False if the frame was skipped as a duplicate
+        """
+        self.last_seen_timestamp = timestamp
+        image = self.transform(image)
+        if self.deduplicator is not None and self.deduplicator.is_duplicate(image):
+            self.duplicate_count += 1
+            return False
+        path = self.folder / f"{frame_number:06d}.png"
+        save_image(path, image)
+        nbytes = path.stat().st_size
+        self.bytes_written += nbytes
+        if self.on_write is not None:
+            self.on_write(nbytes)
+        self._index_frame(frame_number, timestamp, sequence, hold=True)
+        return True
+
+    def add_frame(
+        self, frame_number: int, timestamp: float, sequence: int | None = None
+    ) -> None:
+        """Index a frame that was already written to the folder."""
+        self._index_frame(frame_number, timestamp, sequence, hold=False)
+
+    def _index_frame(
+        self, frame_number: int, timestamp: float, sequence: int | None, hold: bool
+    ) -> None:
+        if sequence is None:
+            sequence = frame_number
+        line = f"{frame_number:06d}.png\t{timestamp:.6f}\t{sequence}\n"
+        if hold and self._held is not None:
+            self._held.append(line)
+        else:
+            self._index.write(line)
+        # Older frames can be indexed while recorded ones are held
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+        if self.last_seen_timestamp is None or timestamp > self.last_seen_timestamp:
+            self.last_seen_timestamp = timestamp
+        self.frame_count += 1
+
+    def hold(self) -> None:
+        """Keep the index lines of recorded frames until release()."""
+        if self._held is None:
+            self._held = []
+
+    def release(self) -> None:
+        """Write the held index lines after the frames added since."""
+        held, self._held = self._held, None
+        if held and not self._index.closed:
+            self._index.writelines(held)
+
+    def close(self, end_timestamp: float | None = None) -> None:
+        """Finish recording.
+
+        Args:
+            end_timestamp: Time at which the last frame stops being shown;
+                defaults to the capture time of the last seen frame
+        """
+        if self._index.closed:
+            return
+        self.release()
+        if end_timestamp is None:
+            end_timestamp = self.last_seen_timestamp
+        if end_timestamp is not None:
+            self._index.write(f"end\t{end_timestamp:.6f}\n")
+        self._index.close()
@@ -0,0 +1,286 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from utils.dirs import remove_folder
+
+logger = logging.getLogger(__name__)
+
+# Check free disk space after this many bytes were written
+_DISK_CHECK_BYTES = 64 * 1024 * 1024
+
+
+def path_size(path: Path) -> int:
+    """Size of a file, or of all files below a folder, in bytes."""
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class RetentionManager:
+    """Keeps recorder output within per-category byte budgets.
+
+    Each category (game folders and videos) has an in-memory index of
+    its entries and their sizes, oldest first. The directories are scanned
+    once at startup; after that the index is kept up to date as entries
+    are written and removed, so enforcing a budget never lists a directory
+    again. Not-tetris samples are bounded by NotTetrisSampler instead.
+
+    Free disk space is checked every 64 MB written. When it drops below
+    the configured minimum the manager enters emergency mode and the game
+    loop stops recording until space is freed. Since nothing is written
+    then, emergency mode is re-checked when entries are removed and, via
+    poll(), every `recheck_interval` seconds.
+
+    The disk checks run wherever data is written, i.e. in the capture
+    loop. With `background`, the budgets they enforce on a full disk are
+    enforced in a worker thread, so deleting old games never stalls the
+    capture.
+    """
+
+    def __init__(
+        self,
+        budgets: dict[str, int],
+        min_free_bytes: int = 0,
+        disk_path: Path | None = None,
+        on_remove: Callable[[str, Path], None] | None = None,
+        recheck_interval: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+        background: bool = False,
+    ):
+        """Initialize the manager.
+
+        Args:
+            budgets: Maximum total bytes per category
+            min_free_bytes: Free space below which emergency mode starts
+            disk_path: Path on the disk to monitor (defaults to cwd)
+            on_remove: Called with the category and path of every
+                deleted entry
+            recheck_interval: Seconds between disk checks by poll() while
+                in emergency mode
+            clock: Time source of the re-checks
+            background: Enforce budgets on a full disk in a worker thread
+        """
+        self.budgets = budgets
+        self.min_free_bytes = min_free_bytes
+        self.disk_path = disk_path or Path.cwd()
+        self.on_remove = on_remove
+        self.recheck_interval = recheck_interval
+        self.clock = clock
+        self.background = background
+        self.emergency = False
+        self._last_check = clock()
+        self._index: dict[str, OrderedDict[Path, int]] = {
+            category: OrderedDict() for category in budgets
+        }
+        self._sizes = {category: 0 for category in budgets}
+        self._protected: set[Path] = set()
+        self._unchecked_bytes = 0
+        self._lock = threading.Lock()
+        self._enforcer: threading.Thread | None = None
+
+    def scan(self, category: str, root: Path, predicate=None) -> None:
+        """Index the existing entries of a directory, sorted by name.
+
+        Only meant to be called once per category at startup.
+        """
+        if not root.exists():
+            return
+        entries = sorted(root.iterdir(), key=lambda x: x.name)
+        with self._lock:
+            for entry in entries:
+                if predicate is None or predicate(entry):
+                    nbytes = path_size(entry)
+                    self._index[category][entry] = nbytes
+                    self._sizes[category] += nbytes
+
+    def index(self, category: str, entries: list[tuple[Path, int | None]]) -> None:
+        """Index existing entries of known size (None to measure), oldest first.
+
+        Like scan(), but for entries listed elsewhere, e.g. the game catalog.
+        """
+        with self._lock:
+            for path, nbytes in entries:
+                if nbytes is None:
+                    nbytes = path_size(path)
+                self._index[category][path] = nbytes
+                self._sizes[category] += nbytes
+
+    def size(self, category: str) -> int:
+        """Total indexed size of a category in bytes."""
+        return self._sizes[category]
+
+    def entry_size(self, category: str, path: Path) -> int:
+        """Indexed size of one entry in bytes, 0 if it isn't indexed."""
+        return self._index[category].get(path, 0)
+
+    def entries(self, category: str) -> list[Path]:
+        """Indexed entries of a category, oldest first."""
+        return list(self._index[category])
+
+    def add(self, category: str, path: Path, nbytes: int | None = None) -> None:
+        """Index a new entry, or replace the size of an existing one."""
+        if nbytes is None:
+            nbytes = path_size(path)
+        with self._lock:
+            index = self._index[category]
+            previous = index.pop(path, 0)
+            index[path] = nbytes
+            self._sizes[category] += nbytes - previous
+        self._note_written(nbytes - previous)
+
+    def grow(self, category: str, path: Path, nbytes: int) -> None:
+        """Add bytes written into an indexed entry (e.g. a game folder)."""
+        with self._lock:
+            index = self._index[category]
+            index[path] = index.get(path, 0) + nbytes
+            self._sizes[category] += nbytes
+        self._note_written(nbytes)
+
+    def protect(self, path: Path) -> None:
+        """Exclude an entry from budget enforcement (recording or queued)."""
+        self._protected.add(path)
+
+    def unprotect(self, path: Path) -> None:
+        self._protected.discard(path)
+
+    def is_protected(self, path: Path) -> bool:
+        return path in self._protected
+
+    def remove(self, category: str, path: Path) -> int:
+        """Delete an entry from disk and from the index.
+
+        Returns:
+            Number of bytes freed
+        """
+        with self._lock:
+            nbytes = self._index[category].pop(path, 0)
+            self._sizes[category] -= nbytes
+        self._delete(category, path)
+        if self.emergency and nbytes:
+            self._update_emergency()
+        return nbytes
+
+    def enforce(self, category: str) -> list[Path]:
+        """Delete the oldest unprotected entries until within budget.
+
+        Returns:
+            List of removed paths
+        """
+        budget = self.budgets[category]
+        victims = []
+        with self._lock:
+            index = self._index[category]
+            for path, nbytes in list(index.items()):
+                if self._sizes[category] <= budget:
+                    break
+                if path in self._protected:
+                    continue
+                del index[path]
+                self._sizes[category] -= nbytes
+                victims.append(path)
+        for path in victims:
+            self._delete(category, path)
+        if victims:
+            logger.info(f"Retention: removed {len(victims)} {category} item(s)")
+            if self.emergency:
+                self._update_emergency()
+        return victims
+
+    def enforce_all(self) -> list[Path]:
+        removed = []
+        for category in self.budgets:
+            removed += self.enforce(category)
+        return removed
+
+    def disk_free(self) -> int:
+        return shutil.disk_usage(self.disk_path).free
+
+    def check_disk(self) -> bool:
+        """Update emergency mode from the current free disk space.
+
+        Budgets are enforced first, so old data is given up before new
+        recordings are. In the background, emergency mode is left again
+        once the enforcement freed enough space.
+
+        Returns:
+            True if in emergency mode
+        """
+        self._unchecked_bytes = 0
+        if not self.min_free_bytes:
+            return False
+        if self.disk_free() < self.min_free_bytes:
+            if self.background:
+                self._enforce_in_background()
+            else:
+                self.enforce_all()
+        return self._update_emergency()
+
+    def poll(self) -> bool:
+        """Re-check the disk while in emergency mode, at most every recheck_interval.
+
+        Returns:
+            True if in emergency mode
+        """
+        if self.emergency and self.clock() - self._last_check >= self.recheck_interval:
+            return self.check_disk()
+        return self.emergency
+
+    def _enforce_in_background(self) -> None:
+        with self._lock:
+            if self._enforcer is not None and self._enforcer.is_alive():
+                return
+            self._enforcer = threading.Thread(
+                target=self._enforce_all_and_check, name="retention", daemon=True
+            )
+            self._enforcer.start()
+
+    def _enforce_all_and_check(self) -> None:
+        try:
+            self.enforce_all()
+            self._update_emergency()
+        except Exception:
+            logger.exception("Retention: enforcing the budgets failed")
+
+    def _update_emergency(self) -> bool:
+        self._last_check = self.clock()
+        emergency = self.disk_free() < self.min_free_bytes
+        if emergency != self.emergency:
+            if emergency:
+                logger.warning("Retention: disk almost full, entering emergency mode")
+            else:
+                logger.info("Retention: disk space recovered, leaving emergency mode")
+        self.emergency = emergency
+        return emergency
+
+    def _delete(self, category: str, path: Path) -> None:
+        _delete(path)
+        if self.on_remove is not None:
+            self.on_remove(category, path)
+
+    def _note_written(self, nbytes: int) -> None:
+        self._unchecked_bytes += nbytes
+        if self._unchecked_bytes >= _DISK_CHECK_BYTES:
+            self.check_disk()
+
+
+def _delete(path: Path) -> None:
+    try:
+        if path.is_dir():
+            remove_folder(path)
+        elif path.exists():
+            path.unlink()
+    except FileNotFoundError:
+        pass  # Removed by a concurrent enforce() or remove()
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResourceSample:
+    """Resources held by the process at one point of a soak run."""
+
+    elapsed: float
+    games: int
+    rss: int
+    fds: int
+    threads: int
+    tasks: int
+    traced: int
+
+
+# Name, sample attribute and report unit of every limited resource
+RESOURCES = (
+    ("rss", "rss", 2**20),
+    ("fds", "fds", 1),
+    ("threads", "threads", 1),
+    ("tasks", "tasks", 1),
+)
+
+
+def current_rss() -> int:
+    """Resident memory of this process in bytes, 0 where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return 0
+
+
+def fitted_growth(xs: list[float], ys: list[float]) -> float:
+    """Growth over the range of `xs` of the least squares line through the points.
+
+    A trend is less sensitive than the last minus the first sample to
+    the sawtooth of the allocator and garbage collector.
+    """
+    if len(xs) < 2 or xs[-1] == xs[0]:
+        return 0.0
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if var == 0:
+        return 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+    return slope * (xs[-1] - xs[0])
+
+
+class SoakMonitor:
+    """Samples the resources of the recorder over many replayed games.
+
+    RSS, open file descriptors, threads, asyncio tasks and the memory
+    traced by tracemalloc are sampled every `interval` seconds and at
+    every game end. The first `warmup_games` games fill caches, pools and
+    queues, so growth is only fitted on the samples after them, and the
+    tracemalloc snapshot the top allocators are diffed against is taken
+    when they end.
+
+    Limits map a resource of RESOURCES to the largest growth allowed
+    over the measured part of the run (in MiB for rss).
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, float],
+        interval: float = 5.0,
+        warmup_games: int = 1,
+        top: int = 10,
+    ):
+        self.limits = limits
+        self.interval = interval
+        self.warmup_games = warmup_games
+        self.top = top
+        self.games = 0
+        self.samples: list[ResourceSample] = []
+        self._start = time.monotonic()
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._final: tracemalloc.Snapshot | None = None
+
+    def start(self) -> None:
+        tracemalloc.start()
+        self._start = time.monotonic()
+        self.sample()
+
+    def sample(self) -> ResourceSample:
+        try:
+            tasks = len(asyncio.all_tasks())
+        except RuntimeError:
+            tasks = 0  # No running loop
+        sample = ResourceSample(
+            elapsed=time.monotonic() - self._start,
+            games=self.games,
+            rss=current_rss(),
+            fds=open_fds(),
+            threads=threading.active_count(),
+            tasks=tasks,
+            traced=(
+                tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+            ),
+        )
+        self.samples.append(sample)
+        return sample
+
+    def game_finished(self) -> None:
+        self.games += 1
+        sample = self.sample()
+        logger.info(
+            f"Soak: {self.games} game(s), RSS {sample.rss / 2**20:.0f} MiB, "
+            f"{sample.fds} fds, {sample.threads} threads, {sample.tasks} tasks"
+        )
+        if self.games == self.warmup_games and tracemalloc.is_tracing():
+            self._baseline = tracemalloc.take_snapshot()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sample()
+
+    def stop(self) -> None:
+        self.sample()
+        if tracemalloc.is_tracing():
+            self._final = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    @property
+    def measured(self) -> list[ResourceSample]:
+        """Samples after the warm-up games."""
+        return [s for s in self.samples if s.games >= self.warmup_games]
+
+    def growth(self) -> dict[str, float]:
+        """Fitted growth of every resource after the warm-up, in report units."""
+        samples = self.measured
+        xs = [s.elapsed for s in samples]
+        return {
+            name: fitted_growth(xs, [getattr(s, attr) for s in samples]) / unit
+            for name, attr, unit in RESOURCES
+        }
+
+    def failures(self) -> list[str]:
+        """Resources that grew over their limit."""
+        if self.games <= self.warmup_games:
+            return [f"only {self.games} game(s), need more than {self.warmup_games}"]
+        growth = self.growth()
+        return [
+            f"{name} grew by {growth[name]:.1f} (limit {limit:g})"
+            for name, limit in self.limits.items()
+            if growth[name] > limit
+        ]
+
+    def top_allocators(self) -> list[str]:
+        """Source lines whose traced memory grew most after the warm-up."""
+        if self._baseline is None or self._final is None:
+            return []
+        # Leave out the monitor's own bookkeeping
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        final = self._final.filter_traces(filters)
+        stats = final.compare_to(self._baseline.filter_traces(filters), "lineno")
+        return [
+            f"{stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7d} blocks  {stat.traceback}"
+            for stat in stats[: self.top]
+            if stat.size_diff > 0
+        ]
+
+    def report(self) -> str:
+        samples = self.measured or self.samples
+        first, last = samples[0], samples[-1]
+        growth = self.growth()
+        lines = [
+            f"Soak:            {self.games} game(s) in {last.elapsed:.0f}s, "
+            f"{len(self.samples)} samples, growth fitted after {self.warmup_games} game(s)",
+            f"  {'resource':<10} {'first':>10} {'last':>10} {'growth':>10} {'limit':>8}",
+        ]
+        for name, attr, unit in RESOURCES:
+            limit = self.limits.get(name)
+            lines.append(
+                f"  {name:<10} {getattr(first, attr) / unit:10.1f} "
+                f"{getattr(last, attr) / unit:10.1f} {growth[name]:+10.1f} "
+                f"{limit if limit is not None else '-':>8}"
+            )
+        lines.append(
+            f"  {'traced':<10} {first.traced / 2**20:10.1f} {last.traced / 2**20:10.1f}"
+        )
+        allocators = self.top_allocators()
+        if allocators:
+            lines.append("Top allocators since the warm-up:")
+            lines += [f"  {line}" for line in allocators]
+        failures = self.failures()
+        lines.append("Result:          " + ("; ".join(failures) if failures else "ok"))
+        return "\n".join(lines)